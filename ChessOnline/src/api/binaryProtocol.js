@@ -0,0 +1,166 @@
+// src/api/binaryProtocol.js
+// Binarny sub-protokół gry ("chess.msgpack.v1") - lustro myapp/wire.py na backendzie.
+// Ramka: MessagePack [tag, body]; ruch = jedna liczba, pola planszy = indeks 0-63 + kod figury,
+// zegary w całkowitych milisekundach. Po zdekodowaniu wiadomość wygląda tak samo jak w JSON.
+
+export const SUBPROTOCOL = 'chess.msgpack.v1';
+
+// Kolejność jak w wire.MESSAGE_TYPES (tag = indeks + 1)
+const MESSAGE_TYPES = [
+  'connected', 'sync', 'move', 'game_over', 'error', 'chat', 'player_joined',
+  'draw_offer', 'draw_rejected', 'sync_request', 'resign', 'offer_draw', 'respond_draw',
+  'resumed', 'legal_moves',
+];
+const PIECES = [
+  null,
+  'bPionek', 'bWieza', 'bSkoczek', 'bGoniec', 'bHetman', 'bKrol',
+  'cPionek', 'cWieza', 'cSkoczek', 'cGoniec', 'cHetman', 'cKrol',
+];
+const PROMOTIONS = ['', 'H', 'W', 'S', 'G'];
+const CLOCK_KEYS = ['white_time', 'black_time', 'last_move_timestamp'];
+
+// --- Minimalny MessagePack (tylko typy, których używa protokół) ---
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+function packValue(value, out) {
+  if (value === null || value === undefined) {
+    out.push(0xc0);
+  } else if (value === false || value === true) {
+    out.push(value ? 0xc3 : 0xc2);
+  } else if (typeof value === 'number') {
+    if (Number.isInteger(value) && value >= 0 && value <= 0xffffffff) {
+      if (value < 0x80) out.push(value);
+      else if (value < 0x100) out.push(0xcc, value);
+      else if (value < 0x10000) out.push(0xcd, value >> 8, value & 0xff);
+      else out.push(0xce, value >>> 24, (value >> 16) & 0xff, (value >> 8) & 0xff, value & 0xff);
+    } else if (Number.isInteger(value) && value < 0 && value >= -32) {
+      out.push(value & 0xff);
+    } else {
+      const view = new DataView(new ArrayBuffer(8));
+      view.setFloat64(0, value);
+      out.push(0xcb, ...new Uint8Array(view.buffer));
+    }
+  } else if (typeof value === 'string') {
+    const bytes = textEncoder.encode(value);
+    if (bytes.length < 32) out.push(0xa0 | bytes.length);
+    else if (bytes.length < 0x100) out.push(0xd9, bytes.length);
+    else out.push(0xda, bytes.length >> 8, bytes.length & 0xff);
+    out.push(...bytes);
+  } else if (Array.isArray(value)) {
+    if (value.length < 16) out.push(0x90 | value.length);
+    else out.push(0xdc, value.length >> 8, value.length & 0xff);
+    value.forEach(item => packValue(item, out));
+  } else {
+    const keys = Object.keys(value).filter(k => value[k] !== undefined);
+    if (keys.length < 16) out.push(0x80 | keys.length);
+    else out.push(0xde, keys.length >> 8, keys.length & 0xff);
+    keys.forEach(k => { packValue(k, out); packValue(value[k], out); });
+  }
+}
+
+function unpack(buffer) {
+  const bytes = new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = (len) => { const s = textDecoder.decode(bytes.subarray(pos, pos + len)); pos += len; return s; };
+  const arr = (len) => { const a = []; for (let i = 0; i < len; i++) a.push(read()); return a; };
+  const map = (len) => { const m = {}; for (let i = 0; i < len; i++) { const k = read(); m[k] = read(); } return m; };
+  const u8 = () => view.getUint8(pos++);
+  const u16 = () => { const v = view.getUint16(pos); pos += 2; return v; };
+  const u32 = () => { const v = view.getUint32(pos); pos += 4; return v; };
+
+  function read() {
+    const b = u8();
+    if (b < 0x80) return b;
+    if (b < 0x90) return map(b & 0x0f);
+    if (b < 0xa0) return arr(b & 0x0f);
+    if (b < 0xc0) return str(b & 0x1f);
+    if (b >= 0xe0) return b - 0x100;
+    let v;
+    switch (b) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: v = bytes.slice(pos + 1, pos + 1 + bytes[pos]); pos += 1 + v.length; return v;
+      case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+      case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+      case 0xcc: return u8();
+      case 0xcd: return u16();
+      case 0xce: return u32();
+      case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+      case 0xd0: v = view.getInt8(pos); pos += 1; return v;
+      case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+      case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+      case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+      case 0xd9: return str(u8());
+      case 0xda: return str(u16());
+      case 0xdb: return str(u32());
+      case 0xdc: return arr(u16());
+      case 0xdd: return arr(u32());
+      case 0xde: return map(u16());
+      case 0xdf: return map(u32());
+      default: throw new Error(`unsupported msgpack byte 0x${b.toString(16)}`);
+    }
+  }
+
+  return read();
+}
+
+// --- Mapowanie wiadomości ---
+
+export function packMove(from, to, promo = '') {
+  const promoCode = Math.max(0, PROMOTIONS.indexOf(promo || ''));
+  return (promoCode << 12) | ((from.r * 8 + from.c) << 6) | (to.r * 8 + to.c);
+}
+
+function unpackMove(code) {
+  const src = (code >> 6) & 63;
+  const dest = code & 63;
+  return {
+    from: { r: Math.floor(src / 8), c: src % 8 },
+    to: { r: Math.floor(dest / 8), c: dest % 8 },
+    promo: PROMOTIONS[code >> 12] || '',
+  };
+}
+
+function fromWire(obj) {
+  if (Array.isArray(obj)) return obj.map(fromWire);
+  if (obj === null || typeof obj !== 'object') return obj;
+  const out = {};
+  for (const [key, value] of Object.entries(obj)) {
+    if (CLOCK_KEYS.includes(key) && typeof value === 'number') {
+      out[key] = value / 1000;
+    } else if (key === 'board' && Array.isArray(value)) {
+      out[key] = Array.from({ length: 8 }, (_, r) => value.slice(r * 8, r * 8 + 8).map(code => PIECES[code]));
+    } else if (key === 'changes' && Array.isArray(value)) {
+      out[key] = value.map(([sq, code]) => [Math.floor(sq / 8), sq % 8, PIECES[code]]);
+    } else if (key === 'move' && Array.isArray(value)) {
+      out[key] = { ...unpackMove(value[0]), san: value[1] };
+    } else {
+      out[key] = fromWire(value);
+    }
+  }
+  return out;
+}
+
+export function encodeMessage(msg) {
+  const { type, ...body } = msg;
+  delete body.token; // token jest już w URL połączenia
+  const tag = MESSAGE_TYPES.indexOf(type) + 1;
+  if (!tag) throw new Error(`message type not in binary protocol: ${type}`);
+  // Ruch idzie jako sama liczba
+  const payload = type === 'move' && body.move ? packMove(body.move.from, body.move.to, body.move.promo) : body;
+  const out = [];
+  packValue([tag, payload], out);
+  return new Uint8Array(out);
+}
+
+export function decodeMessage(buffer) {
+  const [tag, body] = unpack(buffer);
+  const type = MESSAGE_TYPES[tag - 1];
+  if (!type) throw new Error(`unknown message tag: ${tag}`);
+  return { ...fromWire(body), type };
+}
@@ -1,4 +1,6 @@
 // src/api/wsClient.js
+import { SUBPROTOCOL, decodeMessage, encodeMessage } from './binaryProtocol';
+
 const defaultHost = 'ws://localhost:8000';
 
 class WSClient {
@@ -10,6 +12,11 @@ class WSClient {
     this.reconnectTimeout = null;
     this.listeners = new Map();
     this.reconnectDelay = 2000;
+    // binary: klient prosi o sub-protokół msgpack; useBinary: serwer go przyjął
+    this.binary = false;
+    this.useBinary = false;
+    // resumeSeq: () => ostatni seq gry; przy reconnect serwer wyśle tylko brakujące zdarzenia
+    this.resumeSeq = null;
   }
 
   // teraz dodajemy token do URL
@@ -22,12 +29,15 @@ class WSClient {
       return `${this.host}/ws/lobby/?token=${token}`;
     }
 
-    return `${this.host}/ws/game/${encodeURIComponent(room)}/?token=${token}`;
+    const url = `${this.host}/ws/game/${encodeURIComponent(room)}/?token=${token}`;
+    const seq = this.resumeSeq ? this.resumeSeq() : null;
+    return typeof seq === 'number' ? `${url}&seq=${seq}` : url;
   }
 
-  connect({ host, room } = {}) {
+  connect({ host, room, binary } = {}) {
     if (host) this.host = host;
     if (room) this.room = room;
+    if (binary !== undefined) this.binary = binary;
 
     if (!this.room) throw new Error('room required to connect');
 
@@ -58,14 +68,20 @@ class WSClient {
     }
 
     // Tworzymy nową instancję
-    const socket = new WebSocket(url);
+    // Lobby zostaje przy JSON; gra może wynegocjować binarny sub-protokół
+    const wantBinary = this.binary && this.room !== 'lobby';
+    const socket = wantBinary ? new WebSocket(url, [SUBPROTOCOL]) : new WebSocket(url);
+    socket.binaryType = 'arraybuffer';
     this.ws = socket;
+    this.useBinary = false;
 
     socket.onopen = () => {
       // Sprawdź czy ten socket to nadal "TEN" aktualny socket
       if (this.ws !== socket) return; 
 
       this.connected = true;
+      // Serwer bez obsługi msgpack odpowiada bez sub-protokołu -> zostajemy przy JSON
+      this.useBinary = socket.protocol === SUBPROTOCOL;
       this.emit('open');
       if (this.reconnectTimeout) {
         clearTimeout(this.reconnectTimeout);
@@ -77,7 +93,9 @@ class WSClient {
       if (this.ws !== socket) return; // Ignoruj wiadomości ze starych socketów
 
       let msg;
-      try { msg = JSON.parse(ev.data); } catch (e) { this.emit('malformed', ev.data); return; }
+      try {
+        msg = typeof ev.data === 'string' ? JSON.parse(ev.data) : decodeMessage(ev.data);
+      } catch (e) { this.emit('malformed', ev.data); return; }
       this.emit('message', msg);
       if (msg.type) this.emit(msg.type, msg);
     };
@@ -129,7 +147,7 @@ class WSClient {
       this.emit('send_failed', obj);
       return false;
     }
-    this.ws.send(JSON.stringify(obj));
+    this.ws.send(this.useBinary ? encodeMessage(obj) : JSON.stringify(obj));
     return true;
   }
 
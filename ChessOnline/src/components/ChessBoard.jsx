@@ -157,6 +157,8 @@ export default function ChessBoard({
   }, [chatMessages]);
 
   const shouldConnect = useRef(true);
+  // Numer ostatniego zastosowanego ruchu (protokół v2) - luka w numeracji => prosimy o snapshot
+  const seqRef = useRef(null);
 
   useEffect(() => {
     // Nie odliczamy jeśli gra się skończyła lub nie zaczęła (brak historii ruchów, opcjonalnie)
@@ -181,8 +183,11 @@ export default function ChessBoard({
   }, [turn, gameOverReason, history.length]);
 
   useEffect(() => {
+    // Po zerwaniu połączenia wznawiamy od ostatniego ruchu zamiast pobierać cały stan
+    wsClient.resumeSeq = () => seqRef.current;
     try {
-      wsClient.connect({ host: wsHost, room: defaultRoom });
+      // Binarny protokół (mniej bajtów na ruch) - opcjonalny, włączany w localStorage
+      wsClient.connect({ host: wsHost, room: defaultRoom, binary: localStorage.getItem('ws_protocol') === 'msgpack' });
     } catch (e) {
       console.warn('wsClient.connect error:', e);
     }
@@ -242,9 +247,15 @@ export default function ChessBoard({
     const unsubOpen = wsClient.on('open', () => setConnected(true));
     const unsubClose = wsClient.on('close', () => setConnected(false));
 
-    const unsubGameOver = wsClient.on('game_over', (msg) => {
-        if (msg.state) updateGameState(msg.state);
-    });
+    // Pełny stan (connected / sync / game_over) - zastępuje wszystko, co mamy lokalnie
+    const applySnapshot = (msg) => {
+        if (!msg.state) return;
+        updateGameState(msg.state.state || msg.state);
+        if (typeof msg.seq === 'number') seqRef.current = msg.seq;
+    };
+
+    const unsubGameOver = wsClient.on('game_over', applySnapshot);
+    const unsubSync = wsClient.on('sync', applySnapshot);
 
     // 4. ODBIÓR PROPOZYCJI REMISU
     const unsubDrawOffer = wsClient.on('draw_offer', (msg) => {
@@ -290,19 +301,42 @@ export default function ChessBoard({
     // 1. ODBIÓR STANU PRZY POŁĄCZENIU
     const unsubConnected = wsClient.on('connected', (msg) => {
       console.log("Connected msg:", msg);
-      if (msg.state) {
-          const s = msg.state.state || msg.state;
-          updateGameState(s);
-      }
+      applySnapshot(msg);
       if (msg.players && Array.isArray(msg.players)) {
           setPlayers(msg.players);
       }
     });
 
+    // Wznowienie: serwer dośle brakujące ruchy (zwykłe wiadomości "move" / "game_over")
+    const unsubResumed = wsClient.on('resumed', (msg) => {
+      console.log("Resumed from seq:", msg.seq);
+    });
+
     // 2. ODBIÓR RUCHU
     const unsubMove = wsClient.on('move', (msg) => {
       console.log("Move msg:", msg);
-      
+
+      // Protokół v2: delta (zmienione pola + flagi), bez planszy, historii i legalnych ruchów -
+      // te serwer wysyła zaraz potem osobno ("legal_moves") tylko graczowi, który jest na ruchu
+      if (msg.v === 2) {
+          if (seqRef.current === null || msg.seq > seqRef.current + 1) {
+              // Zgubiliśmy ruch (albo nie mamy jeszcze stanu) - poproś o pełny snapshot
+              wsClient.send({ type: 'sync_request' });
+              return;
+          }
+          if (msg.seq <= seqRef.current) return; // duplikat / stara wiadomość
+          seqRef.current = msg.seq;
+
+          setBoard(prev => {
+              const next = prev.map(row => row.slice());
+              for (const [r, c, piece] of msg.changes || []) next[r][c] = piece;
+              return next;
+          });
+          setHistory(prev => [...prev, msg.move.san]);
+          updateGameState({ ...msg, board: null, moves: null });
+          return;
+      }
+
       const moveData = msg.move || {};
       const s = moveData.state || msg.state || {}; // fallback
       const stateObj = s.state || s; 
@@ -336,9 +370,12 @@ export default function ChessBoard({
       unsubMove(); 
       unsubLegal();
       unsubGameOver();
+      unsubSync();
       unsubDrawOffer();
       unsubDrawRejected();
       unsubChat();
+      unsubResumed();
+      wsClient.resumeSeq = null;
       try { wsClient.disconnect(); } catch (e) { /* ignore */ }
     };
   }, []);
@@ -1,5 +1,5 @@
 // src/pages/RoomsPage.jsx
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import wsClient from "../api/wsClient";
 import "../styles/rooms.css"; // stwórz style wg siebie
@@ -51,6 +51,8 @@ export default function RoomsPage({ wsHost }) {
   const [newRoomPass, setNewRoomPass] = useState("");
 
   const [searchTerm, setSearchTerm] = useState("");
+  // wersja listy pokoi z serwera (room_list / room_diff)
+  const versionRef = useRef(null);
 
   useEffect(() => {
     // Connect to lobby on mount
@@ -71,9 +73,38 @@ export default function RoomsPage({ wsHost }) {
     const unsubRoomList = wsClient.on("room_list", (msg) => {
       const arr = msg?.rooms ?? msg?.data ?? [];
       setRooms(Array.isArray(arr) ? arr : []);
+      if (typeof msg?.version === "number") versionRef.current = msg.version;
       setLoading(false);
     });
 
+    // Paczka zmian (co ~250 ms). Luka w wersjach -> prosimy o pełną listę.
+    const unsubRoomDiff = wsClient.on("room_diff", (msg) => {
+      if (versionRef.current === null) return; // czekamy na snapshot
+      if (msg.version <= versionRef.current) return;
+      if (msg.version !== versionRef.current + 1) {
+        versionRef.current = null;
+        wsClient.send({ type: "lobby_subscribe" });
+        return;
+      }
+      versionRef.current = msg.version;
+      const removed = new Set(msg.remove || []);
+      const upserts = msg.upsert || [];
+      // updater bez efektów ubocznych (StrictMode woła go dwa razy) - mapa budowana w środku
+      setRooms(prev => {
+        const added = new Map(upserts.map(r => [r.name, r]));
+        const next = prev
+          .filter(r => !removed.has(r.name))
+          .map(r => {
+            const u = added.get(r.name);
+            if (!u) return r;
+            added.delete(r.name);
+            return { ...r, ...u };
+          });
+        // nowe pokoje na górę listy
+        return [...added.values(), ...next];
+      });
+    });
+
     const unsubRoomUpdate = wsClient.on("room_update", (msg) => {
       // msg.room = {name, players, max_players, has_password, status}
       const r = msg?.room;
@@ -118,7 +149,7 @@ export default function RoomsPage({ wsHost }) {
 
     return () => {
       unsubOpen(); unsubClose();
-      unsubRoomList(); unsubRoomUpdate(); unsubRoomCreated(); unsubJoined();
+      unsubRoomList(); unsubRoomDiff(); unsubRoomUpdate(); unsubRoomCreated(); unsubJoined();
       unsubError();
       // don't disconnect here if other parts of the app rely on wsClient. If you want to disconnect:
       try { wsClient.disconnect(); } catch(e) {}
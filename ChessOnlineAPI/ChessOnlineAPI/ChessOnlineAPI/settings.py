@@ -62,6 +62,7 @@ SITE_ID = 1
 REST_USE_JWT = True
 
 MIDDLEWARE = [
+    'myapp.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -195,6 +196,106 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Silnik szachowy: "board" (macierz figur) albo "bitboard" (szybsze generowanie ruchów)
+CHESS_ENGINE_BACKEND = "board"
+
+# Liczba pozycji w cache legalnych ruchów (0 wyłącza cache)
+CHESS_MOVE_CACHE_SIZE = 20000
+
+# Sesje partii trzymane w pamięci: maks. liczba pokoi i czas bezczynności (s) do usunięcia
+GAME_SESSION_MAX = 500
+GAME_SESSION_IDLE_TIMEOUT = 900
+
+# Pula dla pracy silnika: "thread" albo "process", liczba workerów i maks. liczba ruchów w kolejce
+ENGINE_EXECUTOR = "thread"
+ENGINE_EXECUTOR_WORKERS = 4
+ENGINE_EXECUTOR_MAX_QUEUE = 64
+
+# Lobby: zmiany listy pokoi wysyłane paczkami co tyle sekund; maks. liczba pokoi w snapshocie
+LOBBY_BROADCAST_INTERVAL = 0.25
+LOBBY_ROOM_LIMIT = 200
+
+# Kolejka quick_match: kubełki ELO, początkowe okno różnicy rankingu, przyrost okna na sekundę czekania, maks. okno
+MATCHMAKING_BUCKET_SIZE = 100
+MATCHMAKING_BASE_WINDOW = 100
+MATCHMAKING_WINDOW_GROWTH = 25
+MATCHMAKING_MAX_WINDOW = 800
+
+# Dziennik ruchów: pełny zapis stanu partii (checkpoint) co tyle półruchów, pomiędzy tylko wiersze GameMove
+GAME_CHECKPOINT_INTERVAL = 20
+
+# Tryb write-behind: ruch potwierdzany po zapisie do lokalnego pliku (fsync), do bazy paczkami w tle
+# co tyle ms albo po tylu ruchach; niewpisane ruchy odtwarzane z pliku przy starcie. Plik per proces
+# (pid w nazwie: move_journal.<pid>.log); tylko z ENGINE_EXECUTOR = "thread"
+GAME_WRITE_BEHIND = False
+GAME_WRITE_BEHIND_PATH = BASE_DIR / 'move_journal.log'
+GAME_WRITE_BEHIND_INTERVAL_MS = 200
+GAME_WRITE_BEHIND_MAX_MOVES = 100
+
+# Bufor powtórek: tyle ostatnich zdarzeń pokoju (ruchy, koniec gry) do wznowienia po reconnect
+GAME_REPLAY_BUFFER_SIZE = 64
+
+# Cache użytkowników z tokenów WebSocket: maks. liczba wpisów i czas życia (s)
+WS_USER_CACHE_SIZE = 10000
+WS_USER_CACHE_TTL = 60
+
+# /metrics/ (Prometheus): jeśli ustawiony, wymagany nagłówek "Authorization: Bearer <token>";
+# pusty - endpoint dostępny tylko przy DEBUG
+METRICS_TOKEN = ''
+
+# Śledzenie ruchów: trace dłuższe niż TRACE_SLOW_MS trafiają do bufora (/traces/slow/, admin)
+# i - jeśli TRACE_FILE jest ustawiony (np. BASE_DIR / 'chess_traces.jsonl') - do pliku (JSON w liniach)
+TRACE_ENABLED = True
+TRACE_SLOW_MS = 100
+TRACE_BUFFER_SIZE = 200
+TRACE_FILE = ''
+
+# Glicko-2 (obok ELO): tau ogranicza zmiany zmienności (0.3-1.2); okres rankingowy przeliczania
+# wsadowego (recompute_ratings) w dniach - przy zapisie wyniku okresem jest pojedyncza partia
+GLICKO_TAU = 0.5
+GLICKO_PERIOD_DAYS = 1
+
+# Logger "chess": pętla zdarzeń tylko wkłada rekord do kolejki (maks. CHESS_LOG_QUEUE_SIZE, nadmiar odrzucany),
+# plik z rotacją i konsolę zapisuje wątek w tle; powtarzalne komunikaty poniżej ERROR ograniczone
+# do CHESS_LOG_RATE_BURST na szablon na sekundę (0 wyłącza limit). Przy ENGINE_EXECUTOR = "process"
+# plik pisze (i rotuje) tylko proces główny - workery odsyłają mu rekordy przez kolejkę multiprocessing
+CHESS_LOG_FILE = BASE_DIR / 'chess_debug.log'
+CHESS_LOG_MAX_BYTES = 10 * 1024 * 1024
+CHESS_LOG_BACKUP_COUNT = 5
+CHESS_LOG_QUEUE_SIZE = 10000
+CHESS_LOG_RATE_BURST = 20
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'chess_rate_limit': {
+            '()': 'myapp.log_handlers.RateLimitFilter',
+            'burst': CHESS_LOG_RATE_BURST,
+            'per': 1.0,
+        },
+    },
+    'handlers': {
+        'chess_queue': {
+            '()': 'myapp.log_handlers.QueueLogHandler',
+            'filename': str(CHESS_LOG_FILE),
+            'max_bytes': CHESS_LOG_MAX_BYTES,
+            'backup_count': CHESS_LOG_BACKUP_COUNT,
+            'file_level': 'DEBUG',
+            'console_level': 'INFO',
+            'queue_size': CHESS_LOG_QUEUE_SIZE,
+            'filters': ['chess_rate_limit'],
+        },
+    },
+    'loggers': {
+        'chess': {
+            'handlers': ['chess_queue'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.conf import settings
+        from .chess_engine.Game_Manager import ChessGameManager
+        from .chess_engine.utils.MoveCache import legal_move_cache
+
+        if getattr(settings, 'CHESS_ENGINE_BACKEND', 'board') == 'bitboard':
+            from .chess_engine.BitBoard import BitBoard
+            ChessGameManager.board_class = BitBoard
+
+        legal_move_cache.resize(getattr(settings, 'CHESS_MOVE_CACHE_SIZE', 20000))
@@ -0,0 +1,532 @@
+from .pieces.Pawn import Pawn
+from .pieces.Rook import Rook
+from .pieces.Knight import Knight
+from .pieces.Bishop import Bishop
+from .pieces.King import King
+from .pieces.Queen import Queen
+from .utils.Move import Move, disambiguate_notations
+from .utils.Castling import CastlingRules
+from .utils.Zobrist import PIECE_KEYS, TYPE_BY_NAME, state_hash
+from .utils.MoveCache import legal_move_cache, unpack_move
+from .utils.Fen import board_to_fen, load_fen
+from .utils.Bitboards import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    FULL, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, BISHOP_LINES, ROOK_LINES,
+    bishop_attacks, rook_attacks, queen_attacks, iter_bits, lsb,
+)
+
+COLOR_NAMES = ('Bialy', 'Czarny')
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+PROMOTION_TYPES = {'H': QUEEN, 'W': ROOK, 'S': KNIGHT, 'G': BISHOP}
+
+BACK_RANK = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+
+# Jedna instancja figury na (kolor, typ, pole). Widok `board` i ruchy tylko je czytają,
+# więc nie tworzymy nowych obiektów przy każdym ruchu.
+_FIGURES = [
+    [[cls(COLOR_NAMES[color], sq // 8, sq % 8) for sq in range(64)] for cls in PIECE_CLASSES]
+    for color in (WHITE, BLACK)
+]
+
+
+# (wiersz, kolumna) każdego pola - zamiast divmod przy każdym ruchu
+_COORDS = [divmod(sq, 8) for sq in range(64)]
+
+RANK_3 = 0xFF << 40   # pola, na które białe piony wchodzą pierwszym krokiem (wiersz 5)
+RANK_6 = 0xFF << 16   # to samo dla czarnych (wiersz 2)
+NOT_FILE_A = sum(1 << sq for sq in range(64) if sq % 8 != 0)
+NOT_FILE_H = sum(1 << sq for sq in range(64) if sq % 8 != 7)
+
+
+class BitMove(Move):
+    """
+    Ruch wygenerowany przez BitBoard - utils.Move z indeksami pól dla masek.
+    Figury dostaje gotowe od generatora, więc konstruktor tylko przypisuje pola.
+    """
+    __slots__ = ('from_sq', 'to_sq')
+
+    def __init__(self, from_sq, to_sq, moved_figure, caught_figure=None, castling=False, en_passant=False):
+        self.from_sq = from_sq
+        self.to_sq = to_sq
+        self.start_x, self.start_y = _COORDS[from_sq]
+        self.dest_x, self.dest_y = _COORDS[to_sq]
+        self.moved_figure = moved_figure
+        self.caught_figure = caught_figure
+        self.castling = castling
+        self.czy_en_passant = en_passant
+        self.promotion = False
+        self._notation = None
+        self._user_notation = None
+
+
+class BitBoard:
+    """
+    Pozycja trzymana w bitboardach (po jednej 64-bitowej masce na kolor i typ figury).
+    Zachowuje interfejs Board, więc ChessGameManager może jej używać zamiast Board.
+    """
+
+    def __init__(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.squares = [None] * 64
+        self._piece_hash = 0
+        self.move_history = []
+        self._undo_stack = []
+        self._grid = [[None] * 8 for _ in range(8)]
+        self.white_to_move = True
+        self.checkmate = False
+        self.stalemate = False
+        self.check = False
+        self.pawn_promotion = False
+        self.castling_move = CastlingRules(True, True, True, True)
+        self.castling_history = [CastlingRules(self.castling_move.cH, self.castling_move.cK, self.castling_move.bH, self.castling_move.bK)]
+        self.you = "B"
+        self.opponent = "C"
+        self.en_passant_pos = ()
+        self.start_halfmove_clock = 0
+        self.start_fullmove_number = 1
+
+        for column, piece in enumerate(BACK_RANK):
+            self._put(BLACK, piece, column)
+            self._put(BLACK, PAWN, 8 + column)
+            self._put(WHITE, PAWN, 48 + column)
+            self._put(WHITE, piece, 56 + column)
+
+    # --- operacje na maskach ---
+
+    def _put(self, color, piece, sq):
+        bit = 1 << sq
+        self.pieces[color][piece] |= bit
+        self.occupied[color] |= bit
+        self.squares[sq] = (color, piece)
+        self._grid[sq >> 3][sq & 7] = _FIGURES[color][piece][sq]
+        self._piece_hash ^= PIECE_KEYS[color][piece][sq]
+
+    def _remove(self, sq):
+        color, piece = self.squares[sq]
+        mask = ~(1 << sq)
+        self.pieces[color][piece] &= mask
+        self.occupied[color] &= mask
+        self.squares[sq] = None
+        self._grid[sq >> 3][sq & 7] = None
+        self._piece_hash ^= PIECE_KEYS[color][piece][sq]
+        return color, piece
+
+    def _clear(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.squares = [None] * 64
+        self._piece_hash = 0
+        self._grid = [[None] * 8 for _ in range(8)]
+
+    # --- widok zgodny z Board ---
+
+    @property
+    def board(self):
+        # Macierz 8x8 figur jak w Board.board (tylko do odczytu, aktualizowana w _put/_remove)
+        return self._grid
+
+    @board.setter
+    def board(self, grid):
+        self._clear()
+        for r, row in enumerate(grid):
+            for c, figure in enumerate(row):
+                if figure is not None:
+                    color = WHITE if figure.color == 'Bialy' else BLACK
+                    self._put(color, TYPE_BY_NAME[figure.name], r * 8 + c)
+
+    @classmethod
+    def from_fen(cls, fen):
+        return load_fen(cls(), fen)
+
+    def to_fen(self):
+        return board_to_fen(self)
+
+    def zobrist_hash(self):
+        return self._piece_hash ^ state_hash(self.white_to_move, self.castling_move, self.en_passant_pos)
+
+    def _king_pos(self, color):
+        king = self.pieces[color][KING]
+        return divmod(lsb(king), 8) if king else ()
+
+    @property
+    def white_king_pos(self):
+        return self._king_pos(WHITE)
+
+    @white_king_pos.setter
+    def white_king_pos(self, value):
+        # Pozycja króla wynika z masek - setter zostaje dla zgodności z Board
+        pass
+
+    @property
+    def black_king_pos(self):
+        return self._king_pos(BLACK)
+
+    @black_king_pos.setter
+    def black_king_pos(self, value):
+        pass
+
+    # --- ataki ---
+
+    def _attacked(self, sq, by, occupied, removed=0):
+        pieces = self.pieces[by]
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT] & ~removed:
+            return True
+        if PAWN_ATTACKS[1 - by][sq] & pieces[PAWN] & ~removed:
+            return True
+        if KING_ATTACKS[sq] & pieces[KING]:
+            return True
+        # promień liczymy tylko, gdy na linii z pola w ogóle stoi goniec / wieża / hetman
+        diagonal = (pieces[BISHOP] | pieces[QUEEN]) & ~removed & BISHOP_LINES[sq]
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        straight = (pieces[ROOK] | pieces[QUEEN]) & ~removed & ROOK_LINES[sq]
+        if straight and rook_attacks(sq, occupied) & straight:
+            return True
+        return False
+
+    def if_field_under_attack(self, r, c):
+        by = BLACK if self.white_to_move else WHITE
+        return self._attacked(r * 8 + c, by, self.occupied[WHITE] | self.occupied[BLACK])
+
+    def if_check(self, color):
+        us = WHITE if color == 'Bialy' else BLACK
+        king = self.pieces[us][KING]
+        if not king:
+            return False
+        return self._attacked(lsb(king), 1 - us, self.occupied[WHITE] | self.occupied[BLACK])
+
+    # --- generowanie ruchów ---
+
+    def generate_moves(self):
+        # ruchy pseudolegalne (bez sprawdzania szacha i bez roszad), jak Board.generate_moves
+        us = WHITE if self.white_to_move else BLACK
+        own = self.occupied[us]
+        occupied = own | self.occupied[1 - us]
+        moves = []
+        self._pawn_moves(us, moves, FULL & ~own, {}, 0)
+        if self.en_passant_pos:
+            self._en_passant_moves(us, None, moves)
+        self._piece_moves(us, moves, FULL & ~own, {}, 0, occupied, (KNIGHT, BISHOP, ROOK, QUEEN, KING))
+        return moves
+
+    def _pawn_moves(self, us, moves, target, pins, pinned):
+        """
+        Ruchy pionów (bez bicia w przelocie) liczone na maskach wszystkich pionów naraz.
+        target - dozwolone pola docelowe, pinned / pins - maska związanych pionów i ich linie.
+        """
+        pawns = self.pieces[us][PAWN]
+        enemy = self.occupied[1 - us]
+        empty = FULL & ~(self.occupied[us] | enemy)
+        if us == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_3) >> 8) & empty
+            left = ((pawns & NOT_FILE_A) >> 9) & enemy
+            right = ((pawns & NOT_FILE_H) >> 7) & enemy
+            steps = (8, 16, 9, 7)
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_6) << 8) & empty
+            left = ((pawns & NOT_FILE_A) << 7) & enemy
+            right = ((pawns & NOT_FILE_H) << 9) & enemy
+            steps = (-8, -16, -7, -9)
+
+        figures = _FIGURES[us][PAWN]
+        grid = self._grid
+        # pole startowe = pole docelowe + krok
+        for targets, step in zip((single, double, left, right), steps):
+            targets &= target
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                to = low.bit_length() - 1
+                sq = to + step
+                if (pinned >> sq) & 1 and not (pins[sq] >> to) & 1:
+                    continue
+                moves.append(BitMove(sq, to, figures[sq], grid[to >> 3][to & 7]))
+
+    def _en_passant_moves(self, us, king_sq, moves):
+        to = self.en_passant_pos[0] * 8 + self.en_passant_pos[1]
+        them = 1 - us
+        cap_sq = to + 8 if us == WHITE else to - 8
+        if self.squares[cap_sq] != (them, PAWN):
+            return
+        figures = _FIGURES[us][PAWN]
+        caught = _FIGURES[them][PAWN][cap_sq]
+        # piony, które biją pole `to`, stoją tam, gdzie biłby z niego pion przeciwnika
+        for sq in iter_bits(PAWN_ATTACKS[them][to] & self.pieces[us][PAWN]):
+            if king_sq is None or self._en_passant_is_legal(sq, to, cap_sq, us, king_sq):
+                moves.append(BitMove(sq, to, figures[sq], caught, en_passant=True))
+
+    def _en_passant_is_legal(self, from_sq, to_sq, cap_sq, us, king_sq):
+        # bicie w przelocie zdejmuje dwa piony z jednego rzędu - sprawdzamy szacha wprost
+        # na maskach "po ruchu", bez wykonywania ruchu na planszy
+        occupied = (self.occupied[WHITE] | self.occupied[BLACK]) & ~(1 << from_sq) & ~(1 << cap_sq) | (1 << to_sq)
+        return not self._attacked(king_sq, 1 - us, occupied, 1 << cap_sq)
+
+    def _piece_moves(self, us, moves, target, pins, pinned, occupied, types):
+        """
+        Ruchy figur z `types` na pola z maski target. Zwraca True, gdy dwie figury tego samego typu
+        mogą wejść na to samo pole - tylko wtedy notacje trzeba rozróżniać (disambiguate_notations).
+        """
+        pieces = self.pieces[us]
+        grid = self._grid
+        ambiguous = False
+        for piece in types:
+            bb = pieces[piece]
+            figures = _FIGURES[us][piece]
+            seen = 0
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                sq = low.bit_length() - 1
+                if piece == KNIGHT:
+                    targets = KNIGHT_ATTACKS[sq]
+                elif piece == BISHOP:
+                    targets = bishop_attacks(sq, occupied)
+                elif piece == ROOK:
+                    targets = rook_attacks(sq, occupied)
+                elif piece == QUEEN:
+                    targets = queen_attacks(sq, occupied)
+                else:
+                    targets = KING_ATTACKS[sq]
+                targets &= target
+                if (pinned >> sq) & 1:
+                    targets &= pins[sq]
+                if targets & seen:
+                    ambiguous = True
+                seen |= targets
+                figure = figures[sq]
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    to = low.bit_length() - 1
+                    moves.append(BitMove(sq, to, figure, grid[to >> 3][to & 7]))
+        return ambiguous
+
+    def _castling_moves(self, us):
+        # wołane tylko bez szacha, więc pola króla nie trzeba sprawdzać jeszcze raz
+        moves = []
+        rules = self.castling_move
+        king_side = rules.bK if us == WHITE else rules.cK
+        queen_side = rules.bH if us == WHITE else rules.cH
+        home = 60 if us == WHITE else 4
+        if not (king_side or queen_side) or self.pieces[us][KING] != 1 << home:
+            return moves
+        them = 1 - us
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        rooks = self.pieces[us][ROOK]
+        figure = _FIGURES[us][KING][home]
+
+        if king_side and (rooks >> (home + 3)) & 1 and not occupied & (0b11 << (home + 1)):
+            if not self._attacked(home + 1, them, occupied) and not self._attacked(home + 2, them, occupied):
+                moves.append(BitMove(home, home + 2, figure, castling=True))
+
+        if queen_side and (rooks >> (home - 4)) & 1 and not occupied & (0b111 << (home - 3)):
+            if not self._attacked(home - 1, them, occupied) and not self._attacked(home - 2, them, occupied):
+                moves.append(BitMove(home, home - 2, figure, castling=True))
+        return moves
+
+    def _checks_and_pins(self, us, king_sq, occupied):
+        """
+        Zwraca (checkers, pins): maskę szachujących figur oraz
+        {pole związanej figury: maska pól, po których może się ruszać}.
+        """
+        enemy = self.pieces[1 - us]
+        diagonal = enemy[BISHOP] | enemy[QUEEN]
+        straight = enemy[ROOK] | enemy[QUEEN]
+        checkers = (KNIGHT_ATTACKS[king_sq] & enemy[KNIGHT]) | (PAWN_ATTACKS[us][king_sq] & enemy[PAWN])
+
+        pins = {}
+        own = self.occupied[us]
+        # figury dalekiego zasięgu na linii z królem: nic pomiędzy -> szach, jedna nasza -> związanie
+        snipers = (BISHOP_LINES[king_sq] & diagonal) | (ROOK_LINES[king_sq] & straight)
+        for sniper in iter_bits(snipers):
+            between = BETWEEN[king_sq][sniper]
+            blockers = between & occupied
+            if not blockers:
+                checkers |= 1 << sniper
+            elif not blockers & (blockers - 1) and blockers & own:
+                pins[lsb(blockers)] = between | (1 << sniper)
+        return checkers, pins
+
+    def _legal_moves(self, us, king_sq):
+        """Zwraca (ruchy, checkers, czy notacje mogą być niejednoznaczne)."""
+        them = 1 - us
+        own = self.occupied[us]
+        occupied = own | self.occupied[them]
+        grid = self._grid
+        moves = []
+
+        checkers, pins = self._checks_and_pins(us, king_sq, occupied)
+
+        # król - bez niego na planszy, żeby nie zasłaniał promienia szachującej figury
+        king = _FIGURES[us][KING][king_sq]
+        without_king = occupied & ~(1 << king_sq)
+        targets = KING_ATTACKS[king_sq] & ~own
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            to = low.bit_length() - 1
+            if not self._attacked(to, them, without_king, low):
+                moves.append(BitMove(king_sq, to, king, grid[to >> 3][to & 7]))
+
+        if checkers & (checkers - 1):
+            # podwójny szach - rusza się tylko król
+            return moves, checkers, False
+        if checkers:
+            target = BETWEEN[king_sq][lsb(checkers)] | checkers
+        else:
+            target = FULL & ~own
+
+        pinned = 0
+        for sq in pins:
+            pinned |= 1 << sq
+
+        self._pawn_moves(us, moves, target, pins, pinned)
+        if self.en_passant_pos:
+            self._en_passant_moves(us, king_sq, moves)
+        ambiguous = self._piece_moves(us, moves, target, pins, pinned, occupied, (KNIGHT, BISHOP, ROOK, QUEEN))
+
+        if not checkers:
+            moves += self._castling_moves(us)
+        return moves, checkers, ambiguous
+
+    def _moves_from_cache(self, entry):
+        packed, overrides, self.checkmate, self.stalemate, self.check = entry
+        grid = self._grid
+        moves = []
+        for index, code in enumerate(packed):
+            start_x, start_y, dest_x, dest_y, castling, en_passant = unpack_move(code)
+            caught = grid[start_x][dest_y] if en_passant else grid[dest_x][dest_y]
+            move = BitMove(start_x * 8 + start_y, dest_x * 8 + dest_y, grid[start_x][start_y], caught,
+                           castling, en_passant)
+            if index in overrides:
+                move.user_notation = overrides[index]
+            moves.append(move)
+        return moves
+
+    def update_moves(self):
+        key = None
+        if legal_move_cache.maxsize > 0:
+            key = self.zobrist_hash()
+            cached = legal_move_cache.get(key)
+            if cached is not None:
+                return self._moves_from_cache(cached)
+
+        us = WHITE if self.white_to_move else BLACK
+        king = self.pieces[us][KING]
+        if king:
+            moves, checkers, ambiguous = self._legal_moves(us, lsb(king))
+        else:
+            moves, checkers, ambiguous = self.generate_moves(), 0, True
+
+        if len(moves) == 0:
+            if checkers:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+        else:
+            self.checkmate = False
+            self.stalemate = False
+        self.check = bool(checkers)
+
+        if ambiguous:
+            disambiguate_notations(moves)
+
+        if key is not None:
+            legal_move_cache.put(key, moves, self.checkmate, self.stalemate, self.check)
+        return moves
+
+    # --- wykonywanie ruchów ---
+
+    def _update_castling_rights(self, from_sq, to_sq, piece, color):
+        rules = self.castling_move
+        if piece == KING:
+            if color == WHITE:
+                rules.bK = rules.bH = False
+            else:
+                rules.cK = rules.cH = False
+        # ruch wieży z narożnika albo zbicie wieży w narożniku
+        for sq in (from_sq, to_sq):
+            if sq == 63:
+                rules.bK = False
+            elif sq == 56:
+                rules.bH = False
+            elif sq == 7:
+                rules.cK = False
+            elif sq == 0:
+                rules.cH = False
+
+    def make_move(self, move):
+        from_sq = move.start_x * 8 + move.start_y
+        to_sq = move.dest_x * 8 + move.dest_y
+        cap_sq = to_sq
+        if move.czy_en_passant:
+            cap_sq = move.start_x * 8 + move.dest_y
+
+        captured = self._remove(cap_sq) if self.squares[cap_sq] is not None else None
+        color, piece = self._remove(from_sq)
+        self._put(color, piece, to_sq)
+
+        if move.castling:
+            if to_sq > from_sq:
+                self._put(*self._remove(to_sq + 1), to_sq - 1)
+            else:
+                self._put(*self._remove(to_sq - 2), to_sq + 1)
+
+        self._undo_stack.append((color, piece, captured, cap_sq, self.en_passant_pos))
+        self.move_history.append(move)
+        self.white_to_move = not self.white_to_move
+
+        if piece == PAWN and abs(move.dest_x - move.start_x) == 2:
+            self.en_passant_pos = ((move.start_x + move.dest_x) // 2, move.start_y)
+        else:
+            self.en_passant_pos = ()
+
+        self._update_castling_rights(from_sq, to_sq, piece, color)
+        self.castling_history.append(CastlingRules(self.castling_move.cH, self.castling_move.cK, self.castling_move.bH, self.castling_move.bK))
+
+    def undo_move(self):
+        if len(self.move_history) == 0:
+            return
+        move = self.move_history.pop()
+        color, piece, captured, cap_sq, en_passant_pos = self._undo_stack.pop()
+        from_sq = move.start_x * 8 + move.start_y
+        to_sq = move.dest_x * 8 + move.dest_y
+
+        # _remove zdejmuje też ewentualnie wypromowaną figurę
+        self._remove(to_sq)
+        self._put(color, piece, from_sq)
+        if captured is not None:
+            self._put(captured[0], captured[1], cap_sq)
+
+        if move.castling:
+            if to_sq > from_sq:
+                self._put(*self._remove(to_sq - 1), to_sq + 1)
+            else:
+                self._put(*self._remove(to_sq + 1), to_sq - 2)
+
+        self.white_to_move = not self.white_to_move
+        self.en_passant_pos = en_passant_pos
+
+        self.castling_history.pop()
+        new_rules = self.castling_history[-1]
+        self.castling_move = CastlingRules(new_rules.cH, new_rules.cK, new_rules.bH, new_rules.bK)
+
+    def promotion(self):
+        if len(self.move_history) != 0:
+            last_move = self.move_history[-1]
+            entry = self.squares[last_move.dest_x * 8 + last_move.dest_y]
+            if entry is not None and entry[1] == PAWN and last_move.dest_x == (0 if entry[0] == WHITE else 7):
+                self.pawn_promotion = True
+                last_move.promotion = True
+
+    def promote_pawn(self, promotion_type):
+        if promotion_type not in PROMOTION_TYPES:
+            return
+        last_move = self.move_history[-1]
+        sq = last_move.dest_x * 8 + last_move.dest_y
+        color, piece = self._remove(sq)
+        self._put(color, PROMOTION_TYPES[promotion_type], sq)
+        last_move.user_notation += promotion_type
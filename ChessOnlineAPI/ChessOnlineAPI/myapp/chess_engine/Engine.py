@@ -4,8 +4,45 @@ from .pieces.Knight import Knight
 from .pieces.Bishop import Bishop
 from .pieces.King import King
 from .pieces.Queen import Queen
-from .utils.Move import Move
+from .utils.Move import Move, disambiguate_notations
 from .utils.Castling import CastlingRules
+from .utils.Zobrist import PIECE_KEYS, TYPE_BY_NAME, figure_key, grid_hash, state_hash
+from .utils.MoveCache import legal_move_cache, unpack_move
+from .utils.Fen import board_to_fen, load_fen
+
+
+def _targets(offsets):
+    table = [[None] * 8 for _ in range(8)]
+    for r in range(8):
+        for c in range(8):
+            table[r][c] = tuple((r + dr, c + dc) for dr, dc in offsets if 0 <= r + dr < 8 and 0 <= c + dc < 8)
+    return table
+
+
+def _rays(directions):
+    table = [[None] * 8 for _ in range(8)]
+    for r in range(8):
+        for c in range(8):
+            rays = []
+            for dr, dc in directions:
+                ray = []
+                rr, cc = r + dr, c + dc
+                while 0 <= rr < 8 and 0 <= cc < 8:
+                    ray.append((rr, cc))
+                    rr += dr
+                    cc += dc
+                if ray:
+                    rays.append(tuple(ray))
+            table[r][c] = tuple(rays)
+    return table
+
+
+# Pola, z których dana figura atakuje pole [r][c]
+_KNIGHT_TARGETS = _targets(((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2), (-1, -2)))
+_KING_TARGETS = _targets(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+_ROOK_RAYS = _rays(((-1, 0), (1, 0), (0, -1), (0, 1)))
+_BISHOP_RAYS = _rays(((-1, -1), (-1, 1), (1, -1), (1, 1)))
+
 
 class Board:
     def __init__(self):
@@ -31,43 +68,76 @@ class Board:
         self.you = "B"
         self.opponent = "C"
         self.en_passant_pos = ()
+        self.en_passant_history = []
+        self.check = False
+        # liczniki półruchów / ruchów z FEN-u, od którego zaczęła się pozycja
+        self.start_halfmove_clock = 0
+        self.start_fullmove_number = 1
+        # hash Zobrista samych figur; liczony od nowa, gdy ktoś podmieni self.board
+        self._piece_hash = 0
+        self._hashed_grid = None
+
+    @classmethod
+    def from_fen(cls, fen):
+        return load_fen(cls(), fen)
+
+    def to_fen(self):
+        return board_to_fen(self)
+
+    def zobrist_hash(self):
+        if self._hashed_grid is not self.board:
+            self._piece_hash = grid_hash(self.board)
+            self._hashed_grid = self.board
+        return self._piece_hash ^ state_hash(self.white_to_move, self.castling_move, self.en_passant_pos)
+
+    def _hash_move(self, move, landed):
+        # landed - figura, która po ruchu stoi na polu docelowym (pion albo figura z promocji)
+        h = figure_key(move.moved_figure, move.start_x, move.start_y) ^ figure_key(landed, move.dest_x, move.dest_y)
+        if move.caught_figure is not None:
+            cap_x = move.start_x if move.czy_en_passant else move.dest_x
+            h ^= figure_key(move.caught_figure, cap_x, move.dest_y)
+        if move.castling:
+            rook_keys = PIECE_KEYS[0 if move.moved_figure.color == 'Bialy' else 1][TYPE_BY_NAME['Wieza']]
+            row = move.dest_x * 8
+            if move.dest_y - move.start_y == 2:
+                h ^= rook_keys[row + move.dest_y + 1] ^ rook_keys[row + move.dest_y - 1]
+            else:
+                h ^= rook_keys[row + move.dest_y - 2] ^ rook_keys[row + move.dest_y + 1]
+        return h
+
+    def _moves_from_cache(self, entry):
+        packed, overrides, self.checkmate, self.stalemate, self.check = entry
+        moves = []
+        for index, code in enumerate(packed):
+            start_x, start_y, dest_x, dest_y, castling, en_passant = unpack_move(code)
+            move = Move((start_y, start_x), (dest_y, dest_x), self.board, castling=castling, en_passant=en_passant)
+            if index in overrides:
+                move.user_notation = overrides[index]
+            moves.append(move)
+        return moves
 
     def update_moves(self):
-        temp_en_passant_rules = self.en_passant_pos
-        temp_castling_rules = CastlingRules(self.castling_move.cH, self.castling_move.cK, self.castling_move.bH, self.castling_move.bK)
-
-        moves = self.generate_moves()
-        if self.white_to_move:
-            self.moves_with_castling(self.white_king_pos[0], self.white_king_pos[1], moves,
-                                     self.board[self.white_king_pos[0]][self.white_king_pos[1]].color)
-        else:
-            self.moves_with_castling(self.black_king_pos[0], self.black_king_pos[1], moves,
-                                     self.board[self.black_king_pos[0]][self.black_king_pos[1]].color)
+        key = None
+        if legal_move_cache.maxsize > 0:
+            key = self.zobrist_hash()
+            cached = legal_move_cache.get(key)
+            if cached is not None:
+                return self._moves_from_cache(cached)
 
         if self.white_to_move:
             color = 'Bialy'
+            king_r, king_c = self.white_king_pos
         else:
             color = 'Czarny'
+            king_r, king_c = self.black_king_pos
 
-        for move in range(len(moves) - 1, -1, -1):
-            self.make_move(moves[move])
-
-            if self.white_to_move:
-                self.white_to_move = False
-            else:
-                self.white_to_move = True
-
-            if self.if_check(color):
-                moves.remove(moves[move])
-
-            if self.white_to_move:
-                self.white_to_move = False
-            else:
-                self.white_to_move = True
+        # Szachujące figury i związania liczymy raz dla całej pozycji,
+        # dzięki temu od razu generujemy tylko legalne ruchy (bez make_move/undo_move)
+        checkers, pins = self._checks_and_pins(king_r, king_c, color)
+        moves = self._legal_moves(color, king_r, king_c, checkers, pins)
 
-            self.undo_move()
         if len(moves) == 0:
-            if self.if_check(color):
+            if checkers:
                 self.checkmate = True
             else:
                 self.stalemate = True
@@ -75,29 +145,124 @@ class Board:
             self.checkmate = False
             self.stalemate = False
 
-        self.en_passant_pos = temp_en_passant_rules        
-        self.castling_move = temp_castling_rules
+        self.check = bool(checkers)
+
+        disambiguate_notations(moves)
+
+        if key is not None:
+            legal_move_cache.put(key, moves, self.checkmate, self.stalemate, self.check)
 
-        for i in range(len(moves)):
-            for j in range(i + 1, len(moves)):
-                if moves[i].user_notation == moves[j].user_notation and moves[i].moved_figure.name != 'Pionek':
-                    piece_letter = moves[i].user_notation[0]
-
-                    # jeśli mają tę samą kolumnę -> rozróżniamy RZĘDEM (liczbą)
-                    if moves[i].start_y == moves[j].start_y:
-                        moves[i].user_notation = piece_letter + str(8 - moves[i].start_x) + moves[i].user_notation[1:]
-                        moves[j].user_notation = piece_letter + str(8 - moves[j].start_x) + moves[j].user_notation[1:]
-                    # jeśli mają ten sam rząd -> rozróżniamy KOLUMNĄ (literą)
-                    elif moves[i].start_x == moves[j].start_x:
-                        moves[i].user_notation = piece_letter + moves[i].dictionary[moves[i].start_y + 1] + moves[i].user_notation[1:]
-                        moves[j].user_notation = piece_letter + moves[j].dictionary[moves[j].start_y + 1] + moves[j].user_notation[1:]
-                    else:
-                        # różne rzędy i kolumny - wystarczy podać KOLUMNĘ (file) dla każdego
-                        moves[i].user_notation = piece_letter + moves[i].dictionary[moves[i].start_y + 1] + moves[i].user_notation[1:]
-                        moves[j].user_notation = piece_letter + moves[j].dictionary[moves[j].start_y + 1] + moves[j].user_notation[1:]
+        return moves
+
+    def _checks_and_pins(self, r, c, color):
+        """
+        Zwraca (checkers, pins):
+          checkers - lista zbiorów pól, na które można wejść, żeby zasłonić/zbić danego szachującego
+          pins     - {(r, c) związanej figury: zbiór pól, po których może się ruszać}
+        """
+        board = self.board
+        checkers = []
+        pins = {}
+
+        for rays, sliders in ((_ROOK_RAYS[r][c], ('Wieza', 'Hetman')), (_BISHOP_RAYS[r][c], ('Goniec', 'Hetman'))):
+            for ray in rays:
+                pinned = None
+                for i, (rr, cc) in enumerate(ray):
+                    piece = board[rr][cc]
+                    if piece is None:
+                        continue
+                    if piece.color == color:
+                        if pinned is not None:
+                            break
+                        pinned = (rr, cc)
+                        continue
+                    if piece.name in sliders:
+                        line = set(ray[:i + 1])
+                        if pinned is None:
+                            checkers.append(line)
+                        else:
+                            pins[pinned] = line
+                    break
+
+        for rr, cc in _KNIGHT_TARGETS[r][c]:
+            piece = board[rr][cc]
+            if piece is not None and piece.color != color and piece.name == 'Skoczek':
+                checkers.append({(rr, cc)})
+
+        # czarny pion szachuje białego króla z rzędu wyżej (r - 1) i odwrotnie
+        pawn_row = r - 1 if color == 'Bialy' else r + 1
+        if 0 <= pawn_row < 8:
+            for cc in (c - 1, c + 1):
+                if 0 <= cc < 8:
+                    piece = board[pawn_row][cc]
+                    if piece is not None and piece.color != color and piece.name == 'Pionek':
+                        checkers.append({(pawn_row, cc)})
+
+        return checkers, pins
+
+    def _legal_moves(self, color, king_r, king_c, checkers, pins):
+        board = self.board
+        enemy = 'Czarny' if color == 'Bialy' else 'Bialy'
+        # przy szachu inne figury mogą tylko zasłonić albo zbić; przy podwójnym - rusza się tylko król
+        evasions = checkers[0] if len(checkers) == 1 else None
+        only_king = len(checkers) > 1
+        moves = []
+
+        for r in range(8):
+            for c in range(8):
+                piece = board[r][c]
+                if piece is None or piece.color != color:
+                    continue
+
+                if piece.name == 'Krol':
+                    candidates = piece.generate_possible_moves(board)
+                    piece.move_list = []
+                    # król "znika" na czas sprawdzenia, żeby nie zasłaniał promienia szachującej figury
+                    board[r][c] = None
+                    for move in candidates:
+                        if not self.is_square_attacked(move.dest_x, move.dest_y, enemy):
+                            moves.append(move)
+                    board[r][c] = piece
+                    continue
+
+                if only_king:
+                    continue
+
+                if piece.name == 'Pionek':
+                    candidates = piece.generate_possible_moves(board, self.en_passant_pos)
+                else:
+                    candidates = piece.generate_possible_moves(board)
+                piece.move_list = []
+
+                allowed = pins.get((r, c))
+                for move in candidates:
+                    if move.czy_en_passant:
+                        # bicie w przelocie zdejmuje dwa piony z jednego rzędu - sprawdzamy wprost
+                        if self._en_passant_is_legal(move, color):
+                            moves.append(move)
+                        continue
+                    dest = (move.dest_x, move.dest_y)
+                    if allowed is not None and dest not in allowed:
+                        continue
+                    if evasions is not None and dest not in evasions:
+                        continue
+                    moves.append(move)
+
+        if not checkers and board[king_r][king_c] is not None:
+            self.moves_with_castling(king_r, king_c, moves, color)
 
         return moves
 
+    def _en_passant_is_legal(self, move, color):
+        temp_castling_rules = CastlingRules(self.castling_move.cH, self.castling_move.cK, self.castling_move.bH, self.castling_move.bK)
+        self.make_move(move)
+        self.white_to_move = not self.white_to_move
+        in_check = self.if_check(color)
+        self.white_to_move = not self.white_to_move
+        self.undo_move()
+        self.castling_move = temp_castling_rules
+        return not in_check
+
     def check_if_castling_possible(self, move):
         if move.moved_figure.name == 'Krol' and move.moved_figure.color == 'Bialy':
             self.castling_move.bK = False
@@ -118,54 +283,91 @@ class Board:
                 elif move.start_y == 7:
                     self.castling_move.cK = False
 
+        # zbicie wieży w narożniku też odbiera prawo do roszady
+        if (move.dest_x, move.dest_y) == (7, 0):
+            self.castling_move.bH = False
+        elif (move.dest_x, move.dest_y) == (7, 7):
+            self.castling_move.bK = False
+        elif (move.dest_x, move.dest_y) == (0, 0):
+            self.castling_move.cH = False
+        elif (move.dest_x, move.dest_y) == (0, 7):
+            self.castling_move.cK = False
+
     def moves_with_castling(self, r, c, accurate_moves, color):
+        home_row = 7 if color == 'Bialy' else 0
+        if (r, c) != (home_row, 4):
+            return
         if self.if_field_under_attack(r, c):
             return
         if (self.white_to_move and self.castling_move.bK) or (not self.white_to_move and self.castling_move.cK):
-            if self.board[r][c+1] is None and self.board[r][c+2] is None:
+            if self.board[r][c+1] is None and self.board[r][c+2] is None and self._is_own_rook(r, 7, color):
                 if not self.if_field_under_attack(r, c + 1) and not self.if_field_under_attack(r, c + 2):
                     accurate_moves.append(Move((c, r), (c + 2, r), self.board, castling=True))
 
         if (self.white_to_move and self.castling_move.bH) or (not self.white_to_move and self.castling_move.cH):
-            if self.board[r][c-1] is None and self.board[r][c-2] is None and self.board[r][c-3] is None:
+            if self.board[r][c-1] is None and self.board[r][c-2] is None and self.board[r][c-3] is None and self._is_own_rook(r, 0, color):
                 if not self.if_field_under_attack(r, c - 1) and not self.if_field_under_attack(r, c - 2):
                     accurate_moves.append(Move((c, r), (c - 2, r), self.board, castling=True))
 
+    def _is_own_rook(self, r, c, color):
+        piece = self.board[r][c]
+        return piece is not None and piece.name == 'Wieza' and piece.color == color
+
+    def is_square_attacked(self, r, c, color):
+        # Czy pole (r, c) jest atakowane przez figury koloru `color`.
+        # Idziemy od pola na zewnątrz (skoczek, pion, król, promienie) - bez generowania ruchów.
+        board = self.board
+        for rr, cc in _KNIGHT_TARGETS[r][c]:
+            piece = board[rr][cc]
+            if piece is not None and piece.color == color and piece.name == 'Skoczek':
+                return True
 
-    def if_field_under_attack(self, r, c):
+        for rr, cc in _KING_TARGETS[r][c]:
+            piece = board[rr][cc]
+            if piece is not None and piece.color == color and piece.name == 'Krol':
+                return True
 
-        original = self.white_to_move
-        try:
-            self.white_to_move = not original
-            opponent_moves = self.generate_moves()
-        finally:
-            self.white_to_move = original
+        # biały pion bije "w górę", więc atakuje (r, c) stojąc rząd niżej (r + 1)
+        pawn_row = r + 1 if color == 'Bialy' else r - 1
+        if 0 <= pawn_row < 8:
+            for cc in (c - 1, c + 1):
+                if 0 <= cc < 8:
+                    piece = board[pawn_row][cc]
+                    if piece is not None and piece.color == color and piece.name == 'Pionek':
+                        return True
+
+        for ray in _ROOK_RAYS[r][c]:
+            for rr, cc in ray:
+                piece = board[rr][cc]
+                if piece is not None:
+                    if piece.color == color and (piece.name == 'Wieza' or piece.name == 'Hetman'):
+                        return True
+                    break
+
+        for ray in _BISHOP_RAYS[r][c]:
+            for rr, cc in ray:
+                piece = board[rr][cc]
+                if piece is not None:
+                    if piece.color == color and (piece.name == 'Goniec' or piece.name == 'Hetman'):
+                        return True
+                    break
 
-        for move in opponent_moves:
-            if move.dest_x == r and move.dest_y == c:
-                return True
-        return False
-    
-    def if_check(self, color):
-        original = self.white_to_move
-        try:
-            self.white_to_move = not original
-            opponent_moves = self.generate_moves()
-        finally:
-            self.white_to_move = original
-
-        for move in opponent_moves:
-            if color == 'Bialy' and move.dest_x == self.white_king_pos[0] and move.dest_y == self.white_king_pos[1]:
-                return True
-            if color == 'Czarny' and move.dest_x == self.black_king_pos[0] and move.dest_y == self.black_king_pos[1]:
-                return True
         return False
 
+    def if_field_under_attack(self, r, c):
+        return self.is_square_attacked(r, c, 'Czarny' if self.white_to_move else 'Bialy')
+
+    def if_check(self, color):
+        if color == 'Bialy':
+            return self.is_square_attacked(self.white_king_pos[0], self.white_king_pos[1], 'Czarny')
+        return self.is_square_attacked(self.black_king_pos[0], self.black_king_pos[1], 'Bialy')
 
     def undo_move(self):
         if len(self.move_history) > 0:
 
             move = self.move_history.pop()
+            if self._hashed_grid is self.board:
+                self._piece_hash ^= self._hash_move(move, self.board[move.dest_x][move.dest_y])
             self.board[move.start_x][move.start_y] = move.moved_figure
             self.board[move.dest_x][move.dest_y] = move.caught_figure
             self.board[move.start_x][move.start_y].row = move.start_x
@@ -184,10 +386,8 @@ class Board:
             if move.czy_en_passant:
                 self.board[move.dest_x][move.dest_y] = None
                 self.board[move.start_x][move.dest_y] = move.caught_figure
-                self.en_passant_pos = (move.dest_x, move.dest_y)
 
-            if move.moved_figure.name == 'Pionek' and (move.start_x - move.dest_x == -2 or move.start_x - move.dest_x == 2):
-                self.en_passant_pos = ()
+            self.en_passant_pos = self.en_passant_history.pop() if self.en_passant_history else ()
 
 
             self.castling_history.pop()
@@ -220,27 +420,21 @@ class Board:
         color = last_move.moved_figure.color
         pawn = last_move.moved_figure
 
-
-        if(promotion_type == 'H'):
-            last_move.user_notation += 'H'
-            self.board[pawn.row][pawn.column] = Queen(color, pawn.row, pawn.column)
-            return
-        
-        if(promotion_type == 'W'):
-            last_move.user_notation += 'W'
-            self.board[pawn.row][pawn.column] = Rook(color, pawn.row, pawn.column)
-            return
-        
-        if(promotion_type == 'S'):
-            last_move.user_notation += 'S'
-            self.board[pawn.row][pawn.column] = Knight(color, pawn.row, pawn.column)
-            return
-        
-        if(promotion_type == 'G'):
-            last_move.user_notation += 'G'
-            self.board[pawn.row][pawn.column] = Bishop(color, pawn.row, pawn.column)
+        if promotion_type == 'H':
+            figure = Queen(color, pawn.row, pawn.column)
+        elif promotion_type == 'W':
+            figure = Rook(color, pawn.row, pawn.column)
+        elif promotion_type == 'S':
+            figure = Knight(color, pawn.row, pawn.column)
+        elif promotion_type == 'G':
+            figure = Bishop(color, pawn.row, pawn.column)
+        else:
             return
-            
+
+        last_move.user_notation += promotion_type
+        if self._hashed_grid is self.board:
+            self._piece_hash ^= figure_key(pawn, pawn.row, pawn.column) ^ figure_key(figure, pawn.row, pawn.column)
+        self.board[pawn.row][pawn.column] = figure
 
     def generate_moves(self):
         possible_moves = []
@@ -259,6 +453,8 @@ class Board:
         return possible_moves
 
     def make_move(self, move):
+            if self._hashed_grid is self.board:
+                self._piece_hash ^= self._hash_move(move, move.moved_figure)
             self.board[move.start_x][move.start_y].row = move.dest_x
             self.board[move.start_x][move.start_y].column = move.dest_y
             self.board[move.start_x][move.start_y] = None
@@ -283,6 +479,7 @@ class Board:
 
 
 
+            self.en_passant_history.append(self.en_passant_pos)
             if move.moved_figure.name == 'Pionek' and (move.dest_x - move.start_x == -2 or move.dest_x - move.start_x == 2):
                 self.en_passant_pos = ((move.start_x + move.dest_x) // 2, move.start_y)
             else:
@@ -1,8 +1,22 @@
 from .Engine import Board
 
+PROMOTION_LETTERS = ('H', 'W', 'S', 'G')
+
 class ChessGameManager:
-    def __init__(self):
-        self.board = Board()
+    # Klasa pozycji używana domyślnie (Board albo BitBoard - patrz settings.CHESS_ENGINE_BACKEND)
+    board_class = Board
+
+    def __init__(self, board_class=None):
+        self.board = (board_class or self.board_class)()
+
+    @classmethod
+    def from_fen(cls, fen, board_class=None):
+        mgr = cls(board_class)
+        mgr.board = type(mgr.board).from_fen(fen)
+        return mgr
+
+    def get_fen(self):
+        return self.board.to_fen()
 
     def get_possible_moves(self):
         return self.board.update_moves()
@@ -12,6 +26,10 @@ class ChessGameManager:
         return [move.user_notation for move in possible_moves]
 
     def make_move(self, move_notation, promotion_type=None):
+        # Zapisana notacja promocji ma dopisaną literę figury (np. "e8H", "dxc1S")
+        if promotion_type is None and move_notation[:1].islower() and move_notation[-1:] in PROMOTION_LETTERS:
+            move_notation, promotion_type = move_notation[:-1], move_notation[-1]
+
         possible_moves = self.board.update_moves()
         
         for move in possible_moves:
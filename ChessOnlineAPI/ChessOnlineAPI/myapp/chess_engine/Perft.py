@@ -0,0 +1,139 @@
+import time
+
+PROMOTION_TYPES = ('H', 'W', 'S', 'G')
+
+# Pozycje testowe z oczekiwaną liczbą liści perft dla głębokości 1, 2, 3, ...
+# (źródło: chessprogramming.org/Perft_Results)
+POSITIONS = [
+    {
+        "name": "start",
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "nodes": [20, 400, 8902, 197281, 4865609],
+    },
+    {
+        # roszady w obie strony, bicie w przelocie, związania
+        "name": "kiwipete",
+        "fen": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "nodes": [48, 2039, 97862, 4085603],
+    },
+    {
+        # końcówka: szachy odkryte, związania z bicia w przelocie
+        "name": "endgame-ep-pins",
+        "fen": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        "nodes": [14, 191, 2812, 43238, 674624],
+    },
+    {
+        # promocje z biciem, roszada tylko czarnych
+        "name": "promotions",
+        "fen": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        "nodes": [6, 264, 9467, 422333],
+    },
+    {
+        "name": "promotion-check",
+        "fen": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        "nodes": [44, 1486, 62379, 2103487],
+    },
+    {
+        "name": "middlegame",
+        "fen": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        "nodes": [46, 2079, 89890, 3894594],
+    },
+]
+
+def _is_promotion(move):
+    return move.moved_figure.name == 'Pionek' and move.dest_x in (0, 7)
+
+
+def _children(board, move):
+    # Promocja to cztery różne ruchy (H/W/S/G) - inaczej liczby nie zgadzają się ze standardem
+    notation = move.user_notation
+    if _is_promotion(move):
+        for promotion_type in PROMOTION_TYPES:
+            board.make_move(move)
+            board.promote_pawn(promotion_type)
+            yield notation + promotion_type
+            board.undo_move()
+    else:
+        board.make_move(move)
+        yield notation
+        board.undo_move()
+
+
+def perft(board, depth):
+    """Liczba liści drzewa legalnych ruchów o głębokości depth."""
+    if depth <= 0:
+        return 1
+    moves = board.update_moves()
+    if depth == 1:
+        return sum(len(PROMOTION_TYPES) if _is_promotion(move) else 1 for move in moves)
+    nodes = 0
+    for move in moves:
+        for _ in _children(board, move):
+            nodes += perft(board, depth - 1)
+    return nodes
+
+
+def perft_divide(board, depth):
+    """Perft rozbity na ruchy z korzenia: {notacja: liczba liści} - do szukania błędów generatora."""
+    result = {}
+    for move in board.update_moves():
+        for notation in _children(board, move):
+            result[notation] = perft(board, depth - 1)
+    return result
+
+
+def run_perft(board_class, position, depth):
+    board = board_class.from_fen(position["fen"])
+    started = time.perf_counter()
+    nodes = perft(board, depth)
+    elapsed = time.perf_counter() - started
+    expected = position["nodes"][depth - 1] if depth <= len(position["nodes"]) else None
+    return {
+        "name": position["name"],
+        "depth": depth,
+        "nodes": nodes,
+        "expected": expected,
+        "ok": expected is None or nodes == expected,
+        "seconds": elapsed,
+        "nps": nodes / elapsed if elapsed else 0.0,
+    }
+
+
+def _calls(board, name):
+    if name == 'generate_moves':
+        return lambda: len(board.generate_moves())
+    if name == 'update_moves':
+        return lambda: len(board.update_moves())
+    if name == 'if_check':
+        color = 'Bialy' if board.white_to_move else 'Czarny'
+
+        def call():
+            board.if_check(color)
+            return 1
+        return call
+    raise ValueError(f"unknown engine call: {name}")
+
+
+def measure_call(board_class, name, positions=POSITIONS, min_time=0.5):
+    """
+    Przepustowość jednej metody pozycji na zestawie pozycji testowych.
+    Dla generate_moves / update_moves węzeł = wygenerowany ruch, dla if_check = jedno wywołanie.
+    """
+    boards = [board_class.from_fen(position["fen"]) for position in positions]
+    calls = [_calls(board, name) for board in boards]
+    nodes = 0
+    rounds = 0
+    started = time.perf_counter()
+    while True:
+        for call in calls:
+            nodes += call()
+        rounds += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+    return {
+        "calls": rounds * len(calls),
+        "nodes": nodes,
+        "seconds": elapsed,
+        "nps": nodes / elapsed,
+    }
@@ -1,4 +1,5 @@
 from .Figure import *
+from ..utils.Move import Move
 
 class Pawn(Figure):
     name = 'Pionek'
@@ -12,8 +13,6 @@ class Pawn(Figure):
             self.promotion = True
 
     def generate_possible_moves(self, board, en_passant_pos=None):
-         from myapp.chess_engine.utils.Move import Move
-
          if self.color == 'Bialy':
             if board[self.row - 1][self.column] is None:
                 self.move_list.append(Move((self.column, self.row), (self.column, self.row - 1), board))
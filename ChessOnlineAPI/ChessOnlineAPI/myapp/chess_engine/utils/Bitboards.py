@@ -0,0 +1,139 @@
+# Tablice ataków dla pozycji bitboardowej.
+#
+# Indeks pola: sq = row * 8 + column, tak jak w Board.board
+# (row 0 = 8. linia / czarne, row 7 = 1. linia / białe).
+
+WHITE = 0
+BLACK = 1
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+FULL = (1 << 64) - 1
+
+# (dr, dc) - kierunki promieni; dodatnie przesunięcie indeksu => "w górę" bitów
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def square(row, column):
+    return row * 8 + column
+
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb):
+    return bb.bit_length() - 1
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _leaper_table(offsets):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            rr, cc = r + dr, c + dc
+            if 0 <= rr < 8 and 0 <= cc < 8:
+                mask |= 1 << square(rr, cc)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr, dc):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        rr, cc = r + dr, c + dc
+        while 0 <= rr < 8 and 0 <= cc < 8:
+            mask |= 1 << square(rr, cc)
+            rr += dr
+            cc += dc
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table(((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2), (-1, -2)))
+KING_ATTACKS = _leaper_table(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+
+# PAWN_ATTACKS[color][sq] - pola bite przez piona danego koloru stojącego na sq
+PAWN_ATTACKS = (
+    _leaper_table(((-1, -1), (-1, 1))),
+    _leaper_table(((1, -1), (1, 1))),
+)
+
+# RAYS[(dr, dc)][sq] - pełny promień z sq (bez samego sq)
+RAYS = {d: _ray_table(*d) for d in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+# Promienie osobno dla każdego kierunku - bez słownika i pętli po kierunkach w gorącej ścieżce
+_UP, _DOWN, _LEFT, _RIGHT = (RAYS[d] for d in ROOK_DIRECTIONS)
+_UP_LEFT, _UP_RIGHT, _DOWN_LEFT, _DOWN_RIGHT = (RAYS[d] for d in BISHOP_DIRECTIONS)
+
+
+def rook_attacks(sq, occupied):
+    # w górę (malejące indeksy) pierwszy bloker to najstarszy bit, w dół - najmłodszy
+    ray = _UP[sq]
+    blockers = ray & occupied
+    attacks = ray ^ _UP[blockers.bit_length() - 1] if blockers else ray
+    ray = _DOWN[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _DOWN[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _LEFT[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _LEFT[blockers.bit_length() - 1] if blockers else ray
+    ray = _RIGHT[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _RIGHT[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def bishop_attacks(sq, occupied):
+    ray = _UP_LEFT[sq]
+    blockers = ray & occupied
+    attacks = ray ^ _UP_LEFT[blockers.bit_length() - 1] if blockers else ray
+    ray = _UP_RIGHT[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _UP_RIGHT[blockers.bit_length() - 1] if blockers else ray
+    ray = _DOWN_LEFT[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _DOWN_LEFT[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _DOWN_RIGHT[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _DOWN_RIGHT[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def queen_attacks(sq, occupied):
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+# Linie z pola na pustej planszy - szybki test, czy goniec / wieża w ogóle może atakować pole
+BISHOP_LINES = [bishop_attacks(sq, 0) for sq in range(64)]
+ROOK_LINES = [rook_attacks(sq, 0) for sq in range(64)]
+
+
+def _between_table():
+    table = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for d in RAYS:
+            ray = RAYS[d][a]
+            for b in iter_bits(ray):
+                table[a][b] = ray & ~RAYS[d][b] & ~(1 << b)
+    return table
+
+
+# BETWEEN[a][b] - pola ściśle pomiędzy a i b na wspólnej linii (0 gdy nie leżą w linii)
+BETWEEN = _between_table()
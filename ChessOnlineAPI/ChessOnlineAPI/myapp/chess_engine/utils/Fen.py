@@ -0,0 +1,115 @@
+from ..pieces.Pawn import Pawn
+from ..pieces.Rook import Rook
+from ..pieces.Knight import Knight
+from ..pieces.Bishop import Bishop
+from ..pieces.Queen import Queen
+from ..pieces.King import King
+from .Castling import CastlingRules
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+FEN_LETTERS = {'Pionek': 'p', 'Wieza': 'r', 'Skoczek': 'n', 'Goniec': 'b', 'Hetman': 'q', 'Krol': 'k'}
+_FEN_CLASSES = {'p': Pawn, 'r': Rook, 'n': Knight, 'b': Bishop, 'q': Queen, 'k': King}
+_FILES = 'abcdefgh'
+
+
+def _counters(board):
+    # Liczniki z FEN-u startowego + ruchy wykonane od tamtej pory
+    history = board.move_history
+    halfmove = 0
+    for move in reversed(history):
+        if move.moved_figure.name == 'Pionek' or move.caught_figure is not None:
+            break
+        halfmove += 1
+    else:
+        halfmove += board.start_halfmove_clock
+    started_white = board.white_to_move == (len(history) % 2 == 0)
+    fullmove = board.start_fullmove_number + (len(history) + (0 if started_white else 1)) // 2
+    return halfmove, fullmove
+
+
+def board_to_fen(board):
+    ranks = []
+    for row in board.board:
+        rank = ''
+        empty = 0
+        for figure in row:
+            if figure is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            letter = FEN_LETTERS[figure.name]
+            rank += letter.upper() if figure.color == 'Bialy' else letter
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+
+    rules = board.castling_move
+    castling = ('K' if rules.bK else '') + ('Q' if rules.bH else '') + ('k' if rules.cK else '') + ('q' if rules.cH else '')
+
+    en_passant = '-'
+    if board.en_passant_pos:
+        r, c = board.en_passant_pos
+        en_passant = _FILES[c] + str(8 - r)
+
+    halfmove, fullmove = _counters(board)
+    return f"{'/'.join(ranks)} {'w' if board.white_to_move else 'b'} {castling or '-'} {en_passant} {halfmove} {fullmove}"
+
+
+def load_fen(board, fen):
+    """Ustawia pozycję z FEN na świeżo utworzonej planszy (Board albo BitBoard)."""
+    parts = fen.split()
+    if len(parts) < 4:
+        raise ValueError(f"invalid FEN: {fen!r}")
+    ranks = parts[0].split('/')
+    if len(ranks) != 8:
+        raise ValueError(f"invalid FEN board: {parts[0]!r}")
+
+    grid = [[None] * 8 for _ in range(8)]
+    kings = {}
+    for r, rank in enumerate(ranks):
+        c = 0
+        for ch in rank:
+            if ch.isdigit():
+                c += int(ch)
+                continue
+            if ch.lower() not in _FEN_CLASSES or c > 7:
+                raise ValueError(f"invalid FEN board: {parts[0]!r}")
+            color = 'Bialy' if ch.isupper() else 'Czarny'
+            grid[r][c] = _FEN_CLASSES[ch.lower()](color, r, c)
+            if ch in 'Kk':
+                if color in kings:
+                    raise ValueError(f"invalid FEN board: {parts[0]!r}")
+                kings[color] = (r, c)
+            c += 1
+        if c != 8:
+            raise ValueError(f"invalid FEN board: {parts[0]!r}")
+    if len(kings) != 2:
+        raise ValueError(f"invalid FEN board: {parts[0]!r}")
+
+    if parts[1] not in ('w', 'b'):
+        raise ValueError(f"invalid FEN side to move: {parts[1]!r}")
+
+    board.board = grid
+    board.white_king_pos = kings['Bialy']
+    board.black_king_pos = kings['Czarny']
+    board.white_to_move = parts[1] == 'w'
+
+    rights = parts[2]
+    board.castling_move = CastlingRules('q' in rights, 'k' in rights, 'Q' in rights, 'K' in rights)
+    board.castling_history = [CastlingRules('q' in rights, 'k' in rights, 'Q' in rights, 'K' in rights)]
+
+    board.en_passant_pos = ()
+    if parts[3] != '-':
+        if len(parts[3]) != 2 or parts[3][0] not in _FILES or parts[3][1] not in '36':
+            raise ValueError(f"invalid FEN en passant square: {parts[3]!r}")
+        board.en_passant_pos = (8 - int(parts[3][1]), _FILES.index(parts[3][0]))
+
+    board.start_halfmove_clock = int(parts[4]) if len(parts) > 4 else 0
+    board.start_fullmove_number = int(parts[5]) if len(parts) > 5 else 1
+    board.move_history = []
+    board.checkmate = False
+    board.stalemate = False
+    return board
@@ -1,6 +1,3 @@
-from ..pieces.Pawn import Pawn
-from ..pieces.Figure import Figure
-
 class Move:
     dictionary = {
         1: 'a',
@@ -23,6 +20,9 @@ class Move:
         'h': 7
     }
 
+    __slots__ = ('start_x', 'start_y', 'dest_x', 'dest_y', 'moved_figure', 'caught_figure',
+                 'promotion', 'czy_en_passant', 'castling', '_notation', '_user_notation')
+
     def __init__(self, start, dest, board, castling = False, en_passant=False, promotion = False):
         self.start_x = start[1]
         self.start_y = start[0]
@@ -30,40 +30,80 @@ class Move:
         self.dest_y = dest[0]
         self.moved_figure = board[self.start_x][self.start_y]
         self.caught_figure = board[self.dest_x][self.dest_y]
-        self.notation = str(self.start_x) + str(self.start_y) + str(self.dest_x) + str(self.dest_y)
         self.promotion = promotion
-        self.user_notation = ""
-        if self.moved_figure is None:
-            return
-
-        if self.caught_figure is None:
-            if self.moved_figure.name == 'Pionek':
-                self.user_notation = str(self.dictionary[self.dest_y + 1]) + str(8 - self.dest_x)
-            else:
-                self.user_notation = self.moved_figure.name[0] + str(self.dictionary[self.dest_y + 1]) + str(8 - self.dest_x)
-        else:
-            if self.moved_figure.name == 'Pionek':
-                self.user_notation = str(self.dictionary[self.start_y + 1]) + 'x' + str(self.dictionary[self.dest_y + 1]) + str(8 - self.dest_x)
-            else:
-                self.user_notation = self.moved_figure.name[0] + 'x' + str(self.dictionary[self.dest_y + 1]) + str(8 - self.dest_x)
-
         self.czy_en_passant = en_passant
+        self.castling = castling
+        # notacje liczymy dopiero przy pierwszym odczycie - większość ruchów nigdy ich nie potrzebuje
+        self._notation = None
+        self._user_notation = None
+
         if self.czy_en_passant:
-            if self.moved_figure.color == 'Bialy':
-                self.caught_figure = Pawn("Czarny", self.dest_x + 1, self.dest_y)
-            else:
-                self.caught_figure = Pawn("Bialy", self.dest_x - 1, self.dest_y)
-            self.user_notation = str(self.dictionary[self.start_y + 1]) + 'x' + str(self.dictionary[self.dest_y + 1]) + str(8 - self.dest_x)
+            # bity pion stoi obok (w rzędzie startowym), a nie na polu docelowym
+            self.caught_figure = board[self.start_x][self.dest_y]
+
+    @property
+    def notation(self):
+        if self._notation is None:
+            self._notation = str(self.start_x) + str(self.start_y) + str(self.dest_x) + str(self.dest_y)
+        return self._notation
+
+    @property
+    def user_notation(self):
+        if self._user_notation is None:
+            self._user_notation = self._build_user_notation()
+        return self._user_notation
+
+    @user_notation.setter
+    def user_notation(self, value):
+        self._user_notation = value
+
+    def _build_user_notation(self):
+        if self.moved_figure is None:
+            return ""
 
-        self.castling = castling
         if self.castling:
             if self.dest_y - self.start_y == 2:
-                self.user_notation = '0-0'
+                return '0-0'
             elif self.dest_y - self.start_y == -2:
-                self.user_notation = '0-0-0'
+                return '0-0-0'
+
+        target = self.dictionary[self.dest_y + 1] + str(8 - self.dest_x)
+        if self.moved_figure.name == 'Pionek':
+            if self.caught_figure is None and not self.czy_en_passant:
+                return target
+            return self.dictionary[self.start_y + 1] + 'x' + target
+        if self.caught_figure is None:
+            return self.moved_figure.name[0] + target
+        return self.moved_figure.name[0] + 'x' + target
 
     def __eq__(self, other):
         return self.notation == other.notation
 
 
+def disambiguate_notations(moves):
+    # Dwie figury tego samego typu na to samo pole -> dopisujemy rząd albo kolumnę.
+    # Grupujemy po figurze i polu docelowym, więc notację liczymy tylko dla niejednoznacznych ruchów.
+    groups = {}
+    for move in moves:
+        if move.moved_figure.name != 'Pionek':
+            groups.setdefault((move.moved_figure.name, move.dest_x, move.dest_y, move.castling), []).append(move)
+
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        for i in range(len(group)):
+            for j in range(i + 1, len(group)):
+                first, second = group[i], group[j]
+                if first.user_notation != second.user_notation:
+                    continue
+                piece_letter = first.user_notation[0]
 
+                # jeśli mają tę samą kolumnę -> rozróżniamy RZĘDEM (liczbą)
+                if first.start_y == second.start_y:
+                    first.user_notation = piece_letter + str(8 - first.start_x) + first.user_notation[1:]
+                    second.user_notation = piece_letter + str(8 - second.start_x) + second.user_notation[1:]
+                # w pozostałych przypadkach wystarczy KOLUMNA (litera)
+                else:
+                    first.user_notation = piece_letter + Move.dictionary[first.start_y + 1] + first.user_notation[1:]
+                    second.user_notation = piece_letter + Move.dictionary[second.start_y + 1] + second.user_notation[1:]
+    return moves
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+
+def pack_move(move):
+    # pole startowe (6 bitów) | pole docelowe (6 bitów) | roszada | bicie w przelocie
+    return ((move.start_x * 8 + move.start_y)
+            | (move.dest_x * 8 + move.dest_y) << 6
+            | bool(move.castling) << 12
+            | bool(move.czy_en_passant) << 13)
+
+
+def unpack_move(packed):
+    """Zwraca (start_x, start_y, dest_x, dest_y, castling, en_passant)."""
+    start_x, start_y = divmod(packed & 63, 8)
+    dest_x, dest_y = divmod((packed >> 6) & 63, 8)
+    return start_x, start_y, dest_x, dest_y, bool(packed & 4096), bool(packed & 8192)
+
+
+class LegalMoveCache:
+    """
+    Wspólny dla procesu cache LRU: hash Zobrista pozycji -> legalne ruchy i flagi.
+    Wpis: (spakowane ruchy, {indeks: notacja} dla ruchów z doprecyzowaniem, checkmate, stalemate, check).
+    """
+
+    def __init__(self, maxsize=20000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, moves, checkmate, stalemate, check):
+        if self.maxsize <= 0:
+            return
+        packed = tuple(pack_move(move) for move in moves)
+        # notacje zapisujemy tylko tam, gdzie disambiguate_notations je zmieniło
+        overrides = {i: move._user_notation for i, move in enumerate(moves) if move._user_notation is not None}
+        with self._lock:
+            self._entries[key] = (packed, overrides, checkmate, stalemate, check)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > max(maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+legal_move_cache = LegalMoveCache()
@@ -0,0 +1,44 @@
+import random
+
+from .Bitboards import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+TYPE_BY_NAME = {'Pionek': PAWN, 'Skoczek': KNIGHT, 'Goniec': BISHOP, 'Wieza': ROOK, 'Hetman': QUEEN, 'Krol': KING}
+
+# Stałe ziarno: ten sam hash pozycji w każdym procesie
+_rng = random.Random(20240611)
+
+# PIECE_KEYS[kolor][typ][pole], pole = row * 8 + column
+PIECE_KEYS = [[[_rng.getrandbits(64) for _ in range(64)] for _ in range(6)] for _ in (WHITE, BLACK)]
+BLACK_TO_MOVE_KEY = _rng.getrandbits(64)
+CASTLING_KEYS = {name: _rng.getrandbits(64) for name in ('cH', 'cK', 'bH', 'bK')}
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(64)]
+
+
+def figure_key(figure, r, c):
+    color = WHITE if figure.color == 'Bialy' else BLACK
+    return PIECE_KEYS[color][TYPE_BY_NAME[figure.name]][r * 8 + c]
+
+
+def grid_hash(grid):
+    h = 0
+    for r, row in enumerate(grid):
+        for c, figure in enumerate(row):
+            if figure is not None:
+                h ^= figure_key(figure, r, c)
+    return h
+
+
+def state_hash(white_to_move, castling, en_passant_pos):
+    # Część hasha niezależna od figur: strona na ruchu, prawa do roszady, pole bicia w przelocie
+    h = 0 if white_to_move else BLACK_TO_MOVE_KEY
+    if castling.cH:
+        h ^= CASTLING_KEYS['cH']
+    if castling.cK:
+        h ^= CASTLING_KEYS['cK']
+    if castling.bH:
+        h ^= CASTLING_KEYS['bH']
+    if castling.bK:
+        h ^= CASTLING_KEYS['bK']
+    if en_passant_pos:
+        h ^= EN_PASSANT_KEYS[en_passant_pos[0] * 8 + en_passant_pos[1]]
+    return h
@@ -0,0 +1,92 @@
+# games/clock_service.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger("chess")
+
+
+def flag_fall_deadline(state, turn):
+    """Chwila (time.time()), w której gracz na ruchu przekroczy czas, albo None gdy zegar stoi."""
+    if not state or state.get("game_over") or not state.get("moves"):
+        return None
+    # Czas nie płynie przed pierwszym ruchem, potem płynie graczowi na ruchu
+    remaining = state.get("white_time" if turn == "b" else "black_time", 600)
+    return state.get("last_move_timestamp", time.time()) + remaining
+
+
+class ClockScheduler:
+    """
+    Jeden na proces: kopiec terminów upadku flagi dla wszystkich partii.
+    Zamiast pętli co sekundę na każde połączenie budzi się tylko wtedy, gdy najbliższy termin minie.
+
+    handler(room_name) -> nowy termin albo None; wołany dokładnie raz na uzbrojony termin.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._heap = []
+        self._deadlines = {}
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self._running = set()
+        self.fired = 0
+
+    def arm(self, room_name, deadline):
+        """Ustawia (albo przesuwa) termin partii. Wołać z pętli zdarzeń."""
+        if deadline is None:
+            self.cancel(room_name)
+            return
+        if self._deadlines.get(room_name) == deadline:
+            return
+        self._deadlines[room_name] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), room_name))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._wakeup.set()
+
+    def cancel(self, room_name):
+        # wpis zostaje w kopcu i zostanie pominięty jako nieaktualny
+        self._deadlines.pop(room_name, None)
+
+    def pending(self):
+        return len(self._deadlines)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            heap = self._heap
+            while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+                heapq.heappop(heap)
+            if not heap:
+                await self._wakeup.wait()
+                continue
+
+            deadline, _, room_name = heap[0]
+            delay = deadline - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(heap)
+            del self._deadlines[room_name]
+            task = asyncio.get_running_loop().create_task(self._fire(room_name))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, room_name):
+        self.fired += 1
+        try:
+            deadline = await self.handler(room_name)
+        except Exception:
+            logger.exception("Clock handler failed: room=%s", room_name)
+            return
+        if deadline is not None and room_name not in self._deadlines:
+            self.arm(room_name, deadline)
@@ -0,0 +1,41 @@
+# games/codec.py
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _std_dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _std_loads(data):
+    return json.loads(data)
+
+
+# Dostępne kodery: nazwa -> (dumps -> str, loads z str/bytes). Wszystkie piszą kompaktowy JSON,
+# a błędne dane zgłaszają jako ValueError (JSONDecodeError każdej biblioteki to podklasa ValueError).
+CODECS = {"json": (_std_dumps, _std_loads)}
+
+if ujson is not None:
+    CODECS["ujson"] = (
+        lambda obj: ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False),
+        ujson.loads,
+    )
+
+if orjson is not None:
+    CODECS["orjson"] = (
+        lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8"),
+        orjson.loads,
+    )
+
+# Najszybszy zainstalowany
+BACKEND = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+dumps, loads = CODECS[BACKEND]
@@ -1,79 +1,66 @@
 # games/consumers.py
-import json
 import asyncio
-import functools
 import logging
 import time
 import traceback
 import uuid
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer, AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from . import codec, glicko_service, metrics, tracing, wire
 from .models import Game, GameHistory, Room
 from .engine_adapter import EngineWrapper
-from django.db.models import Count
+from .game_sessions import PROTOCOL_VERSION, game_sessions
+from .lobby_index import LOBBY_GROUP, lobby_index, room_summary
+from .matchmaking import MatchmakingQueue
+from .middleware import user_cache
+from .replay_buffer import replay_buffer
+from .tracing import tracer
+from .clock_service import ClockScheduler, flag_fall_deadline
+from .engine_executor import RoomLocks, ServerBusy, engine_executor
+from channels.layers import get_channel_layer
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
 from myapp.models import PlayerProfile
 from myapp.elo_service import update_ratings
 
 User = get_user_model()
+GLICKO_TAU = getattr(settings, "GLICKO_TAU", glicko_service.DEFAULT_TAU)
 
-# Logging setup (bez zmian)
+# handlery (kolejka + wątek zapisu, rotacja) w settings.LOGGING
 logger = logging.getLogger("chess")
-logger.setLevel(logging.DEBUG)
-if not logger.handlers:
-    fh = logging.FileHandler("chess_debug.log", encoding="utf-8")
-    fh.setLevel(logging.DEBUG)
-    sh = logging.StreamHandler()
-    sh.setLevel(logging.INFO)
-    fmt = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-    fh.setFormatter(fmt)
-    sh.setFormatter(fmt)
-    logger.addHandler(fh)
-    logger.addHandler(sh)
-
-
-def _get_player_summary(user):
-    """Pomocnik do pobierania nazwy i ELO gracza"""
-    elo = 1200
-    if hasattr(user, 'profile'):
-        elo = user.profile.elo
-    return {
-        'username': user.username,
-        'elo': elo
-    }
+
 
 # --- DB HELPERS ---
 
 @database_sync_to_async
-def find_open_room_for_quick_match(user_id):
-    possible_rooms = Room.objects.annotate(p_count=Count('players')).filter(
-        status=Room.STATUS_OPEN,
-        password_hash='',
-        p_count=1
-    ).exclude(players__id=user_id)
+def get_player_elo(user_id):
+    elo = PlayerProfile.objects.filter(user_id=user_id).values_list('elo', flat=True).first()
+    return elo if elo is not None else 1200
 
-    if possible_rooms.exists():
-        return possible_rooms.first()
-    return None
 
 @database_sync_to_async
-def get_all_rooms_serialized():
-    qs = Room.objects.order_by('-created_at')[:200]
-    return [
-        {
-            'name': r.name,
-            'players': [_get_player_summary(u) for u in r.players.all()],
-            'players_count': r.players_count,
-            'has_password': bool(r.password_hash),
-            'status': r.status,
-        } for r in qs
-    ]
-
+def create_match_room_db(name, white_id, black_id):
+    """Pokój i gra dla pary z kolejki quick_match - tworzone raz, od razu z oboma graczami."""
+    white = User.objects.get(id=white_id)
+    black = User.objects.get(id=black_id)
+    with transaction.atomic():
+        room = Room.objects.create(name=name, host=white, status=Room.STATUS_PLAYING)
+        room.players.add(white, black)
+        Game.objects.create(
+            room_name=name,
+            state=EngineWrapper.get_initial_state(),
+            white_player=white,
+            black_player=black)
+    return room_summary(room)
 
 @database_sync_to_async
 def create_room_db(name, host_id, password):
     Game.objects.filter(room_name=name).delete()
+    game_sessions.discard(name)
     
     host = User.objects.get(id=host_id)
     room = Room.objects.create(name=name, host=host)
@@ -88,7 +75,7 @@ def create_room_db(name, host_id, password):
         state=EngineWrapper.get_initial_state(),
         white_player=host)
 
-    return _serialize_room(room)
+    return room_summary(room)
 
 @database_sync_to_async
 def try_join_room_db(name, user_id, password):
@@ -99,7 +86,7 @@ def try_join_room_db(name, user_id, password):
     
     # Sprawdzamy czy gracz już tam nie jest (reconnect)
     if room.players.filter(id=user_id).exists():
-         return {'success': True, 'room': _serialize_room(room)}
+         return {'success': True, 'room': room_summary(room)}
 
     if room.status != Room.STATUS_OPEN:
         return {'success': False, 'error': 'not_open'}
@@ -123,7 +110,7 @@ def try_join_room_db(name, user_id, password):
     except Game.DoesNotExist:
         pass
 
-    return {'success': True, 'room': _serialize_room(room)}
+    return {'success': True, 'room': room_summary(room)}
 
 @database_sync_to_async
 def remove_player_from_room_db(room_name, user_id):
@@ -140,88 +127,162 @@ def remove_player_from_room_db(room_name, user_id):
             # --- POPRAWKA 2: CZYSZCZENIE STANU ---
             # Usuwamy stan gry powiązany z tym pokojem, aby następna gra o tej nazwie była czysta
             Game.objects.filter(room_name=room_name).delete()
+            game_sessions.discard(room_name)
             
             room.delete()
             return None
             
-        return _serialize_room(room)
+        return room_summary(room)
     except (Room.DoesNotExist, User.DoesNotExist):
         return None
 
 def process_game_result_sync(room_name, winner_color, reason):
     """
-    Synchroniczna wersja aktualizacji ELO, używana wewnątrz _apply_move_sync
-    winner_color: 'b', 'c', lub None
+    Zapis wyniku partii: GameHistory, ELO, Glicko-2 i liczniki obu graczy w jednej transakcji.
+    Idempotentne - GameHistory.game jest unikalne, więc timeout ścigający się z poddaniem
+    (albo powtórzone wywołanie) nie policzy partii drugi raz.
+    winner_color: 'b', 'c', lub None. Zwraca True, jeśli to wywołanie zapisało wynik.
     """
     try:
-        game = Game.objects.get(room_name=room_name)
-        white_player = game.white_player
-        black_player = game.black_player
-
-        if not white_player or not black_player:
-            return
-
-        # Używamy related_name='profile' zdefiniowanego w modelu
-        p_white = white_player.profile 
-        p_black = black_player.profile
-
-        old_w_elo = p_white.elo
-        old_b_elo = p_black.elo
-
-        winner_user = None
+        game = (
+            Game.objects.select_related('white_player__profile', 'black_player__profile')
+            .filter(room_name=room_name)
+            .first()
+        )
+        if game is None or not game.white_player or not game.black_player:
+            return False
 
+        white_id = game.white_player_id
+        black_id = game.black_player_id
         is_draw = (winner_color is None)
-
         if is_draw:
-            new_w, new_b = update_ratings(p_white.elo, p_black.elo, is_draw=True)
-            p_white.draws += 1
-            p_black.draws += 1
-            winner_user = None
+            winner_id = loser_id = None
         elif winner_color == 'b':
-            new_w, new_b = update_ratings(p_white.elo, p_black.elo, is_draw=False)
-            p_white.wins += 1
-            p_black.losses += 1
-            winner_user = white_player
+            winner_id, loser_id = white_id, black_id
         else: # winner == 'c'
-            new_b, new_w = update_ratings(p_black.elo, p_white.elo, is_draw=False)
-            p_black.wins += 1
-            p_white.losses += 1
-            winner_user = black_player
+            winner_id, loser_id = black_id, white_id
+
+        state_dict = codec.loads(game.state) if game.state else {}
+
+        with transaction.atomic():
+            # Najpierw klucz wyniku: duplikat odpada tutaj (IntegrityError), zanim zablokuje profile.
+            # ELO z odczytu bez blokady - poprawiane niżej, jeśli w międzyczasie się zmieniło
+            history = GameHistory.objects.create(
+                game=game,
+                white_player_id=white_id,
+                black_player_id=black_id,
+                winner_id=winner_id,
+                white_elo=game.white_player.profile.elo,
+                black_elo=game.black_player.profile.elo,
+                reason=reason,
+                moves=state_dict.get('moves', []),
+            )
 
-        p_white.elo = new_w
-        p_black.elo = new_b
-        
-        p_white.save()
-        p_black.save()
-
-        state_dict = json.loads(game.state) if game.state else {}
-        move_list = state_dict.get('moves', [])
-
-        GameHistory.objects.create(
-            white_player=white_player,
-            black_player=black_player,
-            winner=winner_user,
-            white_elo=old_w_elo,
-            black_elo=old_b_elo,
-            reason=reason,
-            moves=move_list
-        )
-        
-    except Exception as e:
-        print(f"Błąd aktualizacji ELO: {e}")
+            # Aktualne ELO pod blokadą wierszy (kolejność po user_id - bez zakleszczeń między partiami)
+            ratings = {
+                row[0]: row[1:]
+                for row in PlayerProfile.objects.select_for_update()
+                .filter(user_id__in=(white_id, black_id))
+                .order_by('user_id')
+                .values_list('user_id', 'elo', 'glicko_rating', 'glicko_rd', 'glicko_volatility')
+            }
+            old_w_elo, old_b_elo = ratings[white_id][0], ratings[black_id][0]
+            if (old_w_elo, old_b_elo) != (history.white_elo, history.black_elo):
+                history.white_elo, history.black_elo = old_w_elo, old_b_elo
+                history.save(update_fields=['white_elo', 'black_elo'])
+
+            if is_draw or winner_color == 'b':
+                new_w, new_b = update_ratings(old_w_elo, old_b_elo, is_draw=is_draw)
+            else:
+                new_b, new_w = update_ratings(old_b_elo, old_w_elo, is_draw=False)
+            white_score = 0.5 if is_draw else (1.0 if winner_color == 'b' else 0.0)
+            glicko_w, glicko_b = glicko_service.rate_game(
+                ratings[white_id][1:], ratings[black_id][1:], white_score, tau=GLICKO_TAU)
+
+            # Oba profile jednym UPDATE; liczniki przez F() (bez nadpisywania całych obiektów)
+            PlayerProfile.objects.filter(user_id__in=(white_id, black_id)).update(
+                elo=Case(When(user_id=white_id, then=Value(new_w)), default=Value(new_b)),
+                wins=F('wins') + Case(When(user_id=winner_id, then=Value(1)), default=Value(0)),
+                losses=F('losses') + Case(When(user_id=loser_id, then=Value(1)), default=Value(0)),
+                draws=F('draws') + (1 if is_draw else 0),
+                glicko_rating=Case(When(user_id=white_id, then=Value(glicko_w[0])), default=Value(glicko_b[0])),
+                glicko_rd=Case(When(user_id=white_id, then=Value(glicko_w[1])), default=Value(glicko_b[1])),
+                glicko_volatility=Case(When(user_id=white_id, then=Value(glicko_w[2])), default=Value(glicko_b[2])),
+            )
+            # update() nie wysyła post_save - profil w cache użytkowników WebSocket trzeba unieważnić ręcznie
+            transaction.on_commit(lambda: (user_cache.invalidate(white_id), user_cache.invalidate(black_id)))
+        return True
+
+    except IntegrityError:
+        # wynik tej partii jest już zapisany
+        return False
+    except Exception:
+        logger.exception("Game result update failed: room=%s", room_name)
+        return False
 
 @database_sync_to_async
 def process_game_result(room_name, winner_color, reason):
     return process_game_result_sync(room_name, winner_color, reason)
 
-def _serialize_room(room):
-    return {
-        'name': room.name,
-        'players': [_get_player_summary(p) for p in room.players.all()],
-        'players_count': room.players_count,
-        'has_password': bool(room.password_hash),
-        'status': room.status,
-    }
+def game_over_message(state):
+    """Wiadomość "game_over" (pełny snapshot) - seq jak w deltach, żeby klient wiedział, gdzie jest."""
+    return {"type": "game_over", "v": PROTOCOL_VERSION, "seq": len(state["moves"]), "state": state}
+
+
+def encoded_event(event_type, message):
+    """Event dla group_send z wiadomością zakodowaną raz na broadcast - w JSON i (jeśli jest msgpack) binarnie."""
+    event = {"type": event_type, "text": codec.dumps(message)}
+    if wire.available():
+        event["bytes"] = wire.encode(message)
+    return event
+
+
+async def broadcast_game_event(room_name, event_type, message, legal=None):
+    """
+    Broadcast delty / game_over do pokoju; zdarzenie trafia też do bufora powtórek (wznowienie po reconnect).
+    legal ("legal_moves" strony na ruchu) jedzie w tym samym zdarzeniu, ale wysyła go tylko konsument tego gracza.
+    """
+    trace_id = tracing.current_id()
+    if trace_id:
+        # id trace ruchu w broadcaście - do powiązania zgłoszenia klienta z /traces/slow/
+        message["trace"] = trace_id
+    with tracing.span("encode"):
+        event = encoded_event(event_type, message)
+        if legal is not None:
+            event["legal_turn"] = legal["turn"]
+            event["legal"] = encoded_event("legal_moves", legal)
+    replay_buffer.record(room_name, message["seq"], event)
+    with metrics.GROUP_SEND_SECONDS.time(), tracing.span("group_send"):
+        await get_channel_layer().group_send(f"game_{room_name}", event)
+
+
+def finish_game_sync(room_name, winner_color, reason, expected_turn=None):
+    """
+    Kończy grę (poddanie, remis, timeout) w sesji i w bazie, potem liczy ELO.
+    Zwraca pełny stan dla klientów albo None, jeśli gra już była skończona.
+    """
+    for _ in range(2):
+        session = game_sessions.get(room_name, fresh=True)
+        with session.lock:
+            state = session.state
+            if state.get("game_over"):
+                return None
+            if expected_turn is not None and session.manager.get_game_turn() != expected_turn:
+                return None
+            state["game_over"] = True
+            state["winner"] = winner_color
+            state["reason"] = reason
+            if reason == "timeout":
+                state["white_time" if winner_color == "c" else "black_time"] = 0
+            if session.save():
+                snapshot = session.snapshot()
+                break
+        game_sessions.discard(room_name)
+    else:
+        return None
+
+    process_game_result_sync(room_name, winner_color, reason)
+    return snapshot
 
 
 @database_sync_to_async
@@ -232,61 +293,206 @@ def check_game_timeout(room_name):
     Jeśli nie -> zwraca None.
     """
     try:
-        game = Game.objects.get(room_name=room_name)
-        if not game.state:
-            return None
-            
-        state = json.loads(game.state)
-        
-        # Jeśli gra już się skończyła, nic nie rób
-        if state.get("game_over"):
-            return None
+        session = game_sessions.get(room_name, fresh=True)
+        with session.lock:
+            state = session.state
 
-        # Pobierz dane o czasie
-        turn = state.get("turn", "b")
-        last_move_ts = state.get("last_move_timestamp", time.time())
-        moves_history = state.get("moves", [])
-        
-        # Czas nie płynie przed pierwszym ruchem
-        if len(moves_history) == 0:
+            # Jeśli gra już się skończyła, nic nie rób
+            if state.get("game_over"):
+                return None
+
+            # Pobierz dane o czasie
+            turn = session.manager.get_game_turn()
+            last_move_ts = state.get("last_move_timestamp", time.time())
+
+            # Czas nie płynie przed pierwszym ruchem
+            if len(state["moves"]) == 0:
+                return None
+
+            elapsed = time.time() - last_move_ts
+
+            if turn == 'b':
+                remaining = state.get("white_time", 600) - elapsed
+            else:
+                remaining = state.get("black_time", 600) - elapsed
+
+        if remaining > 0:
             return None
 
-        now = time.time()
-        elapsed = now - last_move_ts
-        
-        timeout_occurred = False
-        
-        # Sprawdzamy czy czas minął (z małym buforem np. 0.5s na lagi)
-        if turn == 'b':
-            remaining = state.get("white_time", 600) - elapsed
-            if remaining <= 0:
-                state["white_time"] = 0
-                state["winner"] = "c" # Wygrywają czarne
-                timeout_occurred = True
-        else:
-            remaining = state.get("black_time", 600) - elapsed
-            if remaining <= 0:
-                state["black_time"] = 0
-                state["winner"] = "b" # Wygrywają białe
-                timeout_occurred = True
-        
-        if timeout_occurred:
-            state["game_over"] = True
-            state["reason"] = "timeout"
-            winner_col = state["winner"]
-            process_game_result_sync(room_name, winner_col, 'timeout')
-            # Zapisujemy zmianę w bazie
-            game.state = json.dumps(state)
-            game.save(update_fields=["state", "updated_at"])
-            return state
-            
-        return None
+        # Czas minął gracza na turze -> wygrywa przeciwnik
+        return finish_game_sync(room_name, 'c' if turn == 'b' else 'b', 'timeout', expected_turn=turn)
 
-    except Game.DoesNotExist:
+    except Exception:
+        logger.exception("Timeout check failed: room=%s", room_name)
         return None
+
+
+def apply_move_sync(room_name, move_data: dict):
+    """Wykonuje ruch w sesji pokoju i zapisuje go. Uruchamiane w engine_executor (wątek albo proces)."""
+    try:
+        # Dwie próby: jeśli ktoś inny zmienił grę w bazie, odtwarzamy sesję i próbujemy ponownie
+        for _ in range(2):
+            with tracing.span("session_load"):
+                session = game_sessions.get(room_name)
+            with session.lock:
+                result = _apply_move_to_session(room_name, session, move_data)
+            if result is not None:
+                return result
+            game_sessions.discard(room_name)
+        return False, "game state changed, try again", None, None
+
     except Exception as e:
-        print(f"Error checking timeout: {e}")
+        # sesja mogła zostać zmieniona bez zapisu - następny ruch odtworzy ją z bazy
+        game_sessions.discard(room_name)
+        logger.exception("Exception in apply_move_sync")
+        return False, f"server error: {e}", None, None
+
+
+def _apply_move_to_session(room_name, session, move_data: dict):
+    """
+    Zwraca (success, payload_or_err, nowy termin zegara, legal) albo None, gdy zapis do bazy trafił na nowszy stan.
+    payload to gotowa wiadomość dla klientów: delta "move" albo snapshot "game_over";
+    legal to wiadomość "legal_moves" dla gracza na ruchu (tylko po zwykłym ruchu).
+    """
+    state = session.state
+
+    # Sprawdź czy gra się już nie skończyła
+    if state.get('game_over'):
+        return False, "Game is already over", None, None
+
+    turn = session.manager.get_game_turn() # 'b' to białe w Twoim silniku, 'c' czarne
+
+    # --- LOGIKA CZASU ---
+    now = time.time()
+    last_time = state.get('last_move_timestamp', now)
+    white_time = state['white_time']
+    black_time = state['black_time']
+    # Odejmujemy czas tylko jeśli to NIE jest pierwszy ruch w grze
+    # (można też odejmować zawsze, ale wtedy biały traci czas czekając na start)
+    if len(state['moves']) > 0:
+        time_delta = now - last_time
+
+        if turn == 'b': # Białe robiły ruch, więc im odejmujemy
+            white_time -= time_delta
+        else:
+            black_time -= time_delta
+
+    if white_time <= 0 or black_time <= 0:
+        # KONIEC GRY PRZEZ CZAS
+        state['white_time'] = max(0, white_time)
+        state['black_time'] = max(0, black_time)
+        state['game_over'] = True
+        state['reason'] = 'timeout'
+        # Jeśli czas skończył się białym (white_time <= 0), wygrywają czarne ('c')
+        state['winner'] = 'c' if white_time <= 0 else 'b'
+
+        with metrics.DB_SAVE_SECONDS.time():
+            if not session.save():
+                return None
+        metrics.TIMEOUTS.inc()
+        with tracing.span("rating_update"):
+            process_game_result_sync(room_name, state['winner'], 'timeout')
+
+        return True, game_over_message(session.snapshot()), None, None
+
+    # 2. Jeśli czas jest OK, aplikujemy ruch bezpośrednio na silniku z pamięci
+    with metrics.ENGINE_APPLY_SECONDS.time():
+        move, err = session.apply_move(move_data)
+        if move is not None:
+            with tracing.span("mate_check"):
+                is_checkmate = session.manager.is_checkmate()
+                is_stalemate = session.manager.is_stalemate()
+    if move is None:
+        return False, err or "illegal move", None, None
+
+    state['white_time'] = white_time
+    state['black_time'] = black_time
+    state['last_move_timestamp'] = now # Aktualizujemy czas ostatniego ruchu na TERAZ
+
+    if is_checkmate:
+        state['game_over'] = True
+        state['reason'] = 'checkmate'
+        state['winner'] = turn
+    elif is_stalemate:
+        state['game_over'] = True
+        state['reason'] = 'stalemate'
+        state['winner'] = None
+
+    # Zapis do bazy: wiersz w dzienniku ruchów (+ checkpoint co kilkanaście ruchów i na koniec gry)
+    with metrics.DB_SAVE_SECONDS.time(), tracing.span("db_commit"):
+        if not session.save_move(move):
+            return None
+
+    if is_checkmate or is_stalemate:
+        with tracing.span("rating_update"):
+            if is_checkmate:
+                process_game_result_sync(room_name, turn, 'checkmate')
+            else:
+                process_game_result_sync(room_name, None, 'stalemate')
+
+    # Tylko delta (zmienione pola, zegary, flagi) - pełny stan idzie w connected / sync
+    deadline = flag_fall_deadline(state, session.manager.get_game_turn())
+    with tracing.span("delta"):
+        delta = session.move_delta(move)
+        legal = session.legal_moves_message()
+    return True, delta, deadline, legal
+
+
+@database_sync_to_async
+def get_game_deadline(room_name):
+    session = game_sessions.get(room_name, fresh=True)
+    with session.lock:
+        return flag_fall_deadline(session.state, session.manager.get_game_turn())
+
+
+async def on_flag_fall(room_name):
+    """
+    Wołane przez clock_scheduler, gdy minie termin partii.
+    Kończy grę na czas (raz) albo zwraca nowy termin, jeśli zegar się w międzyczasie zmienił.
+    """
+    with metrics.TIMEOUT_CHECK_SECONDS.time():
+        timeout_state = await check_game_timeout(room_name)
+    if timeout_state:
+        metrics.TIMEOUTS.inc()
+        # Wyślij Game Over do wszystkich w pokoju
+        await broadcast_game_event(room_name, "broadcast_game_over", game_over_message(timeout_state))
         return None
+    return await get_game_deadline(room_name)
+
+
+async def on_quick_match(white, black):
+    """Wołane przez matchmaking_queue dla każdej pary: tworzy pokój i wysyła obu graczom "joined"."""
+    name = f"QuickMatch_{uuid.uuid4().hex[:8]}"
+    room_obj = await create_match_room_db(name, white.user_id, black.user_id)
+    lobby_index.upsert(room_obj)
+    channel_layer = get_channel_layer()
+    for ticket in (white, black):
+        await channel_layer.send(ticket.channel_name, {"type": "lobby.match_found", "room": room_obj})
+
+
+clock_scheduler = ClockScheduler(on_flag_fall)
+room_locks = RoomLocks()
+matchmaking_queue = MatchmakingQueue(
+    on_quick_match,
+    bucket_size=getattr(settings, "MATCHMAKING_BUCKET_SIZE", 100),
+    base_window=getattr(settings, "MATCHMAKING_BASE_WINDOW", 100),
+    widen_rate=getattr(settings, "MATCHMAKING_WINDOW_GROWTH", 25),
+    max_window=getattr(settings, "MATCHMAKING_MAX_WINDOW", 800),
+)
+
+# Gauge liczone przy odczycie /metrics/
+metrics.registry.gauge("chess_live_rooms", "Game sessions held in memory",
+                       func=lambda: game_sessions.stats()["sessions"])
+metrics.registry.gauge("chess_executor_in_flight", "Engine jobs running or queued",
+                       func=lambda: engine_executor.in_flight)
+metrics.registry.gauge("chess_executor_queue_depth", "Engine jobs waiting for a worker",
+                       func=lambda: engine_executor.stats()["queue_depth"])
+metrics.registry.gauge("chess_matchmaking_queue_length", "Players waiting for quick_match",
+                       func=lambda: matchmaking_queue.stats()["queue_length"])
+metrics.registry.gauge("chess_lobby_rooms", "Rooms in the lobby index",
+                       func=lambda: lobby_index.stats()["rooms"])
+metrics.registry.gauge("chess_timers_pending", "Armed game clocks",
+                       func=clock_scheduler.pending)
 
 
 # --- CONSUMERS ---
@@ -294,20 +500,29 @@ def check_game_timeout(room_name):
 class ChessGameConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.timer_task = None
 
         if not self.room_name or len(self.room_name) > 64:
             await self.close()
             return
 
         self.group_name = f"game_{self.room_name}"
+        self.color = None   # 'b' / 'c' gracza tego połączenia, None dla widza
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        # Binarny sub-protokół tylko na życzenie klienta, domyślnie JSON
+        self.binary = wire.available() and wire.SUBPROTOCOL in self.scope.get("subprotocols", [])
+        await self.accept(subprotocol=wire.SUBPROTOCOL if self.binary else None)
+        metrics.CONNECTS.inc()
+        metrics.CONNECTIONS.inc()
 
         user = self.scope.get("user")
         logger.info("Client connected: room=%s channel=%s user=%s", self.room_name, self.channel_name, user)
 
         try:
+            # Wznowienie po zerwanym połączeniu: klient podaje ostatni seq (?seq=N) i dostaje tylko brakujące zdarzenia
+            self.color = await self._get_color(user)
+            if await self._resume(user):
+                return
+
             # Upewnij się, że gra istnieje (logika szachowa)
             await self._ensure_game_exists()
             state = await self._get_state()
@@ -316,6 +531,8 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
 
             await self.send_json({
                 "type": "connected",
+                "v": PROTOCOL_VERSION,
+                "seq": len(state["state"]["moves"]),
                 "room": self.room_name,
                 "state": state,
                 "players": players_list # <--- Wysyłamy to do Reacta
@@ -330,25 +547,41 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
                 }
             )
 
-            if not self.timer_task:
-                self.timer_task = asyncio.create_task(self._game_timer_loop())
+            # Zegar partii (np. po restarcie serwera) - jeden wspólny harmonogram zamiast pętli na połączenie
+            clock_scheduler.arm(self.room_name, flag_fall_deadline(state["state"], state["turn"]))
 
         except Exception:
             logger.exception("Error during connect")
             await self.send_json({"type": "error", "detail": "server error during connect"})
 
-    async def disconnect(self, close_code):
-        if self.timer_task:
-            self.timer_task.cancel()
-            try:
-                await self.timer_task
-            except asyncio.CancelledError:
-                pass
-            self.timer_task = None
+    async def _resume(self, user):
+        qs = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            last_seq = int(qs["seq"][0])
+        except (KeyError, ValueError):
+            return False
+        missed = replay_buffer.since(self.room_name, last_seq)
+        if missed is None:
+            return False
+        logger.info("Client resumed: room=%s from seq=%s missed=%s", self.room_name, last_seq, len(missed))
+        await self.send_json({"type": "resumed", "v": PROTOCOL_VERSION, "seq": last_seq})
+        for event in missed:
+            await self.send_encoded(event)
+        if missed:
+            # legalne ruchy po ostatnim brakującym ruchu (jeśli to teraz ruch tego gracza)
+            await self._send_legal(missed[-1])
+        await self.channel_layer.group_send(
+            self.group_name,
+            {"type": "player_joined", "user": str(user) if user and not user.is_anonymous else "anon"}
+        )
+        return True
 
+    async def disconnect(self, close_code):
         # 1. Usuń z grupy WebSocket
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
         logger.info("Client disconnected: room=%s", self.room_name)
+        metrics.DISCONNECTS.inc()
+        metrics.CONNECTIONS.dec()
 
         # 2. Usuń gracza z bazy danych (Room) i zaktualizuj Lobby
         user = self.scope.get("user")
@@ -356,34 +589,38 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
             updated_room_data = await remove_player_from_room_db(self.room_name, user.id)
             
             if updated_room_data:
-                # Jeśli pokój nadal istnieje, wyślij update do Lobby
-                await self.channel_layer.group_send("lobby", {
-                    "type": "lobby.room_update",
-                    "room": updated_room_data
-                })
+                # Pokój nadal istnieje - zmiana trafi do lobby w najbliższej paczce
+                lobby_index.upsert(updated_room_data)
             else:
-                # Jeśli pokój został usunięty (bo był pusty), wyślij informację o usunięciu?
-                # Można to obsłużyć, ale room_update zazwyczaj wystarczy, 
-                # chyba że chcemy jawnie usunąć kafelek z frontu.
-                # W prostym wariancie, jeśli update nie przyjdzie, lista się nie odświeży, 
-                # więc lepiej wysłać "room_list" ponownie lub specjalny event "room_deleted".
-                # Tutaj dla uproszczenia po prostu zmusimy lobby do odświeżenia listy.
-                rooms = await get_all_rooms_serialized()
-                await self.channel_layer.group_send("lobby", {
-                    "type": "lobby.room_list_update", # Nowy typ wiadomości pomocniczy
-                    "rooms": rooms
-                })
+                # Pokój został usunięty (był pusty)
+                lobby_index.remove(self.room_name)
+                replay_buffer.discard(self.room_name)
 
     async def receive(self, text_data=None, bytes_data=None):
+        # trace od odebrania ramki; zachowywany tylko dla ruchów
+        trace, token = tracer.start("move", self.room_name)
+        msg_type = None
         try:
-            data = json.loads(text_data)
-        except Exception:
-            logger.warning("Invalid JSON received: %s", text_data)
-            await self.send_json({"type":"error", "detail":"invalid json"})
-            return
-        
-        user = self.scope.get("user") 
-        msg_type = data.get("type")
+            try:
+                with tracing.span("parse"):
+                    if bytes_data is not None and self.binary:
+                        data = wire.decode(bytes_data)
+                    else:
+                        data = codec.loads(text_data)
+            except Exception:
+                logger.warning("Invalid message received: %s", text_data if bytes_data is None else bytes_data[:64])
+                await self.send_json({"type":"error", "detail":"invalid json"})
+                return
+
+            msg_type = data.get("type")
+            # etykieta tylko ze znanych typów - klient nie może rozdmuchać liczby serii
+            with metrics.WS_RECEIVE_SECONDS.time(msg_type if msg_type in wire.MESSAGE_TYPES else "unknown"):
+                await self._handle_message(data, msg_type)
+        finally:
+            tracer.finish(trace, token, keep=msg_type == "move")
+
+    async def _handle_message(self, data, msg_type):
+        user = self.scope.get("user")
 
         if msg_type in ("move", "chat") and (not user or user.is_anonymous): 
             await self.send_json({"type": "error", "detail": "authentication required"}) 
@@ -397,16 +634,32 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
 
             logger.info("Move requested: %s by user=%s in room=%s", move_data, self.scope.get("user"), self.room_name)
 
-            loop = asyncio.get_running_loop()
-            func = functools.partial(self._apply_move_sync, move_data)
-            result = await loop.run_in_executor(None, func)
+            # Ruchy jednego pokoju po kolei; praca silnika w osobnej, ograniczonej puli
+            try:
+                async with room_locks.get(self.room_name):
+                    with metrics.MOVE_SECONDS.time():
+                        result = await engine_executor.run(self.room_name, apply_move_sync, self.room_name, move_data)
+            except ServerBusy:
+                logger.warning("Engine executor full, move rejected: room=%s stats=%s", self.room_name, engine_executor.stats())
+                await self.send_json({"type": "error", "detail": "server busy, try again"})
+                return
 
-            success, payload_or_err = result
+            success, payload_or_err, deadline, legal = result
+            if not success:
+                metrics.ILLEGAL_MOVES.inc()
+            elif payload_or_err["type"] == "move":
+                # sukces z "game_over" to koniec na czas bez wykonanego ruchu (liczony w TIMEOUTS)
+                metrics.MOVES.inc()
             if success:
-                await self.channel_layer.group_send(
-                    self.group_name,
-                    {"type": "broadcast_move", "move": payload_or_err}
-                )
+                if payload_or_err["type"] == "game_over":
+                    clock_scheduler.cancel(self.room_name)
+                    event_type = "broadcast_game_over"
+                else:
+                    # Przestaw termin upadku flagi na gracza, który jest teraz na ruchu
+                    clock_scheduler.arm(self.room_name, deadline)
+                    event_type = "broadcast_move"
+                # Wiadomość kodowana raz na broadcast, nie raz na odbiorcę
+                await broadcast_game_event(self.room_name, event_type, payload_or_err, legal)
             else:
                 await self.send_json({"type":"error","detail": payload_or_err})
         
@@ -439,7 +692,7 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
 
         elif msg_type == "sync_request":
             state = await self._get_state()
-            await self.send_json({"type":"sync", "state": state})
+            await self.send_json({"type":"sync", "v": PROTOCOL_VERSION, "seq": len(state["state"]["moves"]), "state": state})
         
         elif msg_type == "chat":
             msg = data.get("message", "")
@@ -451,109 +704,49 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
 
     # Event Handlers
     async def broadcast_move(self, event):
-        await self.send_json({"type":"move", "move": event["move"]})
+        # gotowa delta "move" (już zakodowana), a graczowi na ruchu także jego legalne ruchy
+        await self.send_encoded(event)
+        await self._send_legal(event)
+
+    async def _send_legal(self, event):
+        if "legal" not in event:
+            return
+        if self.color is not None and self.color == event["legal_turn"]:
+            await self.send_encoded(event["legal"])
 
     async def broadcast_chat(self, event):
         await self.send_json({"type":"chat", "message": event["message"], "sender": event.get("sender")})
     
     async def player_joined(self, event): 
+        if self.color is None:
+            # ktoś usiadł przy stole - może to ten użytkownik (połączył się przed dołączeniem do gry)
+            self.color = await self._get_color(self.scope.get("user"))
         await self.send_json({ "type": "player_joined", "user": event["user"] })
 
-    async def _game_timer_loop(self):
-        """
-        Działa w tle i co sekundę sprawdza, czy czas gracza minął.
-        """
-        while True:
-            try:
-                # Sprawdzamy co 1 sekundę
-                await asyncio.sleep(1)
-                
-                # Sprawdź w bazie czy nastąpił timeout
-                timeout_state = await check_game_timeout(self.room_name)
-                
-                if timeout_state:
-                    # Jeśli tak -> wyślij Game Over do wszystkich
-                    await self.channel_layer.group_send(
-                        self.group_name,
-                        {
-                            "type": "broadcast_game_over", 
-                            "state": timeout_state
-                        }
-                    )
-                    # Skoro gra się skończyła, przerywamy pętlę monitorowania
-                    break
-                    
-            except asyncio.CancelledError:
-                # Zadanie zostało anulowane przy disconnect
-                break
-            except Exception as e:
-                # Logujemy błąd, ale nie przerywamy pętli (żeby timer nie padł przez jeden błąd)
-                print(f"Timer loop error: {e}")
-                await asyncio.sleep(5) # Odczekaj chwilę przed retry
-
     async def _handle_resign(self, user):
         """Gracz się poddaje -> przeciwnik wygrywa."""
-        # 1. Pobierz aktualny stan
-        game = await database_sync_to_async(Game.objects.get)(room_name=self.room_name)
-        state_dict = json.loads(game.state) if game.state else {}
-
-        # Jeśli gra już skończona, ignoruj
-        if state_dict.get("game_over"):
-            return
-
-        # 2. Ustal kolory
-        room = await database_sync_to_async(Room.objects.get)(name=self.room_name)
-        players = await database_sync_to_async(list)(room.players.all().order_by('id'))
-        
-        # Zakładamy: players[0]=Białe, players[1]=Czarne (zgodnie z logiką z poprzednich plików)
-        # Ustalmy kto wygrał
-        winner_color = None
-        if len(players) >= 2:
-            if user.id == players[0].id:
-                winner_color = 'c' # Biały się poddał -> czarny wygrywa
-            elif user.id == players[1].id:
-                winner_color = 'b' # Czarny się poddał -> biały wygrywa
+        # 1. Kolor z Game.white_player / black_player (w quick match białe to dłużej czekający, nie niższe id)
+        color = await self._get_player_color(user.id)
+        winner_color = {'b': 'c', 'c': 'b'}.get(color)
 
         if winner_color:
-            state_dict['game_over'] = True
-            state_dict['winner'] = winner_color
-            state_dict['reason'] = 'resignation'
-            
-            # Zapisz stan
-            game.state = json.dumps(state_dict)
-            await database_sync_to_async(game.save)()
-
-            # Aktualizuj ELO
-            await process_game_result(self.room_name, winner_color, 'resignation')
+            # 2. Zapisz koniec gry i zaktualizuj ELO (nic nie robi, jeśli gra już skończona)
+            state = await database_sync_to_async(finish_game_sync)(self.room_name, winner_color, 'resignation')
+            if state is None:
+                return
+            clock_scheduler.cancel(self.room_name)
 
             # Broadcast
-            await self.channel_layer.group_send(
-                self.group_name,
-                {"type": "broadcast_game_over", "state": state_dict}
-            )
+            await broadcast_game_event(self.room_name, "broadcast_game_over", game_over_message(state))
 
     async def _handle_draw_agreed(self):
         """Gracze zgodzili się na remis."""
-        game = await database_sync_to_async(Game.objects.get)(room_name=self.room_name)
-        state_dict = json.loads(game.state) if game.state else {}
-
-        if state_dict.get("game_over"):
+        state = await database_sync_to_async(finish_game_sync)(self.room_name, None, 'agreement') # draw by agreement
+        if state is None:
             return
+        clock_scheduler.cancel(self.room_name)
 
-        # Aktualizacja stanu
-        state_dict['game_over'] = True
-        state_dict['winner'] = None # Remis
-        state_dict['reason'] = 'agreement' # draw by agreement
-
-        game.state = json.dumps(state_dict)
-        await database_sync_to_async(game.save)()
-
-        await process_game_result(self.room_name, None, 'agreement')
-
-        await self.channel_layer.group_send(
-            self.group_name,
-            {"type": "broadcast_game_over", "state": state_dict}
-        )
+        await broadcast_game_event(self.room_name, "broadcast_game_over", game_over_message(state))
 
     # --- EVENT HANDLERS (do wysyłania JSON do klienta) ---
 
@@ -573,117 +766,10 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
         })
 
     async def broadcast_game_over(self, event):
-        # Nadpisujemy stan na froncie nowym stanem z flagą game_over
-        await self.send_json({
-            "type": "game_over",
-            "state": event["state"]
-        })
-
-    # Helpery Sync/Async (bez zmian logiki gry)
-    def _apply_move_sync(self, move_data: dict):
-        try:
-            game, created = Game.objects.get_or_create(room_name=self.room_name)
-            if created or not game.state:
-                game.state = EngineWrapper.get_initial_state()
-
-            current_state_dict = json.loads(game.state)
-            
-            # Sprawdź czy gra się już nie skończyła
-            if current_state_dict.get('game_over'):
-                return False, "Game is already over"
-            
-            turn = current_state_dict.get('turn', 'b') # 'b' to białe w Twoim silniku, 'c' czarne
-            moves_history = current_state_dict.get('moves', [])
-            
-            # --- LOGIKA CZASU ---
-            now = time.time()
-            last_time = current_state_dict.get('last_move_timestamp', now)
-            # Odejmujemy czas tylko jeśli to NIE jest pierwszy ruch w grze
-            # (można też odejmować zawsze, ale wtedy biały traci czas czekając na start)
-            if len(moves_history) > 0:
-                time_delta = now - last_time
-                
-                if turn == 'b': # Białe robiły ruch, więc im odejmujemy
-                    current_state_dict['white_time'] -= time_delta
-                else:
-                    current_state_dict['black_time'] -= time_delta
-
-            # Sprawdzenie przegranej na czas (Timeout)
-            w_time = current_state_dict['white_time']
-            b_time = current_state_dict['black_time']
-            
-            if w_time <= 0 or b_time <= 0:
-                # KONIEC GRY PRZEZ CZAS
-                current_state_dict['white_time'] = max(0, w_time)
-                current_state_dict['black_time'] = max(0, b_time)
-                current_state_dict['game_over'] = True
-                current_state_dict['reason'] = 'timeout'
-                # Jeśli czas skończył się białym (w_time <= 0), wygrywają czarne ('c')
-                current_state_dict['winner'] = 'c' if w_time <= 0 else 'b'
-                
-                # Zapisujemy i zwracamy info o końcu
-                game.state = json.dumps(current_state_dict)
-                game.save(update_fields=["state", "updated_at"])
-                
-                return True, {
-                    "type": "game_over", # Specjalny typ ruchu, frontend musi to obsłużyć lub po prostu odświeżyć stan
-                    "state": current_state_dict
-                }
-
-            # 2. Jeśli czas jest OK, aplikujemy ruch w silniku
-            # Musimy przekazać zaktualizowany o czasy stan do walidacji (choć EngineWrapper może nadpisać strukturę)
-            # Najlepiej wywołać walidację na JSON stringu, a potem do wyniku DOKLEIĆ czasy.
-            
-            # Serializujemy zaktualizowany czasowo stan, żeby EngineWrapper miał aktualne dane (choć on głównie patrzy na planszę)
-            temp_state_str = json.dumps(current_state_dict)
-
-            valid, new_state_str, info = EngineWrapper.validate_and_apply(temp_state_str, move_data)
-
-            if not valid:
-                err = info.get("error") if isinstance(info, dict) else str(info)
-                return False, err or "illegal move"
-            
-            new_state_dict = json.loads(new_state_str)
-            
-            # Przenosimy obliczone czasy do nowego stanu
-            new_state_dict['white_time'] = current_state_dict['white_time']
-            new_state_dict['black_time'] = current_state_dict['black_time']
-            new_state_dict['last_move_timestamp'] = now # Aktualizujemy czas ostatniego ruchu na TERAZ
-
-            is_checkmate = new_state_dict.get('checkmate')
-            is_stalemate = new_state_dict.get('stalemate')
-
-            # Sprawdzenie mata/pata z silnika (EngineWrapper to ustawia, ale upewnijmy się)
-            if is_checkmate:
-                new_state_dict['game_over'] = True
-                new_state_dict['reason'] = 'checkmate'
-                new_state_dict['winner'] = turn 
-            elif is_stalemate:
-                new_state_dict['game_over'] = True
-                new_state_dict['reason'] = 'stalemate'
-                new_state_dict['winner'] = None
-
-            # Zapis do bazy
-            game.state = json.dumps(new_state_dict)
-            game.save(update_fields=["state", "updated_at"])
-
-            if is_checkmate:
-                process_game_result_sync(self.room_name, turn, 'checkmate')
-            elif is_stalemate:
-                process_game_result_sync(self.room_name, None, 'stalemate')
-
-            payload = {
-                "uci": info.get("uci", move_data),
-                "info": info,
-                "state": new_state_dict, # Tu poleci pełny stan z czasami
-            }
-            return True, payload
-        
-        except Exception as e:
-            tb = traceback.format_exc()
-            logger.exception("Exception in _apply_move_sync")
-            return False, f"server error: {e}"
+        # Nadpisujemy stan na froncie nowym stanem z flagą game_over (wiadomość już zakodowana)
+        await self.send_encoded(event)
 
+    # Helpery Sync/Async
     @database_sync_to_async
     def _ensure_game_exists(self):
         game, created = Game.objects.get_or_create(room_name=self.room_name)
@@ -691,6 +777,22 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
             game.state = EngineWrapper.get_initial_state()
             game.save(update_fields=["state"])
 
+    async def _get_color(self, user):
+        if not user or user.is_anonymous:
+            return None
+        return await self._get_player_color(user.id)
+
+    @database_sync_to_async
+    def _get_player_color(self, user_id):
+        players = Game.objects.filter(room_name=self.room_name).values_list('white_player_id', 'black_player_id').first()
+        if players is None:
+            return None
+        if user_id == players[0]:
+            return 'b'
+        if user_id == players[1]:
+            return 'c'
+        return None
+
     @database_sync_to_async
     def _get_game_players(self):
         try:
@@ -713,43 +815,58 @@ class ChessGameConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def _get_state(self):
-        # ... (Twoja logika pobierania stanu)
-        game = Game.objects.get(room_name=self.room_name)
-        try:
-            obj = json.loads(game.state) if game.state else {}
-        except:
-            obj = {}
-        
-        try:
-            mgr, _ = EngineWrapper._reconstruct_manager_from_state(game.state)
-            turn = mgr.get_game_turn()
-        except:
-            turn = None
-        return {"state": obj, "turn": turn}
+        # Sesja z pamięci, o ile nikt w międzyczasie nie zmienił gry w bazie
+        session = game_sessions.get(self.room_name, fresh=True)
+        with session.lock:
+            return {"state": session.snapshot(), "turn": session.manager.get_game_turn()}
 
     async def send_json(self, data):
-        await self.send(text_data=json.dumps(data))
+        if self.binary:
+            await self.send(bytes_data=wire.encode(data))
+        else:
+            await self.send(text_data=codec.dumps(data))
+
+    async def send_encoded(self, event):
+        # event z encoded_event() - format wybrany dla tego połączenia
+        if self.binary:
+            await self.send(bytes_data=event["bytes"])
+        else:
+            await self.send(text_data=event["text"])
 
 
 # --- LOBBY CONSUMER ---
 
 class LobbyConsumer(AsyncJsonWebsocketConsumer):
+    @classmethod
+    async def decode_json(cls, text_data):
+        return codec.loads(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return codec.dumps(content)
+
     async def connect(self):
         await self.accept()
-        await self.channel_layer.group_add("lobby", self.channel_name)
-        rooms = await get_all_rooms_serialized()
-        await self.send_json({'type': 'room_list', 'rooms': rooms})
+        await self.channel_layer.group_add(LOBBY_GROUP, self.channel_name)
+        # Snapshot z pamięci (baza tylko przy pierwszym użyciu w procesie)
+        await lobby_index.ensure_loaded()
+        await self.send_json(lobby_index.snapshot())
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("lobby", self.channel_name)
+        await self.channel_layer.group_discard(LOBBY_GROUP, self.channel_name)
+        user = self.scope.get('user')
+        if user and not user.is_anonymous:
+            # wyjście z lobby = rezygnacja z kolejki (o ile czekał z tego połączenia)
+            matchmaking_queue.cancel(user.id, self.channel_name)
 
     async def receive_json(self, content):
         typ = content.get('type')
         user = self.scope.get('user') or AnonymousUser()
 
         if typ == 'lobby_subscribe':
-            rooms = await get_all_rooms_serialized()
-            await self.send_json({'type': 'room_list', 'rooms': rooms})
+            # Także ponowna synchronizacja, gdy klient zauważy lukę w wersjach
+            await lobby_index.ensure_loaded()
+            await self.send_json(lobby_index.snapshot())
             return
 
         if typ == 'quick_match':
@@ -757,42 +874,17 @@ class LobbyConsumer(AsyncJsonWebsocketConsumer):
                 await self.send_json({'type': 'error', 'message': 'auth required'})
                 return
 
-            # 1. Próba znalezienia istniejącego pokoju
-            existing_room = await find_open_room_for_quick_match(user.id)
-
-            if existing_room:
-                # Próbujemy dołączyć używając istniejącej logiki
-                res = await try_join_room_db(existing_room.name, user.id, "")
-                if res['success']:
-                    # Udało się dołączyć
-                    await self.channel_layer.group_send("lobby", {
-                        "type": "lobby.room_update",
-                        "room": res['room']
-                    })
-                    await self.send_json({'type': 'joined', 'room': res['room'], 'success': True})
-                    return
-                # Jeśli z jakiegoś powodu się nie udało (np. ułamek sekundy temu ktoś wbił), 
-                # kod przejdzie dalej i stworzy nowy pokój.
-
-            # 2. Tworzenie nowego pokoju (jeśli nie znaleziono lub dołączenie nie wyszło)
-            # Generujemy losową nazwę, np. QuickMatch_a1b2c3d4
-            random_suffix = uuid.uuid4().hex[:8]
-            name = f"QuickMatch_{random_suffix}"
-            
-            room_obj = await create_room_db(name, user.id, "") # puste hasło
+            # Kolejka w pamięci zamiast szukania wolnego pokoju w bazie;
+            # po sparowaniu obaj gracze dostają 'joined' (lobby_match_found)
+            elo = await get_player_elo(user.id)
+            matchmaking_queue.enqueue(user.id, elo, self.channel_name)
+            await self.send_json({'type': 'queued', 'elo': elo})
+            return
 
-            # Broadcast do lobby
-            await self.channel_layer.group_send("lobby", {
-                "type": "lobby.room_created",
-                "room": room_obj
-            })
-            
-            # Info dla gracza, że dołączył (do swojego pokoju)
-            await self.send_json({
-                'type': 'joined', 
-                'room': room_obj, 
-                'success': True
-            })
+        if typ == 'cancel_quick_match':
+            if not user.is_anonymous:
+                matchmaking_queue.cancel(user.id)
+            await self.send_json({'type': 'queue_left'})
             return
 
         if typ == 'create_room':
@@ -805,12 +897,11 @@ class LobbyConsumer(AsyncJsonWebsocketConsumer):
             
             # Tworzymy pokój w DB
             room_obj = await create_room_db(name, user.id, password)
+            # stara gra o tej nazwie usunięta - jej delty nie mogą trafić do wznowienia nowej (?seq=k)
+            replay_buffer.discard(name)
             
-            # 1. Broadcast do wszystkich w lobby (że powstał nowy pokój)
-            await self.channel_layer.group_send("lobby", {
-                "type": "lobby.room_created",
-                "room": room_obj
-            })
+            # 1. Nowy pokój trafi do wszystkich w lobby w najbliższej paczce zmian
+            lobby_index.upsert(room_obj)
             
             # 2. AUTO-JOIN: Wyślij wiadomość 'joined' bezpośrednio do twórcy!
             # To sprawi, że frontend od razu przekieruje go do gry.
@@ -836,11 +927,8 @@ class LobbyConsumer(AsyncJsonWebsocketConsumer):
                 await self.send_json({'type': 'error', 'message': err})
                 return
             
-            # Broadcast update do lobby (zmieniła się liczba graczy)
-            await self.channel_layer.group_send("lobby", {
-                "type": "lobby.room_update",
-                "room": res['room']
-            })
+            # Update do lobby (zmieniła się liczba graczy)
+            lobby_index.upsert(res['room'])
             
             # Notify the joiner
             await self.send_json({'type': 'joined', 'room': res['room'], 'success': True})
@@ -849,12 +937,9 @@ class LobbyConsumer(AsyncJsonWebsocketConsumer):
         await self.send_json({'type': 'error', 'message': 'unknown type'})
 
     # Handlers for group sends
-    async def lobby_room_created(self, event):
-        await self.send_json({'type': 'room_created', 'room': event['room']})
+    async def lobby_match_found(self, event):
+        await self.send_json({'type': 'joined', 'room': event['room'], 'success': True})
 
-    async def lobby_room_update(self, event):
-        await self.send_json({'type': 'room_update', 'room': event['room']})
-    
-    # Dodatkowa obsługa pełnego odświeżenia listy (np. po usunięciu pokoju)
-    async def lobby_room_list_update(self, event):
-        await self.send_json({'type': 'room_list', 'rooms': event['rooms']})
\ No newline at end of file
+    async def lobby_room_diff(self, event):
+        # paczka zmian z lobby_index (już zakodowana)
+        await self.send(text_data=event['text'])
\ No newline at end of file
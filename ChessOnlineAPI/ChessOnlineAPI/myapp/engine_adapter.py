@@ -1,5 +1,4 @@
 # games/engine_adapter.py
-import json
 import re
 import time
 from typing import Tuple, Dict, Any, List
@@ -13,31 +12,32 @@ from myapp.chess_engine.pieces.Knight import Knight
 from myapp.chess_engine.pieces.Rook import Rook
 from myapp.chess_engine.utils.Castling import CastlingRules
 from myapp.chess_engine.utils.Move import Move
+from myapp.chess_engine.utils.Fen import START_FEN
 
 # Adjust import path to where you put your ChessGameManager
 # Example: games/engine_impl/chess_manager.py contains ChessGameManager
 from .chess_engine.Game_Manager import ChessGameManager
+from . import codec, tracing
+
+# Wersja formatu Game.state: 2 = FEN + lista ruchów + zegary (bez planszy i legalnych ruchów)
+STATE_VERSION = 2
+
 
 class EngineWrapper:
     """
     Adapter that:
-      - serializes state as JSON: {"moves": [...], "board": [[...]], "checkmate": bool, "stalemate": bool}
-      - reconstructs state by replaying moves
+      - stores state as compact JSON: {"v": 2, "fen": "...", "moves": [...], clocks, result}
+      - reads older rows (full board snapshot + legal_moves) lazily, they are rewritten on next save
+      - builds the full client view (board, legal_moves, turn, ...) from the engine
       - validate_and_apply applies a new move (user notation e.g. "e2e4" or your user_notation)
     """
 
     @staticmethod
     def _empty_state() -> Dict[str, Any]:
-        mgr = ChessGameManager()
         return {
+            "v": STATE_VERSION,
+            "fen": START_FEN,
             "moves": [],
-            "legal_moves": mgr.get_possible_move_notations(),
-            "board": mgr.get_board_state(),
-            "checkmate": mgr.is_checkmate(),
-            "stalemate": mgr.is_stalemate(),
-            "turn": mgr.get_game_turn(),
-            "castling": mgr.get_board_castling_rules(),
-            "check": mgr.if_check('b'),
             "white_time": 600.0,    # 10 minut w sekundach
             "black_time": 600.0,
             "last_move_timestamp": time.time(), # Czas ostatniej akcji
@@ -48,8 +48,66 @@ class EngineWrapper:
 
     @staticmethod
     def get_initial_state() -> str:
+        return codec.dumps(EngineWrapper._empty_state())
+
+    @staticmethod
+    def load_state(serialized_state) -> Tuple[ChessGameManager, Dict[str, Any]]:
+        """Zwraca (menedżer z pozycją, stan w formacie v2). Stary format jest migrowany w locie."""
+        obj = serialized_state
+        if isinstance(obj, (bytes, bytearray)):
+            obj = obj.decode("utf-8")
+        if isinstance(obj, str):
+            try:
+                obj = codec.loads(obj) if obj else None
+            except ValueError:
+                obj = None
+        if not isinstance(obj, dict):
+            state = EngineWrapper._empty_state()
+            return ChessGameManager.from_fen(state["fen"]), state
+
+        if obj.get("v") == STATE_VERSION:
+            try:
+                with tracing.span("from_fen"):
+                    return ChessGameManager.from_fen(obj["fen"]), obj
+            except (KeyError, ValueError):
+                pass
+
+        # stary format: pełna plansza + legal_moves (albo uszkodzony FEN)
+        mgr = EngineWrapper._manager_from_legacy_state(obj)
         state = EngineWrapper._empty_state()
-        return json.dumps(state)
+        for key in ("moves", "white_time", "black_time", "last_move_timestamp", "game_over", "winner", "reason"):
+            if key in obj:
+                state[key] = obj[key]
+        state["fen"] = mgr.get_fen()
+        return mgr, state
+
+    @staticmethod
+    def _manager_from_legacy_state(obj: Dict[str, Any]) -> ChessGameManager:
+        # Odtworzenie z listy ruchów zachowuje bicie w przelocie i liczniki;
+        # gdy zapis nie zgadza się ze snapshotem planszy - używamy snapshotu
+        mgr = ChessGameManager()
+        for notation in obj.get("moves", []):
+            if not mgr.make_move(notation):
+                break
+        else:
+            if not obj.get("board") or mgr.get_board_state() == obj["board"]:
+                return mgr
+        mgr, _ = EngineWrapper._reconstruct_manager_from_state(obj)
+        return mgr
+
+    @staticmethod
+    def dump_state(mgr: ChessGameManager, state: Dict[str, Any]) -> str:
+        with tracing.span("serialize_state"):
+            state["fen"] = mgr.get_fen()
+            return codec.dumps(state)
+
+    @staticmethod
+    def client_state(mgr: ChessGameManager, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Pełny widok stanu dla frontendu (plansza, legalne ruchy, tura...) - nie jest zapisywany."""
+        view = dict(state)
+        view["fen"] = mgr.get_fen()
+        view.update(EngineWrapper.manager_state(mgr, list(state["moves"])))
+        return view
 
     @staticmethod
     def _reconstruct_manager_from_state(state_json: str) -> Tuple[ChessGameManager, List[str]]:
@@ -68,7 +126,7 @@ class EngineWrapper:
             else:
                 state_text = state_json
             try:
-                obj = json.loads(state_text)
+                obj = codec.loads(state_text)
             except Exception:
                 return mgr, []
 
@@ -107,7 +165,7 @@ class EngineWrapper:
         
         # Jeżeli jest board -> zbuduj planszę bez replayowania ruchów
         if board_data and isinstance(board_data, list):
-            b = Board()
+            b = mgr.board
 
             # zainicjuj pustą 8x8 planszę
             new_board = [[None for _ in range(8)] for _ in range(8)]
@@ -171,8 +229,8 @@ class EngineWrapper:
 
 
     @staticmethod
-    def serialize_manager_state(mgr: ChessGameManager, moves: List[str]) -> str:
-        state = {
+    def manager_state(mgr: ChessGameManager, moves: List[str]) -> Dict[str, Any]:
+        return {
             "moves": moves,
             "legal_moves": mgr.get_possible_move_notations(),
             "board": mgr.get_board_state(),
@@ -182,13 +240,12 @@ class EngineWrapper:
             "castling": mgr.get_board_castling_rules(),
             "check": mgr.if_check(mgr.get_game_turn()),
         }
-        return json.dumps(state)
 
     
     @staticmethod
     def validate_and_apply(serialized_state: str, move_data: dict) -> Tuple[bool, str, Dict[str,Any]]:
         try:
-            mgr, moves = EngineWrapper._reconstruct_manager_from_state(serialized_state)
+            mgr, state = EngineWrapper.load_state(serialized_state)
             # Check legal moves first (optional)
             legal = mgr.get_possible_moves()
 
@@ -219,20 +276,24 @@ class EngineWrapper:
             resolved = check_if_conflict_notations(mgr, move_obj, legal)
             move_obj.user_notation = resolved
 
+            is_promotion = move_obj.moved_figure is not None and move_obj.moved_figure.name == "Pionek" and dest_row in (0, 7)
+            promo = (promo or "H") if is_promotion else None
+
             ok = mgr.make_move(move_obj.user_notation, promo)
             if not ok:
                 return False, serialized_state, {"error": "engine refused move"}
 
-            moves.append(move_obj.user_notation)
-            new_state = EngineWrapper.serialize_manager_state(mgr, moves)
-            
+            # litera promocji zostaje w zapisie, żeby odtworzenie z listy ruchów było dokładne
+            state["moves"].append(move_obj.user_notation + (promo or ""))
+            new_state = EngineWrapper.dump_state(mgr, state)
+
             return True, new_state, {}
         except Exception as e:
             return False, serialized_state, {"error": f"engine exception: {e}"}
 
     @staticmethod
     def legal_moves(serialized_state: str) -> List[str]:
-        mgr, _ = EngineWrapper._reconstruct_manager_from_state(serialized_state)
+        mgr, _ = EngineWrapper.load_state(serialized_state)
         return mgr.get_possible_move_notations()
     
     @staticmethod
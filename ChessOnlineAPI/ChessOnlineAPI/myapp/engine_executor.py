@@ -0,0 +1,156 @@
+# games/engine_executor.py
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+import weakref
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import log_handlers, metrics, tracing
+
+
+class ServerBusy(Exception):
+    """Kolejka silnika jest pełna - klient powinien spróbować ponownie."""
+
+
+def _init_process_worker(log_queue):
+    # proces potomny ("spawn") startuje bez skonfigurowanego Django; logi odsyła do procesu głównego,
+    # więc forward_to musi być przed django.setup() (tam dictConfig tworzy QueueLogHandler)
+    log_handlers.forward_to(log_queue)
+    import django
+    django.setup()
+
+
+def _timed_call(func, args):
+    # czas startu liczony w wątku/procesie roboczym - różnica do czasu zgłoszenia = czekanie w kolejce
+    started = time.time()
+    return started, func(*args)
+
+
+class EngineExecutor:
+    """
+    Osobna, ograniczona pula dla pracy silnika (zamiast domyślnego executora pętli).
+
+    kind="thread": jedna pula wątków.
+    kind="process": po jednym procesie na shard; pokój zawsze trafia do tego samego procesu,
+    więc jego sesja (game_sessions) żyje w jednym miejscu.
+    """
+
+    def __init__(self, kind="thread", workers=4, max_queue=64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._pools = None
+        self._pools_lock = threading.Lock()
+        self._log_listener = None
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _get_pools(self):
+        if self._pools is None:
+            with self._pools_lock:
+                if self._pools is None:
+                    if self.kind == "thread":
+                        self._pools = [ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="engine")]
+                    else:
+                        context = multiprocessing.get_context("spawn")
+                        log_queue = context.Queue(maxsize=getattr(settings, "CHESS_LOG_QUEUE_SIZE", 10000))
+                        self._log_listener = log_handlers.WorkerLogListener(log_queue)
+                        self._pools = [
+                            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_process_worker,
+                                                initargs=(log_queue,))
+                            for _ in range(self.workers)
+                        ]
+        return self._pools
+
+    def _pool_for(self, key):
+        pools = self._get_pools()
+        if len(pools) == 1:
+            return pools[0]
+        return pools[zlib.crc32(key.encode("utf-8")) % len(pools)]
+
+    async def run(self, key, func, *args):
+        """
+        Wykonuje func(*args) w puli. key (nazwa pokoju) wybiera shard w trybie procesów.
+        Rzuca ServerBusy, gdy zadań w kolejce jest więcej niż max_queue.
+        """
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise ServerBusy("server busy, try again")
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.submitted += 1
+        submitted_at = time.time()
+        try:
+            if self.kind == "thread":
+                # kontekst (bieżący trace) idzie do wątku roboczego; do procesu nie da się go przenieść
+                call = functools.partial(contextvars.copy_context().run, _timed_call, func, args)
+            else:
+                call = functools.partial(_timed_call, func, args)
+            started, result = await loop.run_in_executor(self._pool_for(key), call)
+        finally:
+            self.in_flight -= 1
+
+        waited = max(0.0, started - submitted_at)
+        metrics.EXECUTOR_WAIT_SECONDS.observe(waited)
+        tracing.record("executor_wait", waited, ended_ago=max(0.0, time.time() - started))
+        self.completed += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return result
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_avg": self.wait_total / self.completed if self.completed else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+    def shutdown(self):
+        with self._pools_lock:
+            for pool in self._pools or ():
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._pools = None
+            if self._log_listener is not None:
+                self._log_listener.stop()
+                self._log_listener = None
+
+
+class RoomLocks:
+    """asyncio.Lock na pokój - ruchy w jednym pokoju wykonują się po kolei. Nieużywane locki znikają same."""
+
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()
+
+    def get(self, room_name):
+        lock = self._locks.get(room_name)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[room_name] = lock
+        return lock
+
+
+engine_executor = EngineExecutor(
+    kind=getattr(settings, "ENGINE_EXECUTOR", "thread"),
+    workers=getattr(settings, "ENGINE_EXECUTOR_WORKERS", 4),
+    max_queue=getattr(settings, "ENGINE_EXECUTOR_MAX_QUEUE", 64),
+)
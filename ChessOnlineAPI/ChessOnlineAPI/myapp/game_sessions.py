@@ -0,0 +1,303 @@
+# games/game_sessions.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .chess_engine.Game_Manager import PROMOTION_LETTERS
+from . import tracing
+from .engine_adapter import EngineWrapper
+from .models import Game, GameMove
+from .move_journal import move_journal
+from .wire import pack_move, unpack_move
+
+# Wersja protokołu wiadomości WebSocket (2 = delty ruchów z numerem sekwencji)
+PROTOCOL_VERSION = 2
+
+# Co ile półruchów pełny checkpoint Game.state (pomiędzy - tylko wiersze GameMove)
+CHECKPOINT_INTERVAL = getattr(settings, "GAME_CHECKPOINT_INTERVAL", 20)
+
+
+class _Conflict(Exception):
+    pass
+
+
+class GameSession:
+    """Żywa partia jednego pokoju: menedżer silnika trzymany w pamięci + ostatnio zapisany stan."""
+
+    def __init__(self, room_name, serialized_state, updated_at, game_id=None):
+        self.room_name = room_name
+        self.game_id = game_id
+        # state: zapisywany stan v2 (FEN, ruchy, zegary, wynik); pozycja żyje w self.manager
+        self.manager, self.state = EngineWrapper.load_state(serialized_state)
+        self.updated_at = updated_at
+        # liczba półruchów w ostatnim checkpoincie (Game.state)
+        self.checkpoint_ply = len(self.state["moves"])
+        self.last_used = time.monotonic()
+        # ruchy idą przez executor, więc dwa wątki mogą trafić w ten sam pokój
+        self.lock = threading.RLock()
+        # True po wyjęciu z rejestru (discard / eviction) - ruch w toku na tej kopii nie może już być zapisany
+        self.stale = False
+
+    @classmethod
+    def load(cls, room_name):
+        """Checkpoint z Game.state + odtworzenie ruchów z dziennika (GameMove) zapisanych po nim."""
+        with tracing.span("reconstruct"):
+            return cls._load(room_name)
+
+    @classmethod
+    def _load(cls, room_name):
+        if move_journal is not None:
+            # write-behind: ruchy jeszcze w pliku muszą trafić do bazy przed odczytem
+            move_journal.flush()
+        game, created = Game.objects.get_or_create(room_name=room_name)
+        if created or not game.state:
+            game.state = EngineWrapper.get_initial_state()
+            game.save(update_fields=["state", "updated_at"])
+        session = cls(room_name, game.state, game.updated_at, game.id)
+        tail = GameMove.objects.filter(game_id=game.id, ply__gt=session.checkpoint_ply).order_by("ply")
+        for row in tail:
+            if row.ply != len(session.state["moves"]) + 1:
+                break
+            move, _ = session.apply_move(unpack_move(row.move))
+            if move is None:
+                break
+            session.state["white_time"] = row.white_time
+            session.state["black_time"] = row.black_time
+            session.state["last_move_timestamp"] = row.played_at
+        return session
+
+    def snapshot(self):
+        # pełny widok dla klientów (kopia - lista ruchów jest dalej modyfikowana w miejscu)
+        return EngineWrapper.client_state(self.manager, self.state)
+
+    def apply_move(self, move_data):
+        """Wykonuje ruch na menedżerze w pamięci i aktualizuje self.state. Zwraca (ruch, None) albo (None, błąd)."""
+        if not move_data or not isinstance(move_data, dict):
+            return None, "invalid move_data"
+        fr = move_data.get("from")
+        to = move_data.get("to")
+        if not fr or not to:
+            return None, "missing from/to coordinates"
+        promo = move_data.get("promo") or ""
+
+        try:
+            key = (fr["r"], fr["c"], to["r"], to["c"])
+        except (KeyError, TypeError):
+            return None, "missing from/to coordinates"
+
+        with tracing.span("legal_moves"):
+            for move in self.manager.get_possible_moves():
+                if (move.start_x, move.start_y, move.dest_x, move.dest_y) == key:
+                    break
+            else:
+                return None, "engine refused move"
+
+        board = self.manager.board
+        with tracing.span("make_move"):
+            board.make_move(move)
+            if move.moved_figure.name == "Pionek" and move.dest_x in (0, 7):
+                # promote_pawn dopisuje literę do notacji ruchu
+                board.promote_pawn(promo if promo in PROMOTION_LETTERS else "H")
+
+        self.state["moves"].append(move.user_notation)
+        # ustawia checkmate / stalemate dla nowej pozycji
+        with tracing.span("legal_moves_after"):
+            self.manager.get_possible_moves()
+        return move, None
+
+    def move_delta(self, move):
+        """
+        Wiadomość "move" protokołu v2: numer sekwencji (= liczba ruchów), ruch, zmienione pola,
+        zegary i flagi. Bez planszy i historii - te idą tylko w snapshotach (connected / sync).
+        """
+        squares = {(move.start_x, move.start_y), (move.dest_x, move.dest_y)}
+        if move.castling:
+            row = move.dest_x
+            if move.dest_y > move.start_y:
+                squares |= {(row, 7), (row, move.dest_y - 1)}
+            else:
+                squares |= {(row, 0), (row, move.dest_y + 1)}
+        if move.czy_en_passant:
+            squares.add((move.start_x, move.dest_y))
+
+        grid = self.manager.board.board
+        changes = []
+        for r, c in sorted(squares):
+            piece = grid[r][c]
+            changes.append([r, c, piece.color[0].lower() + piece.name if piece else None])
+
+        mgr = self.manager
+        state = self.state
+        return {
+            "type": "move",
+            "v": PROTOCOL_VERSION,
+            "seq": len(state["moves"]),
+            "move": {
+                "from": {"r": move.start_x, "c": move.start_y},
+                "to": {"r": move.dest_x, "c": move.dest_y},
+                "san": state["moves"][-1],
+            },
+            "changes": changes,
+            "turn": mgr.get_game_turn(),
+            "castling": mgr.get_board_castling_rules(),
+            "check": mgr.if_check(mgr.get_game_turn()),
+            "checkmate": mgr.is_checkmate(),
+            "stalemate": mgr.is_stalemate(),
+            "white_time": state["white_time"],
+            "black_time": state["black_time"],
+            "last_move_timestamp": state.get("last_move_timestamp"),
+            "game_over": state.get("game_over", False),
+            "winner": state.get("winner"),
+            "reason": state.get("reason"),
+        }
+
+    def legal_moves_message(self):
+        """
+        Legalne ruchy strony na ruchu - osobna wiadomość tylko dla jej gracza (delta dla całego pokoju
+        ich nie niesie; drugi gracz i widzowie i tak nie mogą ruszać).
+        """
+        mgr = self.manager
+        return {
+            "type": "legal_moves",
+            "v": PROTOCOL_VERSION,
+            "seq": len(self.state["moves"]),
+            "turn": mgr.get_game_turn(),
+            "moves": mgr.get_possible_move_notations(),
+        }
+
+    def save(self):
+        """
+        Pełny checkpoint stanu do bazy. Warunek na updated_at: jeśli ktoś inny zmienił grę
+        (poddanie, remis, timeout, inny proces) zwraca False i sesję trzeba odtworzyć.
+        """
+        now = timezone.now()
+        updated = Game.objects.filter(room_name=self.room_name, updated_at=self.updated_at).update(
+            state=EngineWrapper.dump_state(self.manager, self.state), updated_at=now
+        )
+        if updated:
+            self.updated_at = now
+            self.checkpoint_ply = len(self.state["moves"])
+        return bool(updated)
+
+    def save_move(self, move):
+        """
+        Zapis wykonanego ruchu: wiersz GameMove (stały rozmiar), a co CHECKPOINT_INTERVAL półruchów
+        i na koniec partii także checkpoint (save). False = ktoś inny zmienił grę, sesję trzeba odtworzyć.
+        """
+        state = self.state
+        ply = len(state["moves"])
+        notation = state["moves"][-1]
+        promo = notation[-1] if notation[-1] in PROMOTION_LETTERS else ""
+        row = GameMove(
+            game_id=self.game_id,
+            ply=ply,
+            move=pack_move({"r": move.start_x, "c": move.start_y}, {"r": move.dest_x, "c": move.dest_y}, promo),
+            white_time=state["white_time"],
+            black_time=state["black_time"],
+            played_at=state["last_move_timestamp"],
+        )
+        checkpoint = state.get("game_over") or ply - self.checkpoint_ply >= CHECKPOINT_INTERVAL
+        if move_journal is not None:
+            if not checkpoint:
+                # write-behind: wystarczy fsync lokalnego pliku, do bazy trafi paczką w tle. Bez odczytu bazy:
+                # poddanie / remis / timeout idą przez tę samą sesję (game_over w pamięci), a sesja wyjęta
+                # z rejestru jest stale. Zmiany spoza procesu odrzuca zapis paczki (wersja = updated_at).
+                if self.stale:
+                    return False
+                move_journal.append(row, version=self.updated_at)
+                return True
+            move_journal.flush()
+        try:
+            with transaction.atomic():
+                if checkpoint:
+                    if not self.save():
+                        raise _Conflict()
+                elif not Game.objects.filter(pk=self.game_id, updated_at=self.updated_at).exists():
+                    raise _Conflict()
+                # ten sam ply zapisany przez inny proces -> IntegrityError
+                row.save(force_insert=True)
+        except (_Conflict, IntegrityError):
+            return False
+        return True
+
+    def is_fresh(self):
+        # updated_at zmienia każdy checkpoint, a ruchy między checkpointami widać po ostatnim ply w dzienniku
+        stored = (
+            Game.objects.filter(room_name=self.room_name)
+            .annotate(last_ply=Max("journal__ply"))
+            .values_list("updated_at", "last_ply")
+            .first()
+        )
+        if stored is None or stored[0] != self.updated_at:
+            return False
+        return (stored[1] or 0) <= len(self.state["moves"])
+
+
+class SessionRegistry:
+    """Sesje aktywnych pokoi (LRU) z usuwaniem bezczynnych."""
+
+    def __init__(self, max_sessions=500, idle_timeout=900):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, room_name, fresh=False):
+        """
+        Zwraca sesję pokoju, odtwarzając ją z bazy gdy jej nie ma.
+        fresh=True dodatkowo sprawdza updated_at w bazie (jedno lekkie zapytanie).
+        """
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(room_name)
+            if session is not None:
+                self._sessions.move_to_end(room_name)
+                session.last_used = now
+            self._evict(now)
+
+        if session is not None and (not fresh or session.is_fresh()):
+            self.hits += 1
+            return session
+
+        session = GameSession.load(room_name)
+        with self._lock:
+            self.loads += 1
+            previous = self._sessions.get(room_name)
+            if previous is not None and previous is not session:
+                previous.stale = True
+            self._sessions[room_name] = session
+            self._sessions.move_to_end(room_name)
+            self._evict(now)
+        return session
+
+    def discard(self, room_name):
+        with self._lock:
+            session = self._sessions.pop(room_name, None)
+        if session is not None:
+            session.stale = True
+
+    def _evict(self, now):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)[1].stale = True
+        if now - self._last_sweep < 30:
+            return
+        self._last_sweep = now
+        for name in [name for name, s in self._sessions.items() if now - s.last_used > self.idle_timeout]:
+            self._sessions.pop(name).stale = True
+
+    def stats(self):
+        return {"sessions": len(self._sessions), "hits": self.hits, "loads": self.loads}
+
+
+game_sessions = SessionRegistry(
+    max_sessions=getattr(settings, "GAME_SESSION_MAX", 500),
+    idle_timeout=getattr(settings, "GAME_SESSION_IDLE_TIMEOUT", 900),
+)
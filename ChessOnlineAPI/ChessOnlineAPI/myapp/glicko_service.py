@@ -0,0 +1,187 @@
+# myapp/glicko_service.py
+"""
+Glicko-2 (Glickman, "Example of the Glicko-2 system") obok ELO.
+
+- rate / rate_game: aktualizacja po jednej partii (partia = okres rankingowy obu graczy),
+  czysty Python, bez zależności - używane przy zapisie wyniku partii.
+- recompute: przeliczenie całej historii okresami (np. dzień), wektorowo w NumPy -
+  do backfillu i strojenia parametrów (komenda recompute_ratings).
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SCALE = 173.7178
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOLATILITY = 0.06
+DEFAULT_TAU = 0.5
+EPSILON = 1e-6
+
+
+def available():
+    """Czy jest NumPy (potrzebny tylko do przeliczania wsadowego)."""
+    return np is not None
+
+
+def _g(phi):
+    return 1 / math.sqrt(1 + 3 * phi * phi / (math.pi * math.pi))
+
+
+def _volatility(phi, sigma, v, delta, tau):
+    """Nowa zmienność - krok 5 (algorytm Illinois)."""
+    a = math.log(sigma * sigma)
+    d2, p2 = delta * delta, phi * phi
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (d2 - p2 - v - ex) / (2 * (p2 + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    A = a
+    if d2 > p2 + v:
+        B = math.log(d2 - p2 - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        B = a - k * tau
+    fA, fB = f(A), f(B)
+    while abs(B - A) > EPSILON:
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        if fC * fB <= 0:
+            A, fA = B, fB
+        else:
+            fA /= 2
+        B, fB = C, fC
+    return math.exp(A / 2)
+
+
+def rate(rating, rd, volatility, results, tau=DEFAULT_TAU):
+    """
+    Jeden okres rankingowy gracza. results: lista (rating przeciwnika, RD przeciwnika, wynik 1 / 0.5 / 0).
+    Zwraca (rating, rd, volatility); bez partii rośnie tylko RD.
+    """
+    mu, phi = (rating - DEFAULT_RATING) / SCALE, rd / SCALE
+    if not results:
+        return rating, min(math.sqrt(phi * phi + volatility * volatility) * SCALE, DEFAULT_RD), volatility
+
+    v_inv = 0.0
+    score_sum = 0.0
+    for opp_rating, opp_rd, score in results:
+        g = _g(opp_rd / SCALE)
+        e = 1 / (1 + math.exp(-g * (mu - (opp_rating - DEFAULT_RATING) / SCALE)))
+        v_inv += g * g * e * (1 - e)
+        score_sum += g * (score - e)
+    v = 1 / v_inv
+
+    new_vol = _volatility(phi, volatility, v, v * score_sum, tau)
+    phi_star = math.sqrt(phi * phi + new_vol * new_vol)
+    new_phi = 1 / math.sqrt(1 / (phi_star * phi_star) + 1 / v)
+    new_mu = mu + new_phi * new_phi * score_sum
+    return new_mu * SCALE + DEFAULT_RATING, new_phi * SCALE, new_vol
+
+
+def rate_game(white, black, white_score, tau=DEFAULT_TAU):
+    """white / black: (rating, rd, volatility) przed partią; zwraca nowe krotki obu graczy."""
+    new_white = rate(*white, [(black[0], black[1], white_score)], tau=tau)
+    new_black = rate(*black, [(white[0], white[1], 1 - white_score)], tau=tau)
+    return new_white, new_black
+
+
+# --- przeliczanie wsadowe (NumPy) ---
+
+def _volatility_vec(phi, sigma, v, delta, tau):
+    """_volatility dla wszystkich graczy okresu naraz (maski zamiast pętli po graczach)."""
+    a = np.log(sigma * sigma)
+    d2, p2 = delta * delta, phi * phi
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (d2 - p2 - v - ex) / (2 * (p2 + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    big = d2 > p2 + v
+    A = a
+    B = np.where(big, np.log(np.where(big, d2 - p2 - v, 1.0)), a - tau)
+    k = 1
+    need = ~big & (f(B) < 0)
+    while need.any():
+        k += 1
+        B = np.where(need, a - k * tau, B)
+        need &= f(B) < 0
+
+    fA, fB = f(A), f(B)
+    for _ in range(100):
+        active = np.abs(B - A) > EPSILON
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = active & (fC * fB <= 0)
+        A = np.where(swap, B, A)
+        fA = np.where(swap, fB, np.where(active, fA / 2, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+    return np.exp(A / 2)
+
+
+def recompute(white, black, white_score, period, tau=DEFAULT_TAU, rating=DEFAULT_RATING,
+              rd=DEFAULT_RD, volatility=DEFAULT_VOLATILITY):
+    """
+    Glicko-2 dla całej historii. white / black: indeksy graczy 0..n-1, white_score: 1 / 0.5 / 0,
+    period: numer okresu partii (rosnąco, całkowity). W okresie wszyscy grają przeciw ratingom sprzed okresu;
+    gracz nieaktywny przez k okresów (także okresów bez żadnych partii) dostaje k kroków wzrostu RD.
+
+    Zwraca (rating, rd, volatility) - tablice po graczach - oraz oczekiwany wynik białych
+    dla każdej partii liczony przed jej okresem (do porównania trafności z ELO).
+    """
+    n = int(max(white.max(), black.max())) + 1 if len(white) else 0
+    mu = np.full(n, (rating - DEFAULT_RATING) / SCALE)
+    phi = np.full(n, rd / SCALE)
+    sigma = np.full(n, volatility)
+    max_phi = DEFAULT_RD / SCALE
+    predicted = np.empty(len(white))
+
+    # granice okresów w posortowanej tablicy partii
+    bounds = np.flatnonzero(np.diff(period)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(period)]))
+
+    prev_period = period[0] - 1 if len(period) else 0
+    for lo, hi in zip(starts, ends):
+        # okresy bez żadnej partii pomiędzy: RD rośnie wszystkim (period[lo] - prev_period - 1) razy,
+        # sqrt(phi^2 + k * sigma^2) to k kroków naraz; max_phi po drodze daje to samo co na końcu
+        gap = period[lo] - prev_period - 1
+        if gap > 0:
+            phi = np.minimum(np.sqrt(phi ** 2 + gap * sigma ** 2), max_phi)
+        prev_period = period[lo]
+
+        w, b, s = white[lo:hi], black[lo:hi], white_score[lo:hi]
+        combined = np.sqrt(phi[w] ** 2 + phi[b] ** 2)
+        predicted[lo:hi] = 1 / (1 + np.exp(-(mu[w] - mu[b]) / np.sqrt(1 + 3 * combined ** 2 / np.pi ** 2)))
+
+        # każda partia z obu stron: gracz i przeciw j
+        i = np.concatenate((w, b))
+        j = np.concatenate((b, w))
+        score = np.concatenate((s, 1 - s))
+        g = 1 / np.sqrt(1 + 3 * phi[j] ** 2 / np.pi ** 2)
+        e = 1 / (1 + np.exp(-g * (mu[i] - mu[j])))
+        v_inv = np.bincount(i, g * g * e * (1 - e), minlength=n)
+        score_sum = np.bincount(i, g * (score - e), minlength=n)
+
+        played = v_inv > 0
+        v = 1 / v_inv[played]
+        new_sigma = _volatility_vec(phi[played], sigma[played], v, v * score_sum[played], tau)
+        phi_star = np.sqrt(phi[played] ** 2 + new_sigma ** 2)
+        new_phi = 1 / np.sqrt(1 / phi_star ** 2 + 1 / v)
+
+        # gracze bez partii w okresie: rośnie tylko niepewność
+        phi = np.minimum(np.sqrt(phi ** 2 + sigma ** 2), max_phi)
+        mu[played] += new_phi ** 2 * score_sum[played]
+        phi[played] = new_phi
+        sigma[played] = new_sigma
+
+    return mu * SCALE + DEFAULT_RATING, phi * SCALE, sigma, predicted
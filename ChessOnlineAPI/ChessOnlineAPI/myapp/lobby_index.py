@@ -0,0 +1,147 @@
+# games/lobby_index.py
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from . import codec, metrics
+from .models import Room
+
+logger = logging.getLogger("chess")
+
+LOBBY_GROUP = "lobby"
+
+
+def player_summary(user):
+    """Nazwa i ELO gracza do listy pokoi."""
+    elo = 1200
+    if hasattr(user, 'profile'):
+        elo = user.profile.elo
+    return {
+        'username': user.username,
+        'elo': elo
+    }
+
+
+def room_summary(room):
+    # przy prefetch_related('players__profile') bez dodatkowych zapytań
+    players = list(room.players.all())
+    return {
+        'name': room.name,
+        'players': [player_summary(p) for p in players],
+        'players_count': len(players),
+        'has_password': bool(room.password_hash),
+        'status': room.status,
+    }
+
+
+def load_room_summaries(limit):
+    # Jedno zapytanie na pokoje + prefetch graczy i profili (zamiast zapytań na każdy pokój)
+    with metrics.LOBBY_LOAD_SECONDS.time():
+        qs = Room.objects.order_by('-created_at').prefetch_related('players__profile')[:limit]
+        return [room_summary(r) for r in reversed(qs)]
+
+
+class LobbyIndex:
+    """
+    Lista pokoi w pamięci procesu (nazwa -> podsumowanie), aktualizowana przy tworzeniu / dołączaniu / wyjściu.
+
+    Zmiany zbierane są przez `interval` sekund i idą do grupy lobby jedną wiadomością "room_diff"
+    z rosnącym numerem wersji. Nowy subskrybent dostaje snapshot z pamięci, nie z bazy.
+    Metody wołać z pętli zdarzeń.
+    """
+
+    def __init__(self, interval=0.25, limit=200):
+        self.interval = interval
+        self.limit = limit
+        self.version = 0
+        self._rooms = {}     # kolejność wstawienia = od najstarszego
+        self._pending = {}   # nazwa -> podsumowanie albo None (usunięty)
+        self._loaded = False
+        self._removed_before_load = set()
+        self._flush_task = None
+        self._loop = None
+        self.published = 0
+
+    async def ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loop = asyncio.get_running_loop()
+        rooms = await database_sync_to_async(load_room_summaries)(self.limit)
+        if self._loaded:
+            return
+        # zdarzenia, które przyszły w trakcie ładowania, są nowsze od bazy
+        loaded = {summary['name']: summary for summary in rooms}
+        loaded.update(self._rooms)
+        self._rooms = {name: s for name, s in loaded.items() if name not in self._removed_before_load}
+        self._removed_before_load.clear()
+        self._loaded = True
+
+    def snapshot(self):
+        rooms = list(self._rooms.values())[-self.limit:]
+        rooms.reverse()
+        return {'type': 'room_list', 'version': self.version, 'rooms': rooms}
+
+    def upsert(self, summary):
+        name = summary['name']
+        self._rooms[name] = summary
+        self._removed_before_load.discard(name)
+        self._pending[name] = summary
+        self._schedule()
+
+    def remove(self, name):
+        self._rooms.pop(name, None)
+        if not self._loaded:
+            self._removed_before_load.add(name)
+        self._pending[name] = None
+        self._schedule()
+
+    def upsert_threadsafe(self, summary):
+        # dla kodu synchronicznego (widoki REST) - zmiana wykona się w pętli zdarzeń
+        self._call_threadsafe(self.upsert, summary)
+
+    def remove_threadsafe(self, name):
+        self._call_threadsafe(self.remove, name)
+
+    def _call_threadsafe(self, func, *args):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # indeks nie był jeszcze używany w tym procesie - przy ładowaniu przeczyta bazę
+            return
+        loop.call_soon_threadsafe(func, *args)
+
+    def _schedule(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._loop = asyncio.get_running_loop()
+            self._flush_task = self._loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self.version += 1
+        self.published += 1
+        message = {
+            'type': 'room_diff',
+            'version': self.version,
+            'upsert': [s for s in pending.values() if s is not None],
+            'remove': [name for name, s in pending.items() if s is None],
+        }
+        try:
+            # kodowane raz dla całej grupy
+            await get_channel_layer().group_send(LOBBY_GROUP, {'type': 'lobby.room_diff', 'text': codec.dumps(message)})
+        except Exception:
+            logger.exception("Lobby diff publish failed: version=%s", self.version)
+
+    def stats(self):
+        return {'rooms': len(self._rooms), 'version': self.version, 'published': self.published,
+                'pending': len(self._pending)}
+
+
+lobby_index = LobbyIndex(
+    interval=getattr(settings, "LOBBY_BROADCAST_INTERVAL", 0.25),
+    limit=getattr(settings, "LOBBY_ROOM_LIMIT", 200),
+)
@@ -0,0 +1,161 @@
+# games/log_handlers.py
+"""
+Logowanie loggera "chess" bez I/O w pętli zdarzeń.
+
+QueueLogHandler tylko wkłada rekord do ograniczonej kolejki (put_nowait); plik z rotacją po rozmiarze
+i konsolę obsługuje QueueListener w osobnym wątku. Tracebacki są formatowane przed włożeniem do
+kolejki (exc_text), więc trafiają do pliku tak jak wcześniej. RateLimitFilter ogranicza powtarzalne
+komunikaty gorącej ścieżki (ruchy, połączenia); ERROR i wyżej przechodzą zawsze.
+
+Przy ENGINE_EXECUTOR="process" plik pisze tylko proces główny: RotatingFileHandler w kilku procesach
+na tym samym pliku gubi i dubluje linie przy rotacji. Worker przed django.setup() woła forward_to()
+z kolejką multiprocessing - jego QueueLogHandler nie otwiera pliku, tylko odsyła rekordy, a
+WorkerLogListener w procesie głównym przekazuje je do loggerów (i dalej do tego samego pliku).
+Konfiguracja: LOGGING w settings.py (importowane przez dictConfig, więc bez modeli i settings tutaj).
+"""
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+# kolejka do procesu głównego, gdy to proces roboczy silnika (forward_to); None w procesie głównym
+_forward_queue = None
+
+
+def forward_to(log_queue):
+    """W procesie roboczym: QueueLogHandler odsyła rekordy do log_queue zamiast pisać plik."""
+    global _forward_queue
+    _forward_queue = log_queue
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Maks. `burst` rekordów na szablon komunikatu (logger + msg) w oknie `per` sekund.
+    Pominięte są liczone i dopisywane do pierwszego przepuszczonego rekordu w następnym oknie.
+    """
+
+    def __init__(self, burst=20, per=1.0, min_level=logging.ERROR):
+        super().__init__()
+        self.burst = burst
+        self.per = per
+        self.min_level = min_level
+        self._windows = {}   # (logger, msg) -> [początek okna, przepuszczone, pominięte]
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno >= self.min_level or self.burst <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                if len(self._windows) > 1000:
+                    self._windows.clear()
+                window = self._windows[key] = [now, 0, 0]
+            elif now - window[0] >= self.per:
+                if window[2]:
+                    record.msg = f"{record.msg} (+{window[2]} similar suppressed)"
+                window[0], window[1], window[2] = now, 0, 0
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # przy zamykaniu kolejka może być pełna - tu czekać wolno (wątek zamykający, nie pętla)
+        self.queue.put(self._sentinel, timeout=5)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Handler do podpięcia pod logger: rekordy idą do kolejki, zapisuje je wątek QueueListener.
+    Przy pełnej kolejce rekord jest odrzucany (i liczony) zamiast blokować pętlę.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, file_level="DEBUG",
+                 console_level="INFO", queue_size=10000,
+                 fmt="%(asctime)s %(levelname)s %(message)s"):
+        formatter = logging.Formatter(fmt)
+        self._formatter = formatter
+        self.dropped = 0
+        if _forward_queue is not None:
+            # proces roboczy: plik i konsola należą do procesu głównego
+            super().__init__(_forward_queue)
+            self.listener = None
+            return
+        super().__init__(queue.Queue(maxsize=queue_size))
+        targets = []
+        if filename:
+            fh = logging.handlers.RotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+            fh.setLevel(file_level)
+            fh.setFormatter(formatter)
+            targets.append(fh)
+        sh = logging.StreamHandler()
+        sh.setLevel(console_level)
+        sh.setFormatter(formatter)
+        targets.append(sh)
+        self.listener = _Listener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # bez formatowania całej linii (robią to handlery docelowe), tylko to, czego nie da się
+        # bezpiecznie przekazać do innego wątku: argumenty komunikatu i traceback
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            try:
+                listener.stop()
+            except queue.Full:
+                pass
+            for handler in listener.handlers:
+                handler.close()
+        super().close()
+
+
+class _Dispatch(logging.Handler):
+    def handle(self, record):
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+        return True
+
+
+class WorkerLogListener:
+    """W procesie głównym: rekordy z procesów roboczych (forward_to) do loggerów tego procesu."""
+
+    def __init__(self, log_queue):
+        self.listener = _Listener(log_queue, _Dispatch())
+        self.listener.start()
+
+    def stop(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            try:
+                listener.stop()
+            except queue.Full:
+                pass
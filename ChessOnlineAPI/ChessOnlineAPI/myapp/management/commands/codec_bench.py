@@ -0,0 +1,98 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp import codec
+from myapp.chess_engine.Game_Manager import ChessGameManager
+from myapp.engine_adapter import EngineWrapper
+from myapp.game_sessions import PROTOCOL_VERSION
+
+
+def _late_game(plies, seed):
+    """Stan partii po `plies` losowych półruchach (powtarzalnie) - (menedżer, stan v2)."""
+    rnd = random.Random(seed)
+    mgr = ChessGameManager()
+    state = EngineWrapper._empty_state()
+    for _ in range(plies):
+        moves = sorted(mgr.get_possible_moves(), key=lambda m: (m.start_x, m.start_y, m.dest_x, m.dest_y))
+        if not moves:
+            break
+        move = rnd.choice(moves)
+        mgr.board.make_move(move)
+        if move.moved_figure.name == "Pionek" and move.dest_x in (0, 7):
+            mgr.promote_pawn("H")
+        state["moves"].append(move.user_notation)
+    mgr.get_possible_moves()
+    state["white_time"] = 123.456789
+    state["black_time"] = 98.7654321
+    state["last_move_timestamp"] = time.time()
+    return mgr, state
+
+
+def _payloads(plies, seed):
+    mgr, state = _late_game(plies, seed)
+    snapshot = EngineWrapper.client_state(mgr, state)
+    return {
+        # Game.state w bazie
+        "stored_state": EngineWrapper.dump_state(mgr, state),
+        # "connected" / "sync" - pełny snapshot
+        "snapshot": {"type": "sync", "v": PROTOCOL_VERSION, "seq": len(state["moves"]),
+                     "state": {"state": snapshot, "turn": mgr.get_game_turn()}},
+    }
+
+
+def _measure(func, arg, min_time):
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for _ in range(100):
+            func(arg)
+        calls += 100
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+class Command(BaseCommand):
+    help = "Encode/decode throughput of the JSON codecs on late-game state and WebSocket payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plies", type=int, default=120, help="length of the random game (default: 120)")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--min-time", type=float, default=0.5,
+                            help="seconds spent measuring each codec/payload pair")
+        parser.add_argument("--group-size", type=int, default=20,
+                            help="recipients of one broadcast when comparing per-recipient vs. shared encoding")
+
+    def handle(self, *args, **options):
+        payloads = _payloads(options["plies"], options["seed"])
+        min_time = options["min_time"]
+        self.stdout.write(f"active codec: {codec.BACKEND}")
+
+        for name, payload in payloads.items():
+            if isinstance(payload, str):
+                text, obj = payload, codec.loads(payload)
+            else:
+                text, obj = codec.dumps(payload), payload
+            self.stdout.write(f"{name}: {len(text.encode('utf-8'))} bytes")
+            baseline = None
+            for codec_name, (dumps, loads) in codec.CODECS.items():
+                enc = _measure(dumps, obj, min_time)
+                dec = _measure(loads, text, min_time)
+                if baseline is None:
+                    baseline = (enc, dec)
+                self.stdout.write(
+                    f"  {codec_name:<7} dumps {enc:>10,.0f}/s (x{enc / baseline[0]:.2f})"
+                    f"  loads {dec:>10,.0f}/s (x{dec / baseline[1]:.2f})"
+                )
+
+        # Broadcast: kodowanie raz na grupę zamiast raz na odbiorcę
+        obj = payloads["snapshot"]
+        group = options["group_size"]
+        per_recipient = _measure(lambda o: [codec.dumps(o) for _ in range(group)], obj, min_time)
+        shared = _measure(lambda o: [text for text in [codec.dumps(o)] * group], obj, min_time)
+        self.stdout.write(
+            f"broadcast to {group}: per-recipient {per_recipient:,.0f}/s, shared {shared:,.0f}/s "
+            f"(x{shared / per_recipient:.1f})"
+        )
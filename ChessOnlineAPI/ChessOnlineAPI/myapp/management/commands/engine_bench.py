@@ -0,0 +1,179 @@
+import json
+import platform
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.chess_engine.BitBoard import BitBoard
+from myapp.chess_engine.Engine import Board
+from myapp.chess_engine.Game_Manager import ChessGameManager
+from myapp.chess_engine.Perft import POSITIONS, measure_call, perft_divide, run_perft
+from myapp.chess_engine.utils.MoveCache import legal_move_cache
+from myapp.engine_adapter import EngineWrapper
+
+BACKENDS = {"board": Board, "bitboard": BitBoard}
+ENGINE_CALLS = ("generate_moves", "update_moves", "if_check")
+
+
+def _scripted_game(board_class, plies, seed):
+    """Losowa (ale powtarzalna) partia jako lista move_data dla EngineWrapper.validate_and_apply."""
+    rnd = random.Random(seed)
+    mgr = ChessGameManager(board_class)
+    script = []
+    for _ in range(plies):
+        moves = sorted(mgr.get_possible_moves(), key=lambda m: (m.start_x, m.start_y, m.dest_x, m.dest_y))
+        if not moves:
+            break
+        move = rnd.choice(moves)
+        promo = "H" if move.moved_figure.name == "Pionek" and move.dest_x in (0, 7) else ""
+        mgr.board.make_move(move)
+        if promo:
+            mgr.promote_pawn(promo)
+        script.append({
+            "from": {"r": move.start_x, "c": move.start_y},
+            "to": {"r": move.dest_x, "c": move.dest_y},
+            "promo": promo,
+        })
+    return script
+
+
+def _measure_adapter(script, min_time):
+    # Węzeł = jedno wywołanie validate_and_apply (odtworzenie stanu + walidacja + serializacja)
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        state = EngineWrapper.get_initial_state()
+        for move_data in script:
+            ok, state, info = EngineWrapper.validate_and_apply(state, move_data)
+            if not ok:
+                raise CommandError(f"validate_and_apply refused scripted move {move_data}: {info}")
+            calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+    return {"calls": calls, "nodes": calls, "seconds": elapsed, "nps": calls / elapsed}
+
+
+class Command(BaseCommand):
+    help = "Perft verification and move-generation throughput benchmark for chess_engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--depth", type=int, default=3, help="perft depth (default: 3)")
+        parser.add_argument("--backend", choices=("board", "bitboard", "all"), default="all")
+        parser.add_argument("--positions", nargs="*", help="names of positions to run (default: all)")
+        parser.add_argument("--divide", metavar="FEN_OR_NAME",
+                            help="print perft divide for a single position and exit")
+        parser.add_argument("--min-time", type=float, default=1.0,
+                            help="seconds spent measuring each throughput metric")
+        parser.add_argument("--plies", type=int, default=40, help="length of the validate_and_apply game")
+        parser.add_argument("--with-cache", action="store_true",
+                            help="keep the legal-move cache enabled (disabled by default for stable numbers)")
+        parser.add_argument("--output", help="write JSON results to this file")
+        parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+        parser.add_argument("--threshold", type=float, default=10.0,
+                            help="fail when any nodes/s drops more than this many percent below the baseline")
+
+    def handle(self, *args, **options):
+        backends = list(BACKENDS) if options["backend"] == "all" else [options["backend"]]
+        positions = POSITIONS
+        if options["positions"]:
+            positions = [p for p in POSITIONS if p["name"] in options["positions"]]
+            if not positions:
+                raise CommandError(f"unknown positions: {options['positions']}")
+
+        previous_cache_size = legal_move_cache.maxsize
+        if not options["with_cache"]:
+            legal_move_cache.resize(0)
+        try:
+            if options["divide"]:
+                self._divide(backends, options["divide"], options["depth"])
+                return
+            results = self._run(backends, positions, options)
+        finally:
+            legal_move_cache.resize(previous_cache_size)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"results written to {options['output']}")
+
+        failures = [
+            f"{backend}: perft {row['name']} depth {row['depth']} = {row['nodes']}, expected {row['expected']}"
+            for backend, data in results["backends"].items()
+            for row in data["perft"] if not row["ok"]
+        ]
+        if options["baseline"]:
+            failures += self._compare(results, options["baseline"], options["threshold"])
+        if failures:
+            raise CommandError("\n".join(failures))
+
+    def _divide(self, backends, fen_or_name, depth):
+        fen = next((p["fen"] for p in POSITIONS if p["name"] == fen_or_name), fen_or_name)
+        for backend in backends:
+            board = BACKENDS[backend].from_fen(fen)
+            divide = perft_divide(board, depth)
+            self.stdout.write(f"[{backend}] {fen} depth {depth}")
+            for notation in sorted(divide):
+                self.stdout.write(f"  {notation}: {divide[notation]}")
+            self.stdout.write(f"  moves: {len(divide)}  nodes: {sum(divide.values())}")
+
+    def _run(self, backends, positions, options):
+        results = {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "depth": options["depth"],
+            "cache": options["with_cache"],
+            "backends": {},
+        }
+        default_class = ChessGameManager.board_class
+        for backend in backends:
+            board_class = BACKENDS[backend]
+            data = {"perft": [], "throughput": {}}
+            for position in positions:
+                row = run_perft(board_class, position, options["depth"])
+                data["perft"].append(row)
+                status = "OK" if row["ok"] else "FAIL"
+                self.stdout.write(
+                    f"[{backend}] perft {row['name']:<16} d={row['depth']} nodes={row['nodes']:<9} "
+                    f"{status:<4} {row['nps']:>12,.0f} nodes/s"
+                )
+            for name in ENGINE_CALLS:
+                data["throughput"][name] = measure_call(board_class, name, positions, options["min_time"])
+            # EngineWrapper tworzy ChessGameManager bez argumentów, więc backend ustawiamy na klasie
+            ChessGameManager.board_class = board_class
+            try:
+                script = _scripted_game(board_class, options["plies"], seed=1)
+                data["throughput"]["validate_and_apply"] = _measure_adapter(script, options["min_time"])
+            finally:
+                ChessGameManager.board_class = default_class
+            for name, row in data["throughput"].items():
+                self.stdout.write(f"[{backend}] {name:<18} {row['nps']:>12,.0f} nodes/s")
+            results["backends"][backend] = data
+        return results
+
+    def _compare(self, results, baseline_path, threshold):
+        try:
+            with open(baseline_path, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"cannot read baseline {baseline_path}: {e}")
+
+        failures = []
+        for backend, data in results["backends"].items():
+            old = baseline.get("backends", {}).get(backend)
+            if not old:
+                continue
+            metrics = {f"throughput.{name}": row["nps"] for name, row in data["throughput"].items()}
+            old_metrics = {f"throughput.{name}": row["nps"] for name, row in old.get("throughput", {}).items()}
+            metrics.update({f"perft.{row['name']}.d{row['depth']}": row["nps"] for row in data["perft"]})
+            old_metrics.update({f"perft.{row['name']}.d{row['depth']}": row["nps"] for row in old.get("perft", [])})
+            for key, nps in metrics.items():
+                before = old_metrics.get(key)
+                if not before:
+                    continue
+                change = (nps - before) / before * 100
+                self.stdout.write(f"[{backend}] {key:<32} {before:>12,.0f} -> {nps:>12,.0f} ({change:+.1f}%)")
+                if change < -threshold:
+                    failures.append(f"{backend}: {key} dropped {-change:.1f}% (threshold {threshold}%)")
+        return failures
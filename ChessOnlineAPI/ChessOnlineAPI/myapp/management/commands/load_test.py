@@ -0,0 +1,459 @@
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from autobahn.asyncio.websocket import WebSocketClientFactory, WebSocketClientProtocol
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import codec, wire
+from myapp.chess_engine.Game_Manager import ChessGameManager
+from myapp.models import PlayerProfile
+
+SCENARIOS = ("rooms", "quick_match", "spectators", "reconnect")
+
+
+class ServerError(Exception):
+    pass
+
+
+def _percentiles(values):
+    values = sorted(values)
+
+    def percentile(p):
+        if not values:
+            return None
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 2)
+
+    return {"count": len(values), "p50": percentile(50), "p95": percentile(95), "p99": percentile(99),
+            "max": round(values[-1], 2) if values else None}
+
+
+class Stats:
+    def __init__(self):
+        self.rtt_ms = []
+        self.match_ms = []
+        self.reconnect_ms = []
+        self.reconnects = Counter()   # resumed / connected
+        self.broadcasts = 0
+        self.moves = 0
+        self.games = 0
+        self.errors = Counter()
+
+
+class _ClientProtocol(WebSocketClientProtocol):
+    def onOpen(self):
+        if not self.factory.opened.done():
+            self.factory.opened.set_result(self)
+
+    def onMessage(self, payload, isBinary):
+        self.factory.client._dispatch(wire.decode(payload) if isBinary else codec.loads(payload))
+
+    def onClose(self, wasClean, code, reason):
+        if not self.factory.opened.done():
+            self.factory.opened.set_exception(ConnectionError(reason or f"closed ({code})"))
+        self.factory.client._closed(code)
+
+
+class WsClient:
+    """Jedno połączenie symulowanego gracza (autobahn, asyncio). Czeka na wiadomości spełniające predykat."""
+
+    def __init__(self, stats, binary=False):
+        self.stats = stats
+        self.binary = binary and wire.available()
+        self.protocol = None
+        self.closed = None
+        self.first = None
+        self._waiter = None
+
+    async def connect(self, url, timeout):
+        loop = asyncio.get_running_loop()
+        parts = urlsplit(url)
+        factory = WebSocketClientFactory(url, protocols=[wire.SUBPROTOCOL] if self.binary else None)
+        factory.protocol = _ClientProtocol
+        factory.setProtocolOptions(autoPingInterval=0)
+        factory.client = self
+        factory.opened = loop.create_future()
+        self.closed = loop.create_future()
+        await asyncio.wait_for(loop.create_connection(factory, parts.hostname, parts.port), timeout)
+        self.protocol = await asyncio.wait_for(factory.opened, timeout)
+        if self.binary and self.protocol.websocket_protocol_in_use != wire.SUBPROTOCOL:
+            self.binary = False
+
+    def _dispatch(self, message):
+        msg_type = message.get("type")
+        if msg_type in ("move", "game_over"):
+            self.stats.broadcasts += 1
+        if msg_type == "error":
+            detail = message.get("detail") or message.get("message")
+            self.stats.errors[f"server:{detail}"] += 1
+        waiter = self._waiter
+        if waiter is None or waiter[1].done():
+            return
+        predicate, future = waiter
+        if msg_type == "error":
+            future.set_exception(ServerError(detail))
+        elif predicate(message):
+            future.set_result(message)
+
+    def _closed(self, code):
+        if self.closed is not None and not self.closed.done():
+            self.closed.set_result(code)
+        if self._waiter is not None and not self._waiter[1].done():
+            self._waiter[1].set_exception(ConnectionError(f"closed ({code})"))
+
+    def expect(self, predicate):
+        """Future na pierwszą wiadomość spełniającą predykat - ustawić przed wysłaniem żądania."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiter = (predicate, future)
+        return future
+
+    def send(self, message):
+        if self.binary and message["type"] == "move":
+            move = message["move"]
+            tag = wire.MESSAGE_TYPES.index("move") + 1
+            payload = wire.msgpack.packb([tag, wire.pack_move(move["from"], move["to"], move.get("promo", ""))])
+            self.protocol.sendMessage(payload, isBinary=True)
+        else:
+            self.protocol.sendMessage(codec.dumps(message).encode("utf-8"))
+
+    async def close(self):
+        if self.protocol is None or self.closed.done():
+            return
+        self.protocol.sendClose()
+        try:
+            await asyncio.wait_for(asyncio.shield(self.closed), 5)
+        except asyncio.TimeoutError:
+            self.protocol.dropConnection(abort=True)
+
+
+class Player:
+    def __init__(self, username, token):
+        self.username = username
+        self.token = token
+        self.seq = 0
+
+
+def _cpu_seconds(pid):
+    # utime + stime z /proc (Linux); None gdy niedostępne
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("WebSocket load test against a running server: simulated players log in, create/join rooms "
+            "through the lobby and play random legal games. Writes a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", choices=SCENARIOS, default="rooms",
+                            help="rooms: create/join through the lobby; quick_match: everyone queues at once; "
+                                 "spectators: rooms with extra watchers; reconnect: black players drop and resume")
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+        parser.add_argument("--games", type=int, default=50)
+        parser.add_argument("--plies", type=int, default=40, help="maximum half-moves per game")
+        parser.add_argument("--spectators", type=int, default=None,
+                            help="watchers per room (default: 20 for the spectators scenario, else 0)")
+        parser.add_argument("--reconnect-at", type=int, default=None,
+                            help="ply at which black players reconnect (default: plies/2 for the reconnect scenario)")
+        parser.add_argument("--think-time", type=float, default=0.0, help="ms between receiving a move and replying")
+        parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which games are started")
+        parser.add_argument("--timeout", type=float, default=15.0, help="seconds to wait for any single reply")
+        parser.add_argument("--binary", action="store_true", help="use the msgpack sub-protocol for game sockets")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--user-prefix", default="loadtest")
+        parser.add_argument("--password", default="loadtest-pass")
+        parser.add_argument("--create-users", action="store_true",
+                            help="create missing load-test users (and profiles) in the configured database first")
+        parser.add_argument("--spawn-server", action="store_true",
+                            help="start daphne on the --url port for the duration of the run")
+        parser.add_argument("--server-pid", type=int, default=None, help="pid of the server for CPU accounting")
+        parser.add_argument("--output", default="loadtest.json", help="JSON report path")
+
+    def handle(self, *args, **options):
+        scenario = options["scenario"]
+        if options["spectators"] is None:
+            options["spectators"] = 20 if scenario == "spectators" else 0
+        if options["reconnect_at"] is None:
+            options["reconnect_at"] = options["plies"] // 2 if scenario == "reconnect" else -1
+
+        spectators = options["spectators"] * options["games"]
+        usernames = [f"{options['user_prefix']}_{i}" for i in range(options["games"] * 2 + spectators)]
+        if options["create_users"]:
+            self._create_users(usernames, options["password"])
+
+        server = None
+        pid = options["server_pid"]
+        if options["spawn_server"]:
+            server = self._spawn_server(options["url"])
+            pid = server.pid
+        try:
+            report = asyncio.run(self._run(usernames, pid, options))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(10)
+
+        with open(options["output"], "w", encoding="utf-8") as f:
+            f.write(codec.dumps(report))
+        self._print(report)
+        self.stdout.write(f"report written to {options['output']}")
+
+    def _create_users(self, usernames, password):
+        User = get_user_model()
+        existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        missing = [name for name in usernames if name not in existing]
+        if not missing:
+            return
+        # jeden hash dla wszystkich - create_user liczyłby PBKDF2 dla każdego gracza
+        password_hash = make_password(password)
+        User.objects.bulk_create([User(username=name, password=password_hash) for name in missing])
+        # bulk_create nie wysyła post_save, więc profile tworzymy sami
+        users = User.objects.filter(username__in=missing)
+        PlayerProfile.objects.bulk_create([PlayerProfile(user=u) for u in users], ignore_conflicts=True)
+        self.stdout.write(f"created {len(missing)} users")
+
+    def _spawn_server(self, url):
+        port = urlsplit(url).port or 8000
+        # jak main.py: django.setup() przed importem asgi (middleware importuje modele)
+        code = ("import django, sys; django.setup(); from daphne.cli import CommandLineInterface; "
+                f"CommandLineInterface().run(['-b', '127.0.0.1', '-p', '{port}', 'ChessOnlineAPI.asgi:application'])")
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "ChessOnlineAPI.settings"))
+        server = subprocess.Popen([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"daphne exited with code {server.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError("daphne did not start listening within 30 s")
+
+    async def _run(self, usernames, pid, options):
+        stats = Stats()
+        self.options = options
+        self.ws_base = options["url"].replace("http", "ws", 1).rstrip("/")
+
+        started = time.monotonic()
+        players = await self._login_all(usernames, options, stats)
+        login_time = time.monotonic() - started
+        if len(players) < len(usernames):
+            raise CommandError(f"only {len(players)} of {len(usernames)} users logged in "
+                               f"(run with --create-users?)")
+
+        games = options["games"]
+        pairs = [(players[2 * i], players[2 * i + 1]) for i in range(games)]
+        watchers = players[2 * games:]
+        run_id = uuid.uuid4().hex[:6]
+
+        cpu_before = _cpu_seconds(pid) if pid else None
+        started = time.monotonic()
+        if options["scenario"] == "quick_match":
+            games_coro = self._quick_match_storm(players[:2 * games], run_id, stats)
+        else:
+            games_coro = asyncio.gather(*[
+                self._room_game(white, black, watchers[i * options["spectators"]:(i + 1) * options["spectators"]],
+                                f"lt-{run_id}-{i}", i, stats)
+                for i, (white, black) in enumerate(pairs)
+            ])
+        await games_coro
+        duration = time.monotonic() - started
+        cpu_after = _cpu_seconds(pid) if pid else None
+
+        server_cpu = None
+        if cpu_before is not None and cpu_after is not None:
+            server_cpu = {"pid": pid, "cpu_seconds": round(cpu_after - cpu_before, 3),
+                          "cpu_percent": round(100 * (cpu_after - cpu_before) / duration, 1)}
+        return {
+            "scenario": options["scenario"],
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "params": {key: options[key] for key in ("url", "games", "plies", "spectators", "reconnect_at",
+                                                     "think_time", "ramp", "binary", "seed")},
+            "login_seconds": round(login_time, 3),
+            "duration_seconds": round(duration, 3),
+            "games_finished": stats.games,
+            "moves": stats.moves,
+            "moves_per_second": round(stats.moves / duration, 1) if duration else 0,
+            "move_rtt_ms": _percentiles(stats.rtt_ms),
+            "broadcasts": stats.broadcasts,
+            "broadcasts_per_second": round(stats.broadcasts / duration, 1) if duration else 0,
+            "time_to_match_ms": _percentiles(stats.match_ms),
+            "reconnect_ms": _percentiles(stats.reconnect_ms),
+            "reconnects": dict(stats.reconnects),
+            "errors": dict(stats.errors),
+            "server_cpu": server_cpu,
+        }
+
+    async def _login_all(self, usernames, options, stats):
+        url = options["url"].rstrip("/") + "/auth/jwt/create/"
+        limit = asyncio.Semaphore(32)
+
+        def login(username):
+            response = requests.post(url, json={"username": username, "password": options["password"]},
+                                     timeout=options["timeout"])
+            response.raise_for_status()
+            return Player(username, response.json()["access"])
+
+        async def one(username):
+            async with limit:
+                try:
+                    return await asyncio.to_thread(login, username)
+                except Exception:
+                    stats.errors["login"] += 1
+                    return None
+
+        return [p for p in await asyncio.gather(*[one(name) for name in usernames]) if p is not None]
+
+    async def _connect(self, path, player, stats, query="", first=None):
+        client = WsClient(stats, binary=self.options["binary"] and path.startswith("/ws/game/"))
+        if first is not None:
+            # pierwsza wiadomość może przyjść zaraz po otwarciu - oczekiwanie ustawiamy wcześniej
+            client.first = client.expect(first)
+        await client.connect(f"{self.ws_base}{path}?token={player.token}{query}", self.options["timeout"])
+        return client
+
+    async def _wait(self, future):
+        return await asyncio.wait_for(future, self.options["timeout"])
+
+    async def _lobby_request(self, player, message, stats):
+        lobby = await self._connect("/ws/lobby/", player, stats)
+        try:
+            joined = lobby.expect(lambda m: m.get("type") == "joined")
+            lobby.send(message)
+            return (await self._wait(joined))["room"]["name"]
+        finally:
+            await lobby.close()
+
+    async def _room_game(self, white, black, watchers, room, index, stats):
+        options = self.options
+        if options["ramp"]:
+            await asyncio.sleep(options["ramp"] * index / max(1, options["games"]))
+        try:
+            await self._lobby_request(white, {"type": "create_room", "name": room}, stats)
+            await self._lobby_request(black, {"type": "join_room", "name": room}, stats)
+        except Exception as e:
+            stats.errors[f"lobby:{type(e).__name__}"] += 1
+            return
+        await self._play(white, black, watchers, room, index, stats)
+
+    async def _quick_match_storm(self, players, run_id, stats):
+        """Wszyscy naraz w kolejce quick_match; pary grają, gdy obaj gracze dostaną pokój."""
+        rooms = {}
+
+        async def queue(player):
+            lobby = await self._connect("/ws/lobby/", player, stats)
+            try:
+                joined = lobby.expect(lambda m: m.get("type") == "joined")
+                sent = time.monotonic()
+                lobby.send({"type": "quick_match"})
+                room = (await self._wait(joined))["room"]["name"]
+                stats.match_ms.append((time.monotonic() - sent) * 1000)
+            finally:
+                await lobby.close()
+            rooms.setdefault(room, []).append(player)
+            if len(rooms[room]) == 2:
+                white, black = rooms[room]
+                await self._play(white, black, [], room, len(rooms), stats)
+
+        results = await asyncio.gather(*[queue(p) for p in players], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                stats.errors[f"quick_match:{type(result).__name__}"] += 1
+
+    async def _play(self, white, black, watchers, room, index, stats):
+        """Losowa legalna partia; lustro pozycji w lokalnym silniku daje współrzędne ruchów."""
+        options = self.options
+        path = f"/ws/game/{room}/"
+        sockets = {}
+        try:
+            for player in [white, black] + watchers:
+                sockets[player.username] = await self._connect(path, player, stats)
+        except Exception as e:
+            stats.errors[f"connect:{type(e).__name__}"] += 1
+            await asyncio.gather(*[s.close() for s in sockets.values()])
+            return
+
+        rnd = random.Random(options["seed"] * 100003 + index)
+        mgr = ChessGameManager()
+        players = (white, black)
+        try:
+            for ply in range(options["plies"]):
+                if ply == options["reconnect_at"]:
+                    sockets[black.username] = await self._reconnect(sockets[black.username], path, black, ply, stats)
+
+                moves = sorted(mgr.get_possible_moves(), key=lambda m: (m.start_x, m.start_y, m.dest_x, m.dest_y))
+                if not moves:
+                    break
+                move = rnd.choice(moves)
+                promo = "H" if move.moved_figure.name == "Pionek" and move.dest_x in (0, 7) else ""
+                mover = sockets[players[ply % 2].username]
+                if options["think_time"]:
+                    await asyncio.sleep(options["think_time"] / 1000)
+
+                seq = ply + 1
+                reply = mover.expect(lambda m: m.get("type") in ("move", "game_over") and m.get("seq") == seq)
+                sent = time.monotonic()
+                mover.send({"type": "move", "move": {
+                    "from": {"r": move.start_x, "c": move.start_y},
+                    "to": {"r": move.dest_x, "c": move.dest_y},
+                    "promo": promo,
+                }})
+                message = await self._wait(reply)
+                stats.rtt_ms.append((time.monotonic() - sent) * 1000)
+                stats.moves += 1
+                black.seq = seq
+
+                mgr.board.make_move(move)
+                if promo:
+                    mgr.promote_pawn(promo)
+                if message["type"] == "game_over":
+                    break
+            stats.games += 1
+        except Exception as e:
+            stats.errors[f"game:{type(e).__name__}"] += 1
+        finally:
+            await asyncio.gather(*[s.close() for s in sockets.values()])
+
+    async def _reconnect(self, client, path, player, ply, stats):
+        # Zerwane połączenie i powrót z ostatnim seq - serwer wznawia z bufora albo wysyła snapshot
+        await client.close()
+        started = time.monotonic()
+        client = await self._connect(path, player, stats, query=f"&seq={player.seq}",
+                                     first=lambda m: m.get("type") in ("resumed", "connected"))
+        message = await self._wait(client.first)
+        stats.reconnect_ms.append((time.monotonic() - started) * 1000)
+        stats.reconnects[message["type"]] += 1
+        return client
+
+    def _print(self, report):
+        self.stdout.write(f"scenario {report['scenario']}: {report['games_finished']} games, {report['moves']} moves "
+                          f"in {report['duration_seconds']} s ({report['moves_per_second']} moves/s)")
+        rtt = report["move_rtt_ms"]
+        self.stdout.write(f"  move RTT ms: p50 {rtt['p50']}  p95 {rtt['p95']}  p99 {rtt['p99']}  max {rtt['max']}")
+        self.stdout.write(f"  broadcasts: {report['broadcasts']} ({report['broadcasts_per_second']}/s)")
+        if report["time_to_match_ms"]["count"]:
+            match = report["time_to_match_ms"]
+            self.stdout.write(f"  time to match ms: p50 {match['p50']}  p95 {match['p95']}  p99 {match['p99']}")
+        if report["reconnects"]:
+            rec = report["reconnect_ms"]
+            self.stdout.write(f"  reconnects {report['reconnects']}: p50 {rec['p50']} ms  p99 {rec['p99']} ms")
+        if report["server_cpu"]:
+            cpu = report["server_cpu"]
+            self.stdout.write(f"  server CPU: {cpu['cpu_seconds']} s ({cpu['cpu_percent']}%)")
+        self.stdout.write(f"  errors: {report['errors'] or 'none'}")
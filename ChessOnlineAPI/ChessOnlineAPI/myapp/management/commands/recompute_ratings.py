@@ -0,0 +1,135 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from myapp import glicko_service
+from myapp.glicko_service import np
+from myapp.models import GameHistory, PlayerProfile
+
+
+def _load_history():
+    """Partie z oboma graczami, chronologicznie: (białe, czarne, zwycięzca, timestamp, ELO białych, ELO czarnych)."""
+    rows = list(
+        GameHistory.objects.filter(white_player__isnull=False, black_player__isnull=False)
+        .order_by('date', 'id')
+        .values_list('white_player_id', 'black_player_id', 'winner_id', 'date', 'white_elo', 'black_elo')
+        .iterator(chunk_size=10000)
+    )
+    if not rows:
+        return None
+    white, black, winner, dates, white_elo, black_elo = zip(*rows)
+    return {
+        "white": np.array(white, dtype=np.int64),
+        "black": np.array(black, dtype=np.int64),
+        "winner": np.array([w if w is not None else -1 for w in winner], dtype=np.int64),
+        "timestamp": np.array([d.timestamp() for d in dates]),
+        "white_elo": np.array(white_elo, dtype=np.float64),
+        "black_elo": np.array(black_elo, dtype=np.float64),
+    }
+
+
+def _prediction_quality(expected, score):
+    """Log loss, Brier i trafność faworyta (partie rozstrzygnięte) oczekiwanego wyniku białych."""
+    p = np.clip(expected, 1e-12, 1 - 1e-12)
+    decisive = (score != 0.5) & (expected != 0.5)
+    return {
+        "log_loss": float(-np.mean(score * np.log(p) + (1 - score) * np.log(1 - p))),
+        "brier": float(np.mean((expected - score) ** 2)),
+        "accuracy": float(np.mean((expected[decisive] > 0.5) == (score[decisive] == 1))) if decisive.any() else 0.0,
+    }
+
+
+def _ranks(values):
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values, kind='stable')] = np.arange(len(values))
+    return ranks
+
+
+class Command(BaseCommand):
+    help = ("Recompute Glicko-2 ratings of all players from GameHistory in rating periods (NumPy). "
+            "With --dry-run nothing is written and the result is compared against the current ELO.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period-days", type=float, default=getattr(settings, "GLICKO_PERIOD_DAYS", 1),
+                            help="length of one rating period in days")
+        parser.add_argument("--tau", type=float, default=getattr(settings, "GLICKO_TAU", glicko_service.DEFAULT_TAU),
+                            help="volatility constraint (typically 0.3-1.2)")
+        parser.add_argument("--initial-rd", type=float, default=glicko_service.DEFAULT_RD)
+        parser.add_argument("--initial-volatility", type=float, default=glicko_service.DEFAULT_VOLATILITY)
+        parser.add_argument("--dry-run", action="store_true",
+                            help="only report: prediction quality vs. ELO, rank correlation, biggest changes")
+        parser.add_argument("--top", type=int, default=10, help="players listed in the dry-run report")
+
+    def handle(self, *args, **options):
+        if not glicko_service.available():
+            raise CommandError("recompute_ratings needs NumPy (pip install numpy)")
+        if options["period_days"] <= 0:
+            raise CommandError("--period-days must be positive")
+
+        started = time.perf_counter()
+        history = _load_history()
+        if history is None:
+            self.stdout.write("no games in history")
+            return
+        loaded = time.perf_counter()
+
+        # id użytkowników -> indeksy 0..n-1, partie -> numery okresów
+        user_ids, players = np.unique(np.concatenate((history["white"], history["black"])), return_inverse=True)
+        games = len(history["white"])
+        white, black = players[:games], players[games:]
+        white_score = np.where(history["winner"] == history["white"], 1.0,
+                               np.where(history["winner"] == -1, 0.5, 0.0))
+        period_seconds = options["period_days"] * 86400
+        period = ((history["timestamp"] - history["timestamp"][0]) // period_seconds).astype(np.int64)
+
+        rating, rd, volatility, predicted = glicko_service.recompute(
+            white, black, white_score, period,
+            tau=options["tau"], rd=options["initial_rd"], volatility=options["initial_volatility"],
+        )
+        computed = time.perf_counter()
+
+        self.stdout.write(
+            f"{games} games, {len(user_ids)} players, {int(period[-1]) + 1} periods of {options['period_days']:g} d: "
+            f"load {loaded - started:.2f} s, compute {computed - loaded:.2f} s"
+        )
+
+        if options["dry_run"]:
+            self._report(user_ids, rating, rd, predicted, white_score, history, options["top"])
+            return
+
+        profiles = list(PlayerProfile.objects.filter(user_id__in=user_ids.tolist()))
+        index = {int(user_id): i for i, user_id in enumerate(user_ids)}
+        for profile in profiles:
+            i = index[profile.user_id]
+            profile.glicko_rating = float(rating[i])
+            profile.glicko_rd = float(rd[i])
+            profile.glicko_volatility = float(volatility[i])
+        with transaction.atomic():
+            PlayerProfile.objects.bulk_update(
+                profiles, ['glicko_rating', 'glicko_rd', 'glicko_volatility'], batch_size=1000)
+        self.stdout.write(f"updated {len(profiles)} profiles in {time.perf_counter() - computed:.2f} s")
+
+    def _report(self, user_ids, rating, rd, predicted, white_score, history, top):
+        elo_expected = 1 / (1 + 10 ** ((history["black_elo"] - history["white_elo"]) / 400))
+        for name, expected in (("elo", elo_expected), ("glicko2", predicted)):
+            q = _prediction_quality(expected, white_score)
+            self.stdout.write(
+                f"  {name:<8} log loss {q['log_loss']:.4f}  brier {q['brier']:.4f}  accuracy {q['accuracy']:.3f}")
+
+        current = dict(PlayerProfile.objects.filter(user_id__in=user_ids.tolist()).values_list('user_id', 'elo'))
+        elo = np.array([current.get(int(user_id), 0) for user_id in user_ids], dtype=np.float64)
+        elo_rank, glicko_rank = _ranks(elo), _ranks(rating)
+        if len(user_ids) > 1:
+            spearman = float(np.corrcoef(elo_rank, glicko_rank)[0, 1])
+            self.stdout.write(f"  rank correlation (Spearman) current ELO vs Glicko-2: {spearman:.3f}")
+
+        # największe przesunięcia w rankingu między ELO a Glicko-2
+        moved = np.argsort(-np.abs(elo_rank - glicko_rank), kind='stable')[:top]
+        self.stdout.write("  biggest rank changes (user_id: elo -> glicko2 ± rd, places):")
+        for i in moved:
+            self.stdout.write(
+                f"    {int(user_ids[i])}: {elo[i]:.0f} -> {rating[i]:.0f} ± {rd[i]:.0f}, "
+                f"{int(glicko_rank[i] - elo_rank[i]):+d}"
+            )
@@ -0,0 +1,180 @@
+# games/matchmaking.py
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("chess")
+
+
+class Ticket:
+    __slots__ = ("user_id", "elo", "channel_name", "enqueued_at")
+
+    def __init__(self, user_id, elo, channel_name, enqueued_at):
+        self.user_id = user_id
+        self.elo = elo
+        self.channel_name = channel_name
+        self.enqueued_at = enqueued_at
+
+
+class MatchmakingQueue:
+    """
+    Kolejka quick_match w pamięci procesu. Gracze czekają w kubełkach po ELO, a dopuszczalna różnica
+    rankingu rośnie z czasem oczekiwania (base_window + widen_rate * sekundy, maks. max_window).
+
+    Parowanie odbywa się w pętli zdarzeń bez await między wyjęciem obu graczy z kolejki,
+    więc gracz nie trafi do dwóch par. on_match(white, black) tworzy pokój - raz na parę.
+    Metody wołać z pętli zdarzeń - poza stats(), która czyta tylko migawkę publikowaną przez pętlę
+    (widok DRF i /metrics/ wołają ją z wątków).
+    """
+
+    def __init__(self, on_match, bucket_size=100, base_window=100, widen_rate=25, max_window=800,
+                 tick=1.0, history=1000):
+        self.on_match = on_match
+        self.bucket_size = bucket_size
+        self.base_window = base_window
+        self.widen_rate = widen_rate
+        self.max_window = max_window
+        self.tick = tick
+        self._tickets = {}    # user_id -> Ticket
+        self._buckets = {}    # elo // bucket_size -> OrderedDict(user_id -> Ticket), od najdłużej czekających
+        self._task = None
+        self._running = set()
+        # metryki
+        self._waits = deque(maxlen=history)
+        self._pair_times = deque()
+        self.pairings = 0
+        self.cancelled = 0
+        # migawka dla stats(): pętla ją podmienia, inne wątki tylko czytają (pod blokadą)
+        self._stats_lock = threading.Lock()
+        self._snapshot = {}
+        self._snapshot_pair_times = ()
+        self._percentiles = (0.0, 0.0, 0.0)
+        self._publish()
+
+    def window(self, waited):
+        return min(self.max_window, self.base_window + self.widen_rate * waited)
+
+    def enqueue(self, user_id, elo, channel_name):
+        """Dodaje gracza albo od razu go paruje. Ponowne zgłoszenie tylko aktualizuje kanał."""
+        ticket = self._tickets.get(user_id)
+        if ticket is not None:
+            ticket.channel_name = channel_name
+            return
+        ticket = Ticket(user_id, elo, channel_name, time.monotonic())
+        opponent = self._find_opponent(ticket, ticket.enqueued_at)
+        if opponent is not None:
+            self._pair(opponent, ticket)
+            return
+        self._tickets[user_id] = ticket
+        self._buckets.setdefault(elo // self.bucket_size, OrderedDict())[user_id] = ticket
+        self._publish()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def cancel(self, user_id, channel_name=None):
+        """Usuwa gracza z kolejki (channel_name: tylko jeśli czeka z tego połączenia)."""
+        ticket = self._tickets.get(user_id)
+        if ticket is None or (channel_name is not None and ticket.channel_name != channel_name):
+            return False
+        self._remove(ticket)
+        self.cancelled += 1
+        self._publish()
+        return True
+
+    def _remove(self, ticket):
+        del self._tickets[ticket.user_id]
+        key = ticket.elo // self.bucket_size
+        bucket = self._buckets[key]
+        del bucket[ticket.user_id]
+        if not bucket:
+            del self._buckets[key]
+
+    def _find_opponent(self, ticket, now):
+        # Para jest dopuszczalna, gdy różnica mieści się w oknie dłużej czekającego z dwojga
+        first = (ticket.elo - self.max_window) // self.bucket_size
+        last = (ticket.elo + self.max_window) // self.bucket_size
+        waited = now - ticket.enqueued_at
+        best = None
+        best_key = None
+        for key in range(first, last + 1):
+            for other in self._buckets.get(key, {}).values():
+                if other.user_id == ticket.user_id:
+                    continue
+                diff = abs(other.elo - ticket.elo)
+                if diff > self.window(max(waited, now - other.enqueued_at)):
+                    continue
+                rank = (diff, other.enqueued_at)
+                if best_key is None or rank < best_key:
+                    best, best_key = other, rank
+        return best
+
+    def _pair(self, a, b):
+        # Dłużej czekający gra białymi (jak host pokoju)
+        white, black = sorted((a, b), key=lambda t: t.enqueued_at)
+        now = time.monotonic()
+        for ticket in (white, black):
+            if ticket.user_id in self._tickets:
+                self._remove(ticket)
+            self._waits.append(now - ticket.enqueued_at)
+        self.pairings += 1
+        self._pair_times.append(now)
+        self._prune_pair_times(now)
+        self._publish(paired=True)
+        task = asyncio.get_running_loop().create_task(self._notify(white, black))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _notify(self, white, black):
+        try:
+            await self.on_match(white, black)
+        except Exception:
+            logger.exception("Matchmaking on_match failed: white=%s black=%s", white.user_id, black.user_id)
+
+    async def _run(self):
+        # Co `tick` sekund próbuje sparować czekających, których okna zdążyły się poszerzyć
+        while self._tickets:
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            for ticket in sorted(self._tickets.values(), key=lambda t: t.enqueued_at):
+                if ticket.user_id not in self._tickets:
+                    continue
+                opponent = self._find_opponent(ticket, now)
+                if opponent is not None:
+                    self._pair(ticket, opponent)
+
+    def _prune_pair_times(self, now):
+        while self._pair_times and now - self._pair_times[0] > 60:
+            self._pair_times.popleft()
+
+    def _publish(self, paired=False):
+        """Nowa migawka statystyk (tylko z pętli zdarzeń, po każdej zmianie kolejki)."""
+        if paired:
+            # czasy oczekiwania zmieniają się tylko przy parowaniu - sortujemy wtedy, nie przy każdym odczycie
+            waits = sorted(self._waits)
+            self._percentiles = tuple(
+                waits[min(len(waits) - 1, int(p / 100 * len(waits)))] if waits else 0.0 for p in (50, 90, 99))
+        p50, p90, p99 = self._percentiles
+        snapshot = {
+            "queue_length": len(self._tickets),
+            "buckets": {key * self.bucket_size: len(bucket) for key, bucket in sorted(self._buckets.items())},
+            "pairings": self.pairings,
+            "cancelled": self.cancelled,
+            "time_to_match_p50": p50,
+            "time_to_match_p90": p90,
+            "time_to_match_p99": p99,
+        }
+        pair_times = tuple(self._pair_times)
+        with self._stats_lock:
+            self._snapshot = snapshot
+            self._snapshot_pair_times = pair_times
+
+    def stats(self):
+        """Statystyki z ostatniej migawki - bezpieczne z dowolnego wątku, niczego nie zmienia."""
+        with self._stats_lock:
+            stats = dict(self._snapshot)
+            pair_times = self._snapshot_pair_times
+        now = time.monotonic()
+        stats["pairings_per_second"] = sum(1 for t in pair_times if now - t <= 60) / 60
+        return stats
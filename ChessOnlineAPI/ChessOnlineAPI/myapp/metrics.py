@@ -0,0 +1,226 @@
+# games/metrics.py
+"""
+Metryki procesu w formacie tekstowym Prometheusa (bez zewnętrznej biblioteki).
+
+Histogramy mają stałe kubełki, więc pomiar to perf_counter + bisect pod lockiem - do zostawienia
+włączonego pod obciążeniem. Wartości są per proces; przy ENGINE_EXECUTOR="process" pomiary
+z wnętrza apply_move_sync zostają w procesach roboczych (czas całego ruchu liczy konsument).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+# sekundy: od 0.5 ms do 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _child(self, values):
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, series in sorted(self._series.items()):
+            lines.extend(self._render_series(_labels_text(self.label_names, values), series))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return [0.0]
+
+    def inc(self, *labels, amount=1):
+        series = self._child(labels)
+        with self._lock:
+            series[0] += amount
+
+    def _render_series(self, labels, series):
+        return [f"{self.name}_total{labels} {series[0]:g}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self):
+        # liczniki kubełków (nie skumulowane) + ostatni na +Inf, suma, liczba
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, seconds, *labels):
+        series = self._child(labels)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _render_series(self, labels, series):
+        with self._lock:
+            counts, total, count = list(series[0]), series[1], series[2]
+        prefix = labels[:-1] + "," if labels else "{"
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f'{self.name}_bucket{prefix}le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum{labels} {total:g}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Wartość liczona przy odczycie (callback) albo ustawiana inc/dec."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), func=None):
+        super().__init__(name, help_text, labels)
+        self.func = func
+
+    def _new_series(self):
+        return [0.0]
+
+    def inc(self, *labels, amount=1):
+        series = self._child(labels)
+        with self._lock:
+            series[0] += amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self):
+        if self.func is not None:
+            self._series = {(): [float(self.func())]}
+        return super().render()
+
+    def _render_series(self, labels, series):
+        return [f"{self.name}{labels} {series[0]:g}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, labels=(), func=None):
+        return self.register(Gauge(name, help_text, labels, func))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # zepsuty callback nie może zabrać całej strony metryk
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- metryki gorącej ścieżki ---
+
+WS_RECEIVE_SECONDS = registry.histogram(
+    "chess_ws_receive_seconds", "ChessGameConsumer.receive by message type", ("type",))
+MOVE_SECONDS = registry.histogram(
+    "chess_move_seconds", "Whole move as seen by the consumer (executor queue + engine + DB)")
+EXECUTOR_WAIT_SECONDS = registry.histogram(
+    "chess_executor_wait_seconds", "Time a job waited in the engine executor queue")
+ENGINE_APPLY_SECONDS = registry.histogram(
+    "chess_engine_apply_seconds", "Move validation and application in the engine (apply_move_sync)")
+DB_SAVE_SECONDS = registry.histogram(
+    "chess_db_save_seconds", "Persisting a move or a finished game (apply_move_sync)")
+GROUP_SEND_SECONDS = registry.histogram(
+    "chess_group_send_seconds", "channel_layer.group_send of one game broadcast")
+TIMEOUT_CHECK_SECONDS = registry.histogram(
+    "chess_timeout_check_seconds", "check_game_timeout")
+LOBBY_LOAD_SECONDS = registry.histogram(
+    "chess_lobby_load_seconds", "Loading room summaries for the lobby index")
+HTTP_SECONDS = registry.histogram(
+    "chess_http_request_seconds", "REST requests by view and status", ("view", "method", "status"))
+
+MOVES = registry.counter("chess_moves", "Moves applied")
+ILLEGAL_MOVES = registry.counter("chess_illegal_moves", "Moves rejected by the engine or game state")
+TIMEOUTS = registry.counter("chess_timeouts", "Games finished on time")
+CONNECTS = registry.counter("chess_ws_connects", "Game socket connections")
+DISCONNECTS = registry.counter("chess_ws_disconnects", "Game socket disconnections")
+CONNECTIONS = registry.gauge("chess_ws_connections", "Open game sockets")
+
+
+class RequestMetricsMiddleware:
+    """Czas odpowiedzi widoków REST (etykieta = nazwa widoku z urls.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unmatched"
+        HTTP_SECONDS.observe(time.perf_counter() - started, view, request.method, response.status_code)
+        return response
+
+
+def metrics_view(request):
+    """
+    GET /metrics/ - format tekstowy Prometheusa. Z METRICS_TOKEN wymagany nagłówek Bearer;
+    bez tokenu dostępne tylko przy DEBUG (domyślnie zamknięte na produkcji).
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,21 +1,113 @@
 # games/middleware.py
+import threading
+import time
+from collections import OrderedDict
 from urllib.parse import parse_qs
 from django.contrib.auth.models import AnonymousUser
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 import jwt
 from django.conf import settings
 
+from . import metrics
+from .models import PlayerProfile
+
 User = get_user_model()
 SECRET_KEY = settings.SECRET_KEY
 
+
+class UserCache:
+    """
+    Użytkownicy z tokenów WebSocket (LRU + TTL), z profilem z select_related.
+    Fala reconnectów po wdrożeniu nie zamienia się w falę zapytań o użytkowników.
+    Zmiana użytkownika / profilu w tym procesie unieważnia wpis (sygnały niżej), w innych - TTL.
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._users = OrderedDict()   # user_id -> (user, wygasa)
+        self._lock = threading.Lock()  # invalidate woła się z wątków (sygnały przy zapisie)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return None
+
+    def put(self, user_id, user):
+        with self._lock:
+            self._users[user_id] = (user, time.monotonic() + self.ttl)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, "WS_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "WS_USER_CACHE_TTL", 60),
+)
+metrics.registry.gauge("chess_ws_user_cache_hit_rate", "Hit rate of the WebSocket user cache",
+                       func=lambda: user_cache.stats()["hit_rate"])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=PlayerProfile)
+@receiver(post_delete, sender=PlayerProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    user_cache.invalidate(instance.user_id)
+
+
 @database_sync_to_async
 def get_user(user_id):
     try:
-        return User.objects.get(id=user_id)
+        # profil od razu - serializacja pokoi / ELO nie robi osobnego zapytania
+        return User.objects.select_related('profile').get(id=user_id)
     except User.DoesNotExist:
         return AnonymousUser()
 
+
+async def get_cached_user(user_id):
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await get_user(user_id)
+        if user.is_authenticated:
+            user_cache.put(user_id, user)
+    return user
+
 class JwtAuthMiddleware:
     def __init__(self, inner):
         self.inner = inner
@@ -28,7 +120,7 @@ class JwtAuthMiddleware:
         if token:
             try:
                 payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-                user = await get_user(payload.get("user_id"))
+                user = await get_cached_user(payload.get("user_id"))
             except Exception:
                 user = AnonymousUser()
         else:
@@ -38,4 +130,3 @@ class JwtAuthMiddleware:
 
         # 🔥 KLUCZOWA LINIA
         return await self.inner(scope, receive, send)
-
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_gamehistory_moves'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ply', models.PositiveIntegerField()),
+                ('move', models.PositiveIntegerField()),
+                ('white_time', models.FloatField()),
+                ('black_time', models.FloatField()),
+                ('played_at', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal', to='myapp.game')),
+            ],
+            options={
+                'ordering': ['game', 'ply'],
+                'constraints': [models.UniqueConstraint(fields=('game', 'ply'), name='gamemove_game_ply_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_gamemove'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamehistory',
+            name='game',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='result', to='myapp.game'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0008_gamehistory_game'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerprofile',
+            name='glicko_rating',
+            field=models.FloatField(default=1500.0),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='glicko_rd',
+            field=models.FloatField(default=350.0),
+        ),
+        migrations.AddField(
+            model_name='playerprofile',
+            name='glicko_volatility',
+            field=models.FloatField(default=0.06),
+        ),
+    ]
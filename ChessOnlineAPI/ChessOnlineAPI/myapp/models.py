@@ -12,6 +12,29 @@ class Game(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+
+class GameMove(models.Model):
+    """
+    Dziennik ruchów partii - jeden mały wiersz na półruch zamiast przepisywania całego Game.state.
+    Game.state jest checkpointem (FEN + ruchy do ply = len(moves)); reszta partii to wiersze z ply > len(moves).
+    """
+    game = models.ForeignKey(Game, related_name='journal', on_delete=models.CASCADE)
+    ply = models.PositiveIntegerField()                 # numer półruchu od 1
+    move = models.PositiveIntegerField()                # spakowany ruch: promo << 12 | from << 6 | to
+    white_time = models.FloatField()                    # zegary po ruchu
+    black_time = models.FloatField()
+    played_at = models.FloatField()                     # time.time() ruchu (last_move_timestamp)
+
+    class Meta:
+        ordering = ['game', 'ply']
+        constraints = [
+            # indeks (game, ply) + ochrona przed dwoma zapisami tego samego półruchu
+            models.UniqueConstraint(fields=['game', 'ply'], name='gamemove_game_ply_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.game.room_name} #{self.ply}"
+
 from django.contrib.auth.hashers import make_password, check_password
 
 User = settings.AUTH_USER_MODEL
@@ -29,6 +52,9 @@ class GameHistory(models.Model):
     reason = models.CharField(max_length=50) # 'checkmate', 'timeout', 'resignation', 'agreement', 'stalemate'
     date = models.DateTimeField(auto_now_add=True)
 
+    # Klucz wyniku: jedna historia na partię - drugi zapis tego samego wyniku (timeout vs poddanie) kończy się IntegrityError
+    game = models.OneToOneField(Game, related_name='result', on_delete=models.SET_NULL, null=True, blank=True)
+
     def __str__(self):
         return f"{self.white_player} vs {self.black_player} ({self.date})"
 
@@ -74,6 +100,11 @@ class PlayerProfile(models.Model):
     losses = models.IntegerField(default=0)
     draws = models.IntegerField(default=0)
 
+    # Glicko-2 obok ELO (glicko_service): rating, odchylenie (RD) i zmienność
+    glicko_rating = models.FloatField(default=1500.0)
+    glicko_rd = models.FloatField(default=350.0)
+    glicko_volatility = models.FloatField(default=0.06)
+
     def __str__(self):
         return f"{self.user.username} ({self.elo})"
 
@@ -0,0 +1,253 @@
+# games/move_journal.py
+import atexit
+import glob
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+from . import codec
+from .models import Game, GameMove
+
+logger = logging.getLogger("chess")
+
+_FIELDS = ("game_id", "ply", "move", "white_time", "black_time", "played_at")
+
+
+def _try_lock(f):
+    """Blokada pliku do końca procesu (zwalnia ją system, także po awarii); False = trzyma ją inny proces."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class MoveJournal:
+    """
+    Tryb write-behind dla ruchów: wiersz GameMove najpierw trafia do lokalnego pliku (append + fsync),
+    a wątek w tle wpisuje zebrane ruchy do bazy jedną transakcją co `interval` s albo po `max_batch` ruchach.
+
+    Ruch jest potwierdzany pokojowi po fsync pliku, więc opóźnienie broadcastu nie zależy od commitu bazy.
+    Po restarcie niewpisane ruchy są odtwarzane z pliku (insert idempotentny dzięki unikalnemu (game, ply)).
+
+    Wpis niesie wersję partii (Game.updated_at sesji przy zapisie); zapis paczki pomija ruchy partii,
+    których wersja w bazie jest już inna (poddanie / remis / timeout / zmiana z innego procesu) -
+    ich pozycję i tak ma checkpoint, który zmienił wersję.
+
+    Plik jest per proces: `base_path` z pid w nazwie (move_journal.<pid>.log), zablokowany na czas życia
+    procesu - tylko właściciel go dopisuje i czyści. Przy starcie proces przejmuje też pliki procesów,
+    które już nie żyją (blokada wolna), więc ruchy po awarii jednego z kilku workerów nie giną.
+    Pokój musi być obsługiwany przez jeden proces (ruchy czekające w pliku innego procesu nie są widoczne).
+    """
+
+    def __init__(self, base_path, interval=0.2, max_batch=100):
+        self.base_path = str(base_path)
+        self.path = None
+        self.interval = interval
+        self.max_batch = max_batch
+        self._lock = threading.Lock()          # plik + lista oczekujących
+        self._flush_lock = threading.Lock()    # jeden zapis do bazy naraz
+        self._wake = threading.Event()
+        self._pending = []
+        self._file = None
+        self._thread = None
+        self._closed = False
+        self.appended = 0
+        self.flushed = 0
+        self.batches = 0
+        self.rejected = 0
+
+    def start(self):
+        """Odtwarza ruchy z pliku (i plików martwych procesów), uruchamia wątek zapisu. Wołane leniwie."""
+        with self._lock:
+            if self._file is not None:
+                return
+            root, ext = os.path.splitext(self.base_path)
+            self.path = f"{root}.{os.getpid()}{ext}"
+            journal = open(self.path, "a+", encoding="utf-8")
+            if not _try_lock(journal):
+                journal.close()
+                raise RuntimeError(f"Move journal {self.path} is locked by another process")
+            text = self._read_text(journal)
+            self._pending = self._parse(text, self.path)
+            if text and not text.endswith("\n"):
+                # nowe wpisy nie mogą dokleić się do urwanej linii
+                journal.write("\n")
+            self._file = journal
+            adopted = self._adopt_orphans(f"{root}.*{ext}")
+            self._thread = threading.Thread(target=self._run, name="move-journal", daemon=True)
+            self._thread.start()
+        if self._pending:
+            logger.info("Move journal replay: %s entries (%s from dead processes) in %s",
+                        len(self._pending), adopted, self.path)
+        self.flush()
+        atexit.register(self.close)
+
+    def _adopt_orphans(self, pattern):
+        """Wpisy z plików procesów bez blokady (zakończonych) -> do własnego pliku, potem ich pliki usuwamy."""
+        adopted = 0
+        for path in glob.glob(pattern):
+            if os.path.abspath(path) == os.path.abspath(self.path):
+                continue
+            try:
+                orphan = open(path, "a+", encoding="utf-8")
+            except OSError:
+                continue
+            try:
+                if not _try_lock(orphan):
+                    continue   # proces żyje - to jego plik
+                entries = self._parse(self._read_text(orphan), path)
+                if entries:
+                    # najpierw trwale u siebie, dopiero potem usunięcie cudzego pliku
+                    self._file.write("".join(codec.dumps(e) + "\n" for e in entries))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._pending.extend(entries)
+                    adopted += len(entries)
+            finally:
+                orphan.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return adopted
+
+    @staticmethod
+    def _read_text(f):
+        # przez ten sam (zablokowany) uchwyt - na Windows blokada nie wpuszcza innych uchwytów
+        f.seek(0)
+        text = f.read()
+        f.seek(0, os.SEEK_END)
+        return text
+
+    @staticmethod
+    def _parse(text, path):
+        entries = []
+        for line in text.splitlines():
+            if not line:
+                continue
+            try:
+                entries.append(codec.loads(line))
+            except ValueError:
+                # urwana ostatnia linia po awarii - ten ruch nie był potwierdzony
+                logger.warning("Move journal: skipping damaged entry in %s", path)
+        return entries
+
+    def append(self, row, version=None):
+        """Zapisuje ruch (GameMove) na dysk. Po powrocie ruch przetrwa awarię procesu."""
+        self.start()
+        entry = {name: getattr(row, name) for name in _FIELDS}
+        if version is not None:
+            entry["version"] = version.isoformat()
+        line = codec.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending.append(entry)
+            self.appended += 1
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Wpisuje oczekujące ruchy do bazy. Wołane też przed odczytem partii z bazy (GameSession.load)."""
+        if self._closed:
+            return
+        if self._file is None:
+            # pierwsze użycie: start() odtworzy plik i sam wywoła flush
+            self.start()
+            return
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Move journal flush failed: %s entries", len(batch))
+                with self._lock:
+                    self._pending[:0] = batch
+                return
+            self.flushed += len(batch)
+            self.batches += 1
+            with self._lock:
+                if not self._pending and self._file is not None:
+                    # wszystko jest już w bazie - plik można wyczyścić
+                    self._file.truncate(0)
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+
+    def close(self):
+        """Przy zamknięciu procesu: ostatni zapis do bazy; pusty plik usuwamy (inaczej zostaje po każdym pid)."""
+        self.flush()
+        with self._lock:
+            if self._file is None or self._pending:
+                return
+            self._closed = True
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _write(self, batch):
+        with transaction.atomic():
+            # partie usunięte w międzyczasie (zamknięty pokój) pomijamy - inaczej FK wywróci całą paczkę;
+            # ruchy zapisane przy innej wersji partii też (wpisy bez wersji - ze starszych plików - przechodzą)
+            versions = {
+                pk: updated_at.isoformat()
+                for pk, updated_at in Game.objects.filter(pk__in={e["game_id"] for e in batch})
+                .values_list("pk", "updated_at")
+            }
+            rows = []
+            for e in batch:
+                version = versions.get(e["game_id"])
+                if version is None or e.get("version", version) != version:
+                    self.rejected += 1
+                    continue
+                rows.append(GameMove(**{name: e[name] for name in _FIELDS}))
+            GameMove.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self):
+        return {"path": self.path, "pending": len(self._pending), "appended": self.appended, "flushed": self.flushed,
+                "batches": self.batches, "rejected": self.rejected}
+
+
+def _from_settings():
+    """MoveJournal z ustawień albo None, gdy GAME_WRITE_BEHIND jest wyłączone."""
+    if not getattr(settings, "GAME_WRITE_BEHIND", False):
+        return None
+    if getattr(settings, "ENGINE_EXECUTOR", "thread") == "process":
+        # ruchy zapisywałyby procesy robocze, a proces główny czytałby partie bez ich oczekujących ruchów
+        raise ImproperlyConfigured('GAME_WRITE_BEHIND requires ENGINE_EXECUTOR = "thread"')
+    return MoveJournal(
+        getattr(settings, "GAME_WRITE_BEHIND_PATH", os.path.join(settings.BASE_DIR, "move_journal.log")),
+        interval=getattr(settings, "GAME_WRITE_BEHIND_INTERVAL_MS", 200) / 1000,
+        max_batch=getattr(settings, "GAME_WRITE_BEHIND_MAX_MOVES", 100),
+    )
+
+
+move_journal = _from_settings()
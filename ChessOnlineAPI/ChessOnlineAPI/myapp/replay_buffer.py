@@ -0,0 +1,67 @@
+# games/replay_buffer.py
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+
+class ReplayBuffer:
+    """
+    Ostatnie zdarzenia broadcastu pokoju (delty "move" i "game_over") w pamięci procesu,
+    już zakodowane (encoded_event), z numerem sekwencji = numer półruchu.
+
+    Klient po zerwaniu połączenia podaje ostatni widziany seq i dostaje tylko brakujące zdarzenia;
+    gdy bufor nie pokrywa luki (restart, za długa przerwa), dostaje zwykły snapshot.
+    Metody wołać z pętli zdarzeń.
+    """
+
+    def __init__(self, size=64, max_rooms=500):
+        self.size = size
+        self.max_rooms = max_rooms
+        self._rooms = OrderedDict()   # pokój -> deque[(seq, event)] (LRU)
+        self.resumed = 0
+        self.fallbacks = 0
+
+    def record(self, room_name, seq, event):
+        events = self._rooms.get(room_name)
+        if events is None:
+            events = self._rooms[room_name] = deque(maxlen=self.size)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+        else:
+            self._rooms.move_to_end(room_name)
+        if events and (seq < events[-1][0] or (seq == events[-1][0] and event["type"] == "broadcast_move")):
+            # starsze od tego, co już mamy (np. wyścig przy odtworzeniu sesji) albo ruch z tym samym seq
+            # (nowa partia w pokoju po game_over) - bufor jest niepewny
+            events.clear()
+        events.append((seq, event))
+
+    def since(self, room_name, last_seq):
+        """
+        Zdarzenia po last_seq albo None, jeśli trzeba wysłać snapshot.
+        Końcowe "game_over" (ten sam seq co ostatni ruch) wysyłamy zawsze - jego powtórka niczego nie psuje.
+        """
+        events = self._rooms.get(room_name)
+        if not events or last_seq > events[-1][0]:
+            self.fallbacks += 1
+            return None
+        # pierwszy ruch w buforze musi być następnym po last_seq (game_over na początku nie wystarczy)
+        first_seq, first_event = events[0]
+        if last_seq < first_seq - (first_event["type"] == "broadcast_move"):
+            self.fallbacks += 1
+            return None
+        missed = [event for seq, event in events
+                  if seq > last_seq or (seq == last_seq and event["type"] == "broadcast_game_over")]
+        self.resumed += 1
+        return missed
+
+    def discard(self, room_name):
+        self._rooms.pop(room_name, None)
+
+    def stats(self):
+        return {"rooms": len(self._rooms), "resumed": self.resumed, "fallbacks": self.fallbacks}
+
+
+replay_buffer = ReplayBuffer(
+    size=getattr(settings, "GAME_REPLAY_BUFFER_SIZE", 64),
+    max_rooms=getattr(settings, "GAME_SESSION_MAX", 500),
+)
@@ -0,0 +1,95 @@
+import random
+import unittest
+
+from myapp.chess_engine.BitBoard import BitBoard
+from myapp.chess_engine.Engine import Board
+from myapp.chess_engine.Game_Manager import ChessGameManager
+from myapp.chess_engine.Perft import perft
+from myapp.chess_engine.utils.MoveCache import legal_move_cache
+
+# (opis, FEN, głębokość perft)
+POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 3),
+    ("castling both sides", "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", 3),
+    ("castling through check", "r3k2r/8/8/8/8/8/8/R3K1rR w KQkq - 0 1", 2),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 2),
+    ("en passant", "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", 3),
+    ("en passant exposes king", "8/8/8/K2pP2r/8/8/8/7k w - d6 0 1", 3),
+    ("en passant pins", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 3),
+    ("promotions", "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1", 3),
+    ("promotion with check", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 2),
+    ("pinned pieces", "4k3/4r3/8/8/1b6/2N5/3R4/4K2q w - - 0 1", 3),
+    ("double check", "4k3/8/8/8/8/5n2/8/r3K3 w - - 0 1", 3),
+    ("ambiguous knights and rooks", "7k/8/8/8/R7/8/8/RN3NK1 w - - 0 1", 2),
+]
+
+
+def notations(board):
+    return sorted(move.user_notation for move in board.update_moves())
+
+
+def promotion_letter(mgr, notation, letter):
+    # literę figury podajemy tylko przy ruchu piona na ostatnią linię
+    for move in mgr.get_possible_moves():
+        if move.user_notation == notation:
+            return letter if move.moved_figure.name == 'Pionek' and move.dest_x in (0, 7) else None
+
+
+class BitBoardMatchesBoardTests(unittest.TestCase):
+    """BitBoard ma generować dokładnie te same ruchy i notacje co Board."""
+
+    def setUp(self):
+        self._cache_size = legal_move_cache.maxsize
+        legal_move_cache.resize(0)
+
+    def tearDown(self):
+        legal_move_cache.resize(self._cache_size)
+
+    def test_perft_counts(self):
+        for name, fen, depth in POSITIONS:
+            with self.subTest(name):
+                self.assertEqual(perft(BitBoard.from_fen(fen), depth), perft(Board.from_fen(fen), depth))
+
+    def test_user_notations(self):
+        # pozycja startowa i wszystkie pozycje po jednym ruchu
+        for name, fen, _ in POSITIONS:
+            board, bitboard = Board.from_fen(fen), BitBoard.from_fen(fen)
+            expected = notations(board)
+            with self.subTest(name):
+                self.assertEqual(notations(bitboard), expected)
+            for notation in expected:
+                with self.subTest(name, move=notation):
+                    a = ChessGameManager.from_fen(fen, Board)
+                    b = ChessGameManager.from_fen(fen, BitBoard)
+                    promotion = promotion_letter(a, notation, 'S')
+                    self.assertTrue(a.make_move(notation, promotion))
+                    self.assertTrue(b.make_move(notation, promotion))
+                    self.assertEqual(b.get_fen(), a.get_fen())
+                    self.assertEqual(b.get_board_state(), a.get_board_state())
+                    self.assertEqual(sorted(b.get_possible_move_notations()),
+                                     sorted(a.get_possible_move_notations()))
+
+    def test_disambiguation(self):
+        moves = notations(BitBoard.from_fen("7k/8/8/8/R7/8/8/RN3NK1 w - - 0 1"))
+        self.assertIn("Sbd2", moves)
+        self.assertIn("Sfd2", moves)
+        self.assertIn("W4a2", moves)
+        self.assertIn("W1a2", moves)
+
+    def test_random_games(self):
+        rnd = random.Random(7)
+        for game in range(20):
+            fen = rnd.choice(POSITIONS)[1]
+            a = ChessGameManager.from_fen(fen, Board)
+            b = ChessGameManager.from_fen(fen, BitBoard)
+            for ply in range(60):
+                expected = sorted(a.get_possible_move_notations())
+                with self.subTest(game=game, ply=ply):
+                    self.assertEqual(sorted(b.get_possible_move_notations()), expected)
+                    self.assertEqual((b.is_checkmate(), b.is_stalemate()), (a.is_checkmate(), a.is_stalemate()))
+                if not expected:
+                    break
+                notation = rnd.choice(expected)
+                promotion = promotion_letter(a, notation, rnd.choice('HWSG'))
+                self.assertEqual(b.make_move(notation, promotion), a.make_move(notation, promotion))
+                self.assertEqual(b.get_fen(), a.get_fen())
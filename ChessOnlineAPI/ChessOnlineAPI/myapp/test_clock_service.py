@@ -0,0 +1,71 @@
+import asyncio
+import time
+import unittest
+
+from myapp.clock_service import ClockScheduler
+
+
+class ClockSchedulerTests(unittest.IsolatedAsyncioTestCase):
+    """Kopiec terminów upadku flagi: przesunięcie, anulowanie, dokładnie jedno wywołanie na termin."""
+
+    async def asyncSetUp(self):
+        self.calls = []
+        self.next_deadlines = []
+        self.scheduler = ClockScheduler(self.handler)
+
+    async def asyncTearDown(self):
+        if self.scheduler._task is not None:
+            self.scheduler._task.cancel()
+
+    async def handler(self, room_name):
+        self.calls.append(room_name)
+        return self.next_deadlines.pop(0) if self.next_deadlines else None
+
+    def in_(self, seconds):
+        return time.time() + seconds
+
+    async def test_flag_fall_fires_once(self):
+        deadline = self.in_(0.02)
+        self.scheduler.arm("room", deadline)
+        self.scheduler.arm("room", deadline)   # ten sam termin drugi raz - bez nowego wpisu
+        await asyncio.sleep(0.15)
+        self.assertEqual(self.calls, ["room"])
+        self.assertEqual((self.scheduler.fired, self.scheduler.pending()), (1, 0))
+        self.assertEqual(self.scheduler._heap, [])
+
+    async def test_reschedule_after_move_drops_stale_entry(self):
+        self.scheduler.arm("room", self.in_(0.05))
+        self.scheduler.arm("room", self.in_(0.25))   # ruch przesunął termin
+        await asyncio.sleep(0.12)
+        self.assertEqual(self.calls, [])
+        # pierwszy wpis był nieaktualny i wypadł z kopca, nie wywołując handlera
+        self.assertEqual(len(self.scheduler._heap), 1)
+        self.assertEqual(self.scheduler.pending(), 1)
+        await asyncio.sleep(0.25)
+        self.assertEqual(self.calls, ["room"])
+        self.assertEqual(self.scheduler.fired, 1)
+
+    async def test_cancel_before_deadline(self):
+        self.scheduler.arm("room", self.in_(0.05))
+        self.scheduler.arm("other", self.in_(0.08))
+        self.scheduler.cancel("room")
+        self.assertEqual(self.scheduler.pending(), 1)
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.calls, ["other"])
+        self.assertEqual(self.scheduler._heap, [])
+
+    async def test_handler_deadline_rearms(self):
+        # zegar zmienił się w międzyczasie: handler zwraca nowy termin zamiast kończyć grę
+        self.next_deadlines = [self.in_(0.08)]
+        self.scheduler.arm("room", self.in_(0.02))
+        await asyncio.sleep(0.05)
+        self.assertEqual((self.calls, self.scheduler.pending()), (["room"], 1))
+        await asyncio.sleep(0.15)
+        self.assertEqual(self.calls, ["room", "room"])
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    async def test_arm_none_cancels(self):
+        self.scheduler.arm("room", self.in_(0.02))
+        self.scheduler.arm("room", None)
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.calls, [])
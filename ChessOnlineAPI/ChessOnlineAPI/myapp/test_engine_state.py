@@ -0,0 +1,97 @@
+from django.test import SimpleTestCase
+
+from myapp import codec
+from myapp.chess_engine.BitBoard import BitBoard
+from myapp.chess_engine.Engine import Board
+from myapp.chess_engine.Game_Manager import ChessGameManager
+from myapp.chess_engine.utils.Fen import START_FEN
+from myapp.engine_adapter import STATE_VERSION, EngineWrapper
+
+# pozycje do zapisu z powrotem bez zmian: prawa roszady, bicie w przelocie, liczniki półruchów i ruchów
+ROUND_TRIP_FENS = [
+    START_FEN,
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1",
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "r3k2r/8/8/8/8/8/8/R3K2R w Kq - 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R b Qk - 7 20",
+    "4k3/8/8/8/8/8/8/4K2R w K - 37 82",
+    "8/8/4k3/8/2pP4/8/8/4K3 b - d3 0 45",
+]
+
+# stary format (v1): pełna plansza, legalne ruchy i tura zapisane w Game.state, bez FEN
+LEGACY_MOVES = ["e4", "d5", "e5", "f5"]
+
+
+def legacy_state(moves=LEGACY_MOVES, **extra):
+    mgr = ChessGameManager()
+    for notation in moves:
+        assert mgr.make_move(notation), notation
+    state = EngineWrapper.manager_state(mgr, list(moves))
+    state.update({"white_time": 512.5, "black_time": 498.0, "last_move_timestamp": 1000.0,
+                  "game_over": False, "winner": None, "reason": None}, **extra)
+    return state
+
+
+class FenRoundTripTests(SimpleTestCase):
+
+    def test_fen_is_written_back_unchanged(self):
+        for board_class in (Board, BitBoard):
+            for fen in ROUND_TRIP_FENS:
+                with self.subTest(board=board_class.__name__, fen=fen):
+                    self.assertEqual(ChessGameManager.from_fen(fen, board_class).get_fen(), fen)
+
+    def test_counters_advance_from_loaded_fen(self):
+        for board_class in (Board, BitBoard):
+            with self.subTest(board=board_class.__name__):
+                mgr = ChessGameManager.from_fen("4k3/8/8/8/8/8/4P3/4K2R b K - 37 82", board_class)
+                self.assertTrue(mgr.make_move("Kd7"))
+                self.assertEqual(mgr.get_fen(), "8/3k4/8/8/8/8/4P3/4K2R w K - 38 83")
+                # ruch pionem zeruje licznik półruchów i ustawia pole bicia w przelocie
+                self.assertTrue(mgr.make_move("e4"))
+                self.assertEqual(mgr.get_fen(), "8/3k4/8/8/4P3/8/8/4K2R b K e3 0 83")
+
+
+class LegacyStateMigrationTests(SimpleTestCase):
+    """Game.state w formacie v1 jest czytany i przepisywany do v2 z tą samą pozycją."""
+
+    def test_v1_state_migrates_to_v2(self):
+        legacy = legacy_state()
+        mgr, state = EngineWrapper.load_state(codec.dumps(legacy))
+
+        self.assertEqual(state["v"], STATE_VERSION)
+        # odtworzone z listy ruchów - bicie w przelocie i liczniki zachowane
+        self.assertEqual(state["fen"], "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3")
+        self.assertEqual(mgr.get_board_state(), legacy["board"])
+        self.assertEqual(mgr.get_game_turn(), legacy["turn"])
+        self.assertIn("exf6", mgr.get_possible_move_notations())
+        self.assertEqual(state["moves"], LEGACY_MOVES)
+        for key in ("white_time", "black_time", "last_move_timestamp", "game_over"):
+            self.assertEqual(state[key], legacy[key])
+        self.assertNotIn("board", state)
+        self.assertNotIn("legal_moves", state)
+
+        # zapisany ponownie jest już v2 i czyta się bez migracji
+        mgr_v2, state_v2 = EngineWrapper.load_state(EngineWrapper.dump_state(mgr, state))
+        self.assertEqual(state_v2, state)
+        self.assertEqual(mgr_v2.get_fen(), mgr.get_fen())
+
+    def test_v1_state_with_unreplayable_moves_uses_board_snapshot(self):
+        legacy = legacy_state()
+        legacy["moves"] = ["e4", "e4"]   # zapis nie zgadza się z planszą
+        mgr, state = EngineWrapper.load_state(codec.dumps(legacy))
+
+        self.assertEqual(state["v"], STATE_VERSION)
+        self.assertEqual(mgr.get_board_state(), legacy["board"])
+        self.assertEqual(mgr.get_game_turn(), legacy["turn"])
+        self.assertEqual(state["fen"].split()[:3], ["rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR", "w", "KQkq"])
+
+    def test_v1_finished_game_keeps_result(self):
+        legacy = legacy_state(game_over=True, winner="c", reason="timeout")
+        _, state = EngineWrapper.load_state(codec.dumps(legacy))
+        self.assertEqual((state["game_over"], state["winner"], state["reason"]), (True, "c", "timeout"))
+
+    def test_unreadable_state_starts_new_game(self):
+        for raw in ("", "not json", codec.dumps([1, 2])):
+            with self.subTest(raw=raw):
+                mgr, state = EngineWrapper.load_state(raw)
+                self.assertEqual((mgr.get_fen(), state["fen"], state["moves"]), (START_FEN, START_FEN, []))
@@ -0,0 +1,104 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from myapp import codec, glicko_service
+from myapp.consumers import GLICKO_TAU, ChessGameConsumer, process_game_result_sync
+from myapp.elo_service import update_ratings
+from myapp.engine_adapter import EngineWrapper
+from myapp.game_sessions import game_sessions
+from myapp.models import Game, GameHistory, PlayerProfile
+
+
+class GameResultTests(TestCase):
+    """Wynik partii liczony dokładnie raz, nawet gdy zapis przychodzi dwa razy (timeout vs poddanie)."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.white = User.objects.create_user("white", "white@example.com", "pass")
+        self.black = User.objects.create_user("black", "black@example.com", "pass")
+        PlayerProfile.objects.filter(user=self.white).update(elo=1300)
+        Game.objects.create(room_name="result", white_player=self.white, black_player=self.black,
+                            state=EngineWrapper.get_initial_state())
+
+    def profile(self, user):
+        return PlayerProfile.objects.get(user=user)
+
+    def assert_white_won_once(self):
+        self.assertEqual(GameHistory.objects.filter(game__room_name="result").count(), 1)
+        history = GameHistory.objects.get(game__room_name="result")
+        self.assertEqual((history.winner_id, history.reason), (self.white.id, "checkmate"))
+        self.assertEqual((history.white_elo, history.black_elo), (1300, 1200))
+
+        white, black = self.profile(self.white), self.profile(self.black)
+        self.assertEqual((white.wins, white.losses, white.draws), (1, 0, 0))
+        self.assertEqual((black.wins, black.losses, black.draws), (0, 1, 0))
+
+        new_white, new_black = update_ratings(1300, 1200)
+        self.assertEqual((white.elo, black.elo), (new_white, new_black))
+
+        default = (glicko_service.DEFAULT_RATING, glicko_service.DEFAULT_RD, glicko_service.DEFAULT_VOLATILITY)
+        glicko_white, glicko_black = glicko_service.rate_game(default, default, 1.0, tau=GLICKO_TAU)
+        for profile, expected in ((white, glicko_white), (black, glicko_black)):
+            actual = (profile.glicko_rating, profile.glicko_rd, profile.glicko_volatility)
+            for value, want in zip(actual, expected):
+                self.assertAlmostEqual(value, want, places=6)
+
+    def test_result_applied_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(process_game_result_sync("result", "b", "checkmate"))
+        self.assertFalse(process_game_result_sync("result", "b", "checkmate"))
+        self.assert_white_won_once()
+
+    def test_late_result_is_ignored(self):
+        # timeout czarnych przychodzący po zapisanym macie nie zmienia już niczego
+        self.assertTrue(process_game_result_sync("result", "b", "checkmate"))
+        self.assertFalse(process_game_result_sync("result", "c", "timeout"))
+        self.assert_white_won_once()
+
+
+class ResignTests(TestCase):
+    """Poddanie rozstrzyga kolor z Game, a nie kolejność id graczy."""
+
+    def setUp(self):
+        User = get_user_model()
+        # czarny zarejestrował się pierwszy, więc biały ma wyższe id (jak w quick match)
+        self.black = User.objects.create_user("black", "black@example.com", "pass")
+        self.white = User.objects.create_user("white", "white@example.com", "pass")
+        Game.objects.create(room_name="resign", white_player=self.white, black_player=self.black,
+                            state=EngineWrapper.get_initial_state())
+        game_sessions.discard("resign")
+        self.addCleanup(game_sessions.discard, "resign")
+
+    def resign(self, user):
+        consumer = ChessGameConsumer()
+        consumer.room_name = "resign"
+        async_to_sync(consumer._handle_resign)(user)
+
+    def assert_winner(self, winner, loser):
+        state = codec.loads(Game.objects.get(room_name="resign").state)
+        self.assertEqual((state["game_over"], state["reason"]), (True, "resignation"))
+        self.assertEqual(state["winner"], 'b' if winner == self.white else 'c')
+        self.assertEqual(GameHistory.objects.get(game__room_name="resign").winner_id, winner.id)
+        self.assertEqual(self.profile_counts(winner), (1, 0))
+        self.assertEqual(self.profile_counts(loser), (0, 1))
+        self.assertGreater(PlayerProfile.objects.get(user=winner).elo, 1200)
+
+    def profile_counts(self, user):
+        profile = PlayerProfile.objects.get(user=user)
+        return profile.wins, profile.losses
+
+    def test_white_with_higher_id_resigns(self):
+        self.assertGreater(self.white.id, self.black.id)
+        self.resign(self.white)
+        self.assert_winner(self.black, self.white)
+
+    def test_black_with_lower_id_resigns(self):
+        self.resign(self.black)
+        self.assert_winner(self.white, self.black)
+
+    def test_spectator_cannot_resign(self):
+        spectator = get_user_model().objects.create_user("spectator", "spectator@example.com", "pass")
+        self.resign(spectator)
+        self.assertFalse(codec.loads(Game.objects.get(room_name="resign").state)["game_over"])
+        self.assertFalse(GameHistory.objects.exists())
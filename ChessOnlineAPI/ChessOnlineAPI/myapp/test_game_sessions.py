@@ -0,0 +1,90 @@
+import random
+
+from django.test import TestCase
+
+from myapp import codec
+from myapp.engine_adapter import EngineWrapper
+from myapp.game_sessions import CHECKPOINT_INTERVAL, GameSession
+from myapp.models import Game, GameMove
+from myapp.wire import PROMOTIONS, pack_move, unpack_move
+
+# biały pion na e7, e8 wolne - następny ruch to promocja
+PROMOTION_FEN = "k7/4P3/8/8/8/8/8/4K3 w - - 0 1"
+
+
+def move_data(move, promo=""):
+    return {"from": {"r": move.start_x, "c": move.start_y}, "to": {"r": move.dest_x, "c": move.dest_y}, "promo": promo}
+
+
+class GameSessionJournalTests(TestCase):
+    """Odtwarzanie sesji z checkpointu (Game.state) i dziennika ruchów (GameMove)."""
+
+    def play(self, session, plies, seed=1):
+        rnd = random.Random(seed)
+        for ply in range(plies):
+            moves = sorted(session.manager.get_possible_moves(), key=lambda m: (m.start_x, m.start_y, m.dest_x, m.dest_y))
+            move, error = session.apply_move(move_data(rnd.choice(moves)))
+            self.assertIsNone(error)
+            # osobne wartości zegarów na każdy ruch, żeby było widać, z którego wiersza pochodzą
+            session.state["white_time"] = 600.0 - ply
+            session.state["black_time"] = 500.0 - ply
+            session.state["last_move_timestamp"] = 1000.0 + ply
+            self.assertTrue(session.save_move(move))
+
+    def test_reload_around_checkpoint_interval(self):
+        for plies in (CHECKPOINT_INTERVAL - 1, CHECKPOINT_INTERVAL, CHECKPOINT_INTERVAL + 1, 2 * CHECKPOINT_INTERVAL + 3):
+            with self.subTest(plies=plies):
+                room = f"journal-{plies}"
+                session = GameSession.load(room)
+                self.play(session, plies)
+
+                reloaded = GameSession.load(room)
+                self.assertEqual(reloaded.state["moves"], session.state["moves"])
+                self.assertEqual(reloaded.manager.get_fen(), session.manager.get_fen())
+                for key in ("white_time", "black_time", "last_move_timestamp"):
+                    self.assertEqual(reloaded.state[key], session.state[key])
+
+                # checkpoint co CHECKPOINT_INTERVAL półruchów, reszta tylko w dzienniku
+                checkpoint = plies // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL
+                stored = codec.loads(Game.objects.get(room_name=room).state)
+                self.assertEqual(len(stored["moves"]), checkpoint)
+                self.assertEqual(reloaded.checkpoint_ply, checkpoint)
+                self.assertEqual(GameMove.objects.filter(game__room_name=room).count(), plies)
+
+    def test_duplicate_ply_is_rejected(self):
+        first = GameSession.load("duplicate")
+        second = GameSession.load("duplicate")
+        moves = first.manager.get_possible_moves()
+
+        move, _ = first.apply_move(move_data(moves[0]))
+        self.assertTrue(first.save_move(move))
+
+        # druga sesja tej samej gry zapisuje inny ruch jako ten sam ply -> IntegrityError w save_move
+        move, _ = second.apply_move(move_data(moves[1]))
+        self.assertFalse(second.save_move(move))
+        self.assertEqual(list(GameMove.objects.filter(game__room_name="duplicate").values_list("ply", flat=True)), [1])
+        self.assertEqual(GameSession.load("duplicate").state["moves"], first.state["moves"])
+
+    def test_pack_move_round_trip(self):
+        fr, to = {"r": 1, "c": 4}, {"r": 0, "c": 5}
+        for promo in PROMOTIONS:
+            with self.subTest(promo=promo):
+                self.assertEqual(unpack_move(pack_move(fr, to, promo)), {"from": fr, "to": to, "promo": promo})
+
+    def test_promotion_survives_reload(self):
+        for letter in ("H", "W", "S", "G"):
+            with self.subTest(letter=letter):
+                room = f"promotion-{letter}"
+                state = EngineWrapper._empty_state()
+                state["fen"] = PROMOTION_FEN
+                Game.objects.create(room_name=room, state=codec.dumps(state))
+
+                session = GameSession.load(room)
+                promotion = next(m for m in session.manager.get_possible_moves() if m.user_notation == "e8")
+                move, _ = session.apply_move(move_data(promotion, letter))
+                self.assertEqual(session.state["moves"], ["e8" + letter])
+                self.assertTrue(session.save_move(move))
+
+                reloaded = GameSession.load(room)
+                self.assertEqual(reloaded.state["moves"], ["e8" + letter])
+                self.assertEqual(reloaded.manager.get_fen(), session.manager.get_fen())
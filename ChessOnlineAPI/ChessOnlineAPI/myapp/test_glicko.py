@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from myapp import glicko_service
+from myapp.glicko_service import np
+
+# Glickman, "Example of the Glicko-2 system": gracz 1500 / 200 / 0.06 przeciw trzem rywalom, tau 0.5
+EXAMPLE_PLAYER = (1500.0, 200.0, 0.06)
+EXAMPLE_RESULTS = [(1400.0, 30.0, 1.0), (1550.0, 100.0, 0.0), (1700.0, 300.0, 0.0)]
+
+
+class GlickmanExampleTests(unittest.TestCase):
+
+    def test_rate_matches_worked_example(self):
+        # przykład liczy na zaokrąglonych wartościach pośrednich, stąd tolerancja na ostatniej cyfrze
+        rating, rd, volatility = glicko_service.rate(*EXAMPLE_PLAYER, EXAMPLE_RESULTS, tau=0.5)
+        self.assertAlmostEqual(rating, 1464.06, delta=0.01)
+        self.assertAlmostEqual(rd, 151.52, delta=0.01)
+        self.assertAlmostEqual(volatility, 0.05999, delta=1e-5)
+
+    def test_inactive_period_only_grows_rd(self):
+        rating, rd, volatility = glicko_service.rate(*EXAMPLE_PLAYER, [])
+        self.assertEqual((rating, volatility), (1500.0, 0.06))
+        self.assertAlmostEqual(rd, 200.2714, places=4)
+
+    @unittest.skipUnless(glicko_service.available(), "NumPy is not installed")
+    def test_vectorized_volatility_matches_worked_example(self):
+        # wartości pośrednie z przykładu: phi = 1.1513, v = 1.7785, delta = -0.4834 -> sigma' = 0.05999
+        sigma = glicko_service._volatility_vec(np.array([1.1513]), np.array([0.06]), np.array([1.7785]),
+                                               np.array([-0.4834]), 0.5)
+        self.assertAlmostEqual(sigma[0], 0.05999, delta=1e-5)
+        self.assertAlmostEqual(sigma[0], glicko_service._volatility(1.1513, 0.06, 1.7785, -0.4834, 0.5), places=9)
+
+
+@unittest.skipUnless(glicko_service.available(), "NumPy is not installed")
+class RecomputeTests(unittest.TestCase):
+    """recompute (NumPy) daje to samo co rate (czysty Python) wołane okres po okresie."""
+
+    def history(self, players, games, periods, seed=1):
+        rnd = random.Random(seed)
+        rows = []
+        for _ in range(games):
+            white, black = rnd.sample(range(players), 2)
+            rows.append((rnd.randrange(periods), white, black, rnd.choice((1.0, 0.5, 0.0))))
+        rows.sort()
+        period, white, black, score = (np.array(column) for column in zip(*rows))
+        return white, black, score, period
+
+    def scalar(self, white, black, score, period, rd, tau=glicko_service.DEFAULT_TAU):
+        n = int(max(white.max(), black.max())) + 1
+        ratings = [(glicko_service.DEFAULT_RATING, rd, glicko_service.DEFAULT_VOLATILITY)] * n
+        for p in range(int(period[0]), int(period[-1]) + 1):
+            results = [[] for _ in range(n)]
+            for w, b, s in zip(white[period == p], black[period == p], score[period == p]):
+                results[w].append((ratings[b][0], ratings[b][1], s))
+                results[b].append((ratings[w][0], ratings[w][1], 1 - s))
+            # okres bez partii też jest okresem: wszyscy dostają krok wzrostu RD
+            ratings = [glicko_service.rate(*ratings[i], results[i], tau=tau) for i in range(n)]
+        return ratings
+
+    def assert_matches_scalar(self, white, black, score, period, rd):
+        rating, new_rd, volatility, _ = glicko_service.recompute(white, black, score, period, rd=rd)
+        expected = self.scalar(white, black, score, period, rd)
+        for i, (want_rating, want_rd, want_volatility) in enumerate(expected):
+            with self.subTest(player=i):
+                self.assertAlmostEqual(rating[i], want_rating, places=6)
+                self.assertAlmostEqual(new_rd[i], want_rd, places=6)
+                self.assertAlmostEqual(volatility[i], want_volatility, places=9)
+
+    def test_matches_scalar_rate(self):
+        for rd in (glicko_service.DEFAULT_RD, 120.0):
+            with self.subTest(rd=rd):
+                self.assert_matches_scalar(*self.history(players=12, games=150, periods=20), rd=rd)
+
+    def test_matches_scalar_rate_across_empty_periods(self):
+        # partie tylko w okresach 0, 1 i 9: przerwa 2..8 musi podnieść RD o 7 kroków, nie o jeden
+        white, black, score, period = self.history(players=6, games=40, periods=2)
+        period = np.where(np.arange(len(period)) < 30, period, 9)
+        self.assert_matches_scalar(white, black, score, period, rd=120.0)
+
+    def test_rd_growth_across_long_gap_is_capped(self):
+        # 2000 okresów przerwy bez limitu dałoby RD ~470
+        self.assert_matches_scalar(np.array([0, 0]), np.array([1, 1]), np.array([1.0, 0.0]), np.array([0, 2000]),
+                                   rd=50.0)
@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from myapp import codec
+from myapp.lobby_index import LOBBY_GROUP, LobbyIndex
+
+
+def room(name, players=0, status="waiting"):
+    return {"name": name, "players": [], "players_count": players, "has_password": False, "status": status}
+
+
+class LobbyClient:
+    """To samo co RoomsPage.jsx: snapshot, potem diffy z kolejnymi wersjami (luka = nowy snapshot)."""
+
+    def __init__(self, snapshot):
+        self.version = snapshot["version"]
+        self.rooms = {r["name"]: r for r in snapshot["rooms"]}
+
+    def apply(self, diff):
+        if diff["version"] <= self.version:
+            return
+        assert diff["version"] == self.version + 1, "gap in lobby versions"
+        self.version = diff["version"]
+        for name in diff["remove"]:
+            self.rooms.pop(name, None)
+        for summary in diff["upsert"]:
+            self.rooms[summary["name"]] = {**self.rooms.get(summary["name"], {}), **summary}
+
+
+class LobbyIndexTests(unittest.IsolatedAsyncioTestCase):
+    """Zmiany z jednego okna idą jedną wiadomością; snapshot + diffy = stan indeksu."""
+
+    async def asyncSetUp(self):
+        self.sent = []
+        layer = mock.Mock()
+        layer.group_send = mock.AsyncMock(side_effect=lambda group, event: self.sent.append((group, event)))
+        patcher = mock.patch("myapp.lobby_index.get_channel_layer", return_value=layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = LobbyIndex(interval=0.01)
+
+    async def flush(self):
+        if self.index._flush_task is not None:
+            await self.index._flush_task
+
+    def diffs(self):
+        for group, event in self.sent:
+            self.assertEqual((group, event["type"]), (LOBBY_GROUP, "lobby.room_diff"))
+        return [codec.loads(event["text"]) for _, event in self.sent]
+
+    def state(self):
+        return {r["name"]: r for r in self.index.snapshot()["rooms"]}
+
+    async def test_changes_in_one_window_are_one_diff(self):
+        self.index.upsert(room("kept"))
+        await self.flush()
+        client = LobbyClient(self.index.snapshot())
+
+        # utworzenie, aktualizacja i usunięcie w jednym oknie
+        self.index.upsert(room("a"))
+        self.index.upsert(room("a", players=1))
+        self.index.upsert(room("b"))
+        self.index.remove("b")
+        self.index.upsert(room("kept", players=2, status="playing"))
+        self.index.remove("missing")
+        await self.flush()
+
+        diffs = self.diffs()
+        self.assertEqual([d["version"] for d in diffs], [1, 2])
+        last = diffs[-1]
+        self.assertEqual(last["upsert"], [room("a", players=1), room("kept", players=2, status="playing")])
+        self.assertEqual(sorted(last["remove"]), ["b", "missing"])
+
+        client.apply(last)
+        self.assertEqual((client.version, client.rooms), (self.index.version, self.state()))
+
+    async def test_snapshot_plus_diffs_reaches_index_state(self):
+        clients = []
+        steps = [
+            [("upsert", room("a")), ("upsert", room("b"))],
+            [("upsert", room("c")), ("remove", "a"), ("upsert", room("b", players=1))],
+            [("remove", "c"), ("upsert", room("c", players=1)), ("upsert", room("d"))],
+            [("remove", "d"), ("upsert", room("b", players=2, status="playing"))],
+        ]
+        for ops in steps:
+            # klient podłączony w trakcie okna: snapshot zawiera już część zmian z następnego diffu
+            for i, (op, arg) in enumerate(ops):
+                getattr(self.index, op)(arg)
+                if i == 0:
+                    clients.append(LobbyClient(self.index.snapshot()))
+            await self.flush()
+
+        diffs = self.diffs()
+        self.assertEqual([d["version"] for d in diffs], list(range(1, len(steps) + 1)))
+        for client in clients:
+            for diff in diffs:
+                client.apply(diff)
+            self.assertEqual((client.version, client.rooms), (self.index.version, self.state()))
+        self.assertEqual(sorted(self.state()), ["b", "c"])
+
+    async def test_quiet_window_publishes_nothing(self):
+        self.index.upsert(room("a"))
+        await self.flush()
+        await asyncio.sleep(0.03)
+        self.assertEqual(len(self.diffs()), 1)
+        self.assertEqual(self.index.stats()["pending"], 0)
+
+        self.index.remove("a")
+        await self.flush()
+        self.assertEqual([d["version"] for d in self.diffs()], [1, 2])
+        self.assertEqual(self.index.snapshot(), {"type": "room_list", "version": 2, "rooms": []})
@@ -0,0 +1,32 @@
+import logging
+import os
+import time
+import unittest
+
+from myapp.engine_executor import EngineExecutor
+
+
+def log_in_worker(message):
+    # wykonywane w procesie roboczym silnika
+    chess = logging.getLogger("chess")
+    chess.warning(message)
+    return os.getpid(), [getattr(handler, "listener", None) is not None for handler in chess.handlers]
+
+
+class ProcessWorkerLoggingTests(unittest.TestCase):
+    """Przy ENGINE_EXECUTOR="process" plik logu pisze tylko proces główny."""
+
+    def test_worker_records_reach_main_process(self):
+        executor = EngineExecutor(kind="process", workers=1)
+        self.addCleanup(executor.shutdown)
+        with self.assertLogs("chess", "WARNING") as logs:
+            pid, file_listeners = executor._pool_for("room").submit(log_in_worker, "from worker").result(timeout=60)
+            deadline = time.monotonic() + 10
+            while not logs.records and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+        self.assertNotEqual(pid, os.getpid())
+        # handler workera nie ma własnego wątku z plikiem
+        self.assertEqual(file_listeners, [False])
+        self.assertEqual([r.getMessage() for r in logs.records], ["from worker"])
+        self.assertEqual(logs.records[0].process, pid)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import unittest
+
+from myapp.matchmaking import MatchmakingQueue
+
+
+class MatchmakingStatsTests(unittest.TestCase):
+    """stats() jest wołane z wątków (widok DRF, /metrics/) i czyta tylko migawkę z pętli."""
+
+    def setUp(self):
+        self.matches = []
+
+        async def on_match(white, black):
+            self.matches.append((white.user_id, black.user_id))
+
+        self.queue = MatchmakingQueue(on_match, tick=0.01)
+
+    def test_snapshot_follows_queue(self):
+        async def scenario():
+            self.queue.enqueue(1, 1200, "a")
+            self.queue.enqueue(2, 2000, "b")
+            waiting = self.queue.stats()
+            self.queue.cancel(2)
+            self.queue.enqueue(3, 1250, "c")
+            await asyncio.sleep(0)
+            return waiting, self.queue.stats()
+
+        waiting, paired = asyncio.run(scenario())
+        self.assertEqual(waiting["queue_length"], 2)
+        self.assertEqual(waiting["buckets"], {1200: 1, 2000: 1})
+        self.assertEqual((paired["queue_length"], paired["buckets"]), (0, {}))
+        self.assertEqual((paired["pairings"], paired["cancelled"]), (1, 1))
+        self.assertEqual(paired["pairings_per_second"], 1 / 60)
+        self.assertGreaterEqual(paired["time_to_match_p99"], paired["time_to_match_p50"])
+        self.assertEqual(self.matches, [(1, 3)])
+
+    def test_stats_does_not_touch_loop_state(self):
+        async def scenario():
+            self.queue.enqueue(1, 1200, "a")
+            self.queue.enqueue(2, 1200, "b")
+            await asyncio.sleep(0)
+
+        asyncio.run(scenario())
+        self.queue._pair_times[0] -= 120
+        before = list(self.queue._pair_times)
+        self.assertEqual(self.queue.stats()["pairings_per_second"], 1 / 60)
+        self.assertEqual(list(self.queue._pair_times), before)
+
+    def test_stats_from_another_thread(self):
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                try:
+                    self.queue.stats()
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        async def scenario():
+            for i in range(3000):
+                self.queue.enqueue(i, 800 + (i * 37) % 1600, str(i))
+                if i % 3 == 0:
+                    self.queue.cancel(i)
+                if i % 100 == 0:
+                    await asyncio.sleep(0)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        try:
+            asyncio.run(scenario())
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(errors, [])
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from myapp import metrics
+from myapp.consumers import ChessGameConsumer
+
+
+class MetricsViewTests(TestCase):
+    """/metrics/ zamknięte, chyba że jest token albo DEBUG."""
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_denied_without_token_in_production(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=True)
+    def test_open_in_debug(self):
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE chess_moves counter", response.content)
+
+    @override_settings(METRICS_TOKEN="secret", DEBUG=True)
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+
+class MoveCounterTests(TestCase):
+    """chess_moves liczy tylko wykonane ruchy - nie koniec na czas przy próbie ruchu."""
+
+    def setUp(self):
+        self.consumer = ChessGameConsumer()
+        self.consumer.room_name = "metrics"
+        self.consumer.scope = {"user": get_user_model().objects.create_user("player", "p@example.com", "pass")}
+        self.consumer.send_json = mock.AsyncMock()
+        for patcher in (mock.patch("myapp.consumers.broadcast_game_event", new_callable=mock.AsyncMock),
+                        mock.patch("myapp.consumers.clock_scheduler")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def counts(self):
+        return metrics.MOVES._child(())[0], metrics.ILLEGAL_MOVES._child(())[0]
+
+    def move_with_result(self, result):
+        before = self.counts()
+        with mock.patch("myapp.consumers.engine_executor.run", new=mock.AsyncMock(return_value=result)):
+            async_to_sync(self.consumer._handle_message)({"type": "move", "move": {"from": {}, "to": {}}}, "move")
+        after = self.counts()
+        return after[0] - before[0], after[1] - before[1]
+
+    def test_applied_move_is_counted(self):
+        self.assertEqual(self.move_with_result((True, {"type": "move", "seq": 1}, None, None)), (1, 0))
+
+    def test_timeout_without_move_is_not_counted(self):
+        result = (True, {"type": "game_over", "reason": "timeout", "seq": 1}, None, None)
+        self.assertEqual(self.move_with_result(result), (0, 0))
+
+    def test_rejected_move_is_counted_as_illegal(self):
+        self.assertEqual(self.move_with_result((False, "illegal move", None, None)), (0, 1))
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from myapp.middleware import UserCache, get_cached_user, user_cache
+from myapp.models import PlayerProfile
+
+
+class UserCacheTests(SimpleTestCase):
+    """LRU + TTL bez bazy; czas podstawiony."""
+
+    def setUp(self):
+        patcher = mock.patch("myapp.middleware.time")
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock.monotonic.return_value = 1000.0
+
+    def test_entry_expires_after_ttl(self):
+        cache = UserCache(ttl=60)
+        cache.put(1, "alice")
+        self.clock.monotonic.return_value = 1059.9
+        self.assertEqual(cache.get(1), "alice")
+        self.clock.monotonic.return_value = 1060.0
+        self.assertIsNone(cache.get(1))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_put_refreshes_ttl(self):
+        cache = UserCache(ttl=60)
+        cache.put(1, "alice")
+        self.clock.monotonic.return_value = 1050.0
+        cache.put(1, "alice")
+        self.clock.monotonic.return_value = 1100.0
+        self.assertEqual(cache.get(1), "alice")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = UserCache(max_size=2)
+        cache.put(1, "alice")
+        cache.put(2, "bob")
+        self.assertEqual(cache.get(1), "alice")   # 2 jest teraz najdawniej używany
+        cache.put(3, "carol")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual((cache.get(1), cache.get(3)), ("alice", "carol"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_invalidate(self):
+        cache = UserCache()
+        cache.put(1, "alice")
+        cache.invalidate(1)
+        cache.invalidate(2)   # brak wpisu - nie liczy się
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+
+class UserCacheSignalTests(TestCase):
+    """Zapis / usunięcie użytkownika albo profilu w tym procesie usuwa wpis z user_cache."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("alice", "alice@example.com", "pass")
+        self.addCleanup(user_cache.invalidate, self.user.pk)
+        self.cached_user()
+
+    def cached_user(self):
+        return async_to_sync(get_cached_user)(self.user.pk)
+
+    def assert_cached(self, cached):
+        self.assertEqual(user_cache.get(self.user.pk) is not None, cached)
+
+    def test_second_lookup_needs_no_query(self):
+        with self.assertNumQueries(0):
+            user = self.cached_user()
+        self.assertEqual(user.pk, self.user.pk)
+        # profil przyszedł z select_related
+        with self.assertNumQueries(0):
+            self.assertEqual(user.profile.elo, 1200)
+
+    def test_user_save_invalidates(self):
+        self.assert_cached(True)
+        self.user.first_name = "Alice"
+        self.user.save()
+        self.assert_cached(False)
+        self.assertEqual(self.cached_user().first_name, "Alice")
+
+    def test_profile_save_invalidates(self):
+        profile = PlayerProfile.objects.get(user=self.user)
+        profile.elo = 1500
+        profile.save()
+        self.assert_cached(False)
+        self.assertEqual(self.cached_user().profile.elo, 1500)
+
+    def test_user_delete_invalidates(self):
+        pk = self.user.pk
+        self.user.delete()
+        self.assert_cached(False)
+        self.assertFalse(async_to_sync(get_cached_user)(pk).is_authenticated)
@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from myapp import codec
+from myapp.consumers import apply_move_sync, finish_game_sync
+from myapp.engine_adapter import EngineWrapper
+from myapp.game_sessions import GameSession, game_sessions
+from myapp.models import Game, GameMove
+from myapp.move_journal import MoveJournal, _from_settings, _try_lock
+
+
+def move_data(move):
+    return {"from": {"r": move.start_x, "c": move.start_y}, "to": {"r": move.dest_x, "c": move.dest_y}, "promo": ""}
+
+
+class JournalTestCase(TestCase):
+    """Dziennik w katalogu tymczasowym; wątek zapisu śpi (duży interval), flush wołają testy."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.journal = self.new_journal()
+        patcher = mock.patch("myapp.game_sessions.move_journal", self.journal)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_journal(self):
+        journal = MoveJournal(os.path.join(self.dir, "move_journal.log"), interval=3600, max_batch=10 ** 6)
+        self.addCleanup(journal.close)
+        return journal
+
+    def play(self, session, plies):
+        for _ in range(plies):
+            move, error = session.apply_move(move_data(session.manager.get_possible_moves()[0]))
+            self.assertIsNone(error)
+            self.assertTrue(session.save_move(move))
+
+
+class WriteBehindConflictTests(JournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        game_sessions.discard("wb")
+        self.addCleanup(game_sessions.discard, "wb")
+
+    def test_journal_move_needs_no_query(self):
+        session = game_sessions.get("wb")
+        move, _ = session.apply_move(move_data(session.manager.get_possible_moves()[0]))
+        with self.assertNumQueries(0):
+            self.assertTrue(session.save_move(move))
+        self.assertEqual(self.journal.stats()["pending"], 1)
+
+    def test_move_after_resign_in_same_process_is_refused(self):
+        session = game_sessions.get("wb")
+        self.play(session, 3)
+        self.assertIsNotNone(finish_game_sync("wb", "c", "resignation"))
+        ok, error, _, _ = apply_move_sync("wb", move_data(session.manager.get_possible_moves()[0]))
+        self.assertFalse(ok)
+        self.assertEqual(error, "Game is already over")
+
+    def test_discarded_session_cannot_save(self):
+        session = game_sessions.get("wb")
+        move, _ = session.apply_move(move_data(session.manager.get_possible_moves()[0]))
+        game_sessions.discard("wb")
+        self.assertFalse(session.save_move(move))
+        self.assertEqual(self.journal.stats()["pending"], 0)
+
+    def test_flush_rejects_moves_of_changed_game(self):
+        session = game_sessions.get("wb")
+        self.play(session, 2)
+        self.journal.flush()
+
+        # zmiana spoza tej sesji (np. inny proces): nowa wersja partii w bazie
+        other = GameSession.load("wb")
+        other.state["game_over"] = True
+        self.assertTrue(other.save())
+
+        self.play(session, 1)
+        self.journal.flush()
+        self.assertEqual(self.journal.stats()["rejected"], 1)
+        self.assertEqual(list(GameMove.objects.filter(game__room_name="wb").values_list("ply", flat=True)), [1, 2])
+        self.assertTrue(GameSession.load("wb").state["game_over"])
+
+
+class MoveJournalRecoveryTests(JournalTestCase):
+    """Ruchy potwierdzone z pliku nie mogą zginąć: odtworzenie po awarii, przejęcie plików martwych procesów."""
+
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(room_name="journal", state=EngineWrapper.get_initial_state())
+
+    def entry(self, ply):
+        return {"game_id": self.game.id, "ply": ply, "move": 3380 + ply, "white_time": 600.0 - ply,
+                "black_time": 600.0, "played_at": 1000.0 + ply}
+
+    def write_file(self, pid, entries, tail=""):
+        path = os.path.join(self.dir, f"move_journal.{pid}.log")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("".join(codec.dumps(e) + "\n" for e in entries) + tail)
+        return path
+
+    def stored_plies(self):
+        return list(GameMove.objects.filter(game=self.game).values_list("ply", flat=True))
+
+    def test_replay_own_file_after_crash(self):
+        # plik tego pid po awarii: dwa pełne wpisy i urwana (niepotwierdzona) trzecia linia
+        path = self.write_file(os.getpid(), [self.entry(1), self.entry(2)], tail='{"game_id": ')
+        self.journal.start()
+        self.assertEqual(self.stored_plies(), [1, 2])
+        row = GameMove.objects.get(game=self.game, ply=2)
+        self.assertEqual((row.move, row.white_time, row.played_at), (3382, 598.0, 1002.0))
+        # plik wyczyszczony po zapisie, nowe wpisy nie doklejają się do urwanej linii
+        self.assertEqual(os.path.getsize(path), 0)
+        self.journal.append(GameMove(**self.entry(3)))
+        self.journal.flush()
+        self.assertEqual(self.stored_plies(), [1, 2, 3])
+
+    def test_replay_is_idempotent(self):
+        GameMove.objects.create(**self.entry(1))
+        self.write_file(os.getpid(), [self.entry(1), self.entry(2)])
+        self.journal.start()
+        self.assertEqual(self.stored_plies(), [1, 2])
+
+    def test_adopts_orphaned_file_of_dead_process(self):
+        orphan = self.write_file(999999, [self.entry(1), self.entry(2)])
+        self.journal.start()
+        self.assertEqual(self.stored_plies(), [1, 2])
+        self.assertFalse(os.path.exists(orphan))
+
+    def test_skips_file_of_live_process(self):
+        live = self.write_file(999998, [self.entry(1)])
+        with open(live, "a+", encoding="utf-8") as held:
+            self.assertTrue(_try_lock(held))
+            self.journal.start()
+            self.assertEqual(self.stored_plies(), [])
+            self.assertTrue(os.path.exists(live))
+
+    def test_flush_truncates_only_when_everything_is_stored(self):
+        for ply in (1, 2, 3):
+            self.journal.append(GameMove(**self.entry(ply)))
+        with open(self.journal.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+
+        with mock.patch.object(MoveJournal, "_write", side_effect=RuntimeError("db down")):
+            self.journal.flush()
+        # nieudany zapis: wpisy wracają do kolejki, plik zostaje
+        self.assertEqual(self.journal.stats()["pending"], 3)
+        self.assertGreater(os.path.getsize(self.journal.path), 0)
+
+        self.journal.flush()
+        self.assertEqual(self.stored_plies(), [1, 2, 3])
+        self.assertEqual(os.path.getsize(self.journal.path), 0)
+
+        self.journal.append(GameMove(**self.entry(4)))
+        with open(self.journal.path, encoding="utf-8") as f:
+            self.assertEqual([codec.loads(line)["ply"] for line in f.read().splitlines()], [4])
+
+    def test_close_removes_empty_file(self):
+        self.journal.append(GameMove(**self.entry(1)))
+        path = self.journal.path
+        self.journal.close()
+        self.assertEqual(self.stored_plies(), [1])
+        self.assertFalse(os.path.exists(path))
+
+
+class SessionLoadWithJournalTests(JournalTestCase):
+
+    @mock.patch("myapp.game_sessions.CHECKPOINT_INTERVAL", 4)
+    def test_load_merges_checkpoint_journal_rows_and_pending_tail(self):
+        session = GameSession.load("merge")
+        self.play(session, 6)           # ply 4: checkpoint w Game.state, 1-3 i 5-6 w dzienniku
+        self.journal.flush()            # 5-6 w GameMove
+        self.play(session, 1)           # 7 tylko w pliku
+        self.assertEqual(self.journal.stats()["pending"], 1)
+
+        stored = codec.loads(Game.objects.get(room_name="merge").state)
+        self.assertEqual(len(stored["moves"]), 4)
+
+        reloaded = GameSession.load("merge")
+        self.assertEqual(reloaded.state["moves"], session.state["moves"])
+        self.assertEqual(len(reloaded.state["moves"]), 7)
+        self.assertEqual(reloaded.checkpoint_ply, 4)
+        self.assertEqual(reloaded.manager.get_fen(), session.manager.get_fen())
+        self.assertEqual(reloaded.state["white_time"], session.state["white_time"])
+
+
+class JournalSettingsTests(TestCase):
+
+    @override_settings(GAME_WRITE_BEHIND=True, ENGINE_EXECUTOR="process")
+    def test_refuses_process_executor(self):
+        with self.assertRaises(ImproperlyConfigured):
+            _from_settings()
+
+    @override_settings(GAME_WRITE_BEHIND=True, ENGINE_EXECUTOR="thread", GAME_WRITE_BEHIND_PATH="/tmp/mj.log")
+    def test_thread_executor_gets_journal(self):
+        journal = _from_settings()
+        self.assertIsInstance(journal, MoveJournal)
+        self.assertIsNone(journal.path)   # plik powstaje dopiero przy pierwszym użyciu
+
+    @override_settings(GAME_WRITE_BEHIND=False, ENGINE_EXECUTOR="process")
+    def test_disabled(self):
+        self.assertIsNone(_from_settings())
@@ -0,0 +1,76 @@
+import unittest
+
+from myapp.replay_buffer import ReplayBuffer
+
+
+def move(seq):
+    return {"type": "broadcast_move", "seq": seq}
+
+
+def game_over(seq):
+    return {"type": "broadcast_game_over", "seq": seq}
+
+
+class ReplayBufferTests(unittest.TestCase):
+    """Wznowienie po reconnect: brakujące zdarzenia albo None (snapshot), nigdy dziura ani cudza partia."""
+
+    def setUp(self):
+        self.buffer = ReplayBuffer(size=4)
+
+    def record(self, *events, room="room"):
+        for event in events:
+            self.buffer.record(room, event["seq"], event)
+
+    def test_returns_missed_events(self):
+        self.record(*map(move, range(1, 6)))
+        self.assertEqual(self.buffer.since("room", 3), [move(4), move(5)])
+
+    def test_seq_older_than_ring_falls_back_to_snapshot(self):
+        self.record(*map(move, range(1, 11)))   # w buforze zostają 7..10
+        self.assertIsNone(self.buffer.since("room", 5))
+        self.assertEqual(self.buffer.since("room", 6), [move(7), move(8), move(9), move(10)])
+        self.assertEqual(self.buffer.stats()["fallbacks"], 1)
+
+    def test_seq_equal_to_head_returns_nothing(self):
+        self.record(move(1), move(2))
+        self.assertEqual(self.buffer.since("room", 2), [])
+        self.assertEqual(self.buffer.stats()["resumed"], 1)
+
+    def test_final_game_over_is_always_resent(self):
+        self.record(move(1), move(2), game_over(2))
+        self.assertEqual(self.buffer.since("room", 2), [game_over(2)])
+        self.assertEqual(self.buffer.since("room", 1), [move(2), game_over(2)])
+
+    def test_seq_ahead_of_head_falls_back_to_snapshot(self):
+        self.record(move(1), move(2))
+        self.assertIsNone(self.buffer.since("room", 3))
+
+    def test_unknown_room_falls_back_to_snapshot(self):
+        self.assertIsNone(self.buffer.since("room", 0))
+
+    def test_new_game_in_same_room_resets_buffer(self):
+        self.record(move(1), move(2), move(3))
+        self.record(move(1))
+        self.assertEqual(self.buffer.since("room", 0), [move(1)])
+        # seq z poprzedniej partii jest teraz "przed głową" - snapshot, nie stare zdarzenia
+        self.assertIsNone(self.buffer.since("room", 3))
+
+    def test_new_game_after_game_over_with_same_seq_resets_buffer(self):
+        # poprzednia partia skończyła się po pierwszym ruchu; nowa też zaczyna od seq 1
+        self.record(move(1), game_over(1))
+        self.record(move(1))
+        self.assertEqual(self.buffer.since("room", 0), [move(1)])
+
+    def test_discard(self):
+        self.record(move(1))
+        self.buffer.discard("room")
+        self.assertIsNone(self.buffer.since("room", 0))
+
+    def test_least_recently_used_room_is_dropped(self):
+        buffer = ReplayBuffer(size=4, max_rooms=2)
+        for room in ("a", "b"):
+            buffer.record(room, 1, move(1))
+        buffer.record("a", 2, move(2))
+        buffer.record("c", 1, move(1))
+        self.assertIsNone(buffer.since("b", 0))
+        self.assertEqual(buffer.since("a", 0), [move(1), move(2)])
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from myapp import codec
+from myapp.tracing import Tracer, span
+
+
+class SlowTraceFileTests(unittest.TestCase):
+    """Wolne trace trafiają do pliku z wątku zapisu, finish() nie robi I/O."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, "traces.jsonl")
+
+    def finish_slow(self, tracer, room):
+        trace, token = tracer.start("move", room)
+        with span("make_move"):
+            pass
+        tracer.finish(trace, token)
+
+    def test_finish_does_not_open_file(self):
+        tracer = Tracer(slow_ms=0, path=self.path)
+        self.addCleanup(tracer.close)
+        caller = threading.current_thread()
+        real_open = open
+
+        def checked_open(*args, **kwargs):
+            self.assertIsNot(threading.current_thread(), caller)
+            return real_open(*args, **kwargs)
+
+        with mock.patch("builtins.open", checked_open):
+            for i in range(5):
+                self.finish_slow(tracer, f"room-{i}")
+            tracer.close()
+
+        with open(self.path, encoding="utf-8") as f:
+            traces = [codec.loads(line) for line in f]
+        self.assertEqual([t["room"] for t in traces], [f"room-{i}" for i in range(5)])
+        self.assertEqual(traces[0]["spans"][0]["name"], "make_move")
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        tracer = Tracer(slow_ms=0, path=self.path, queue_size=2)
+        self.addCleanup(tracer.close)
+        self.addCleanup(tracer._queue.queue.clear)
+        with mock.patch.object(Tracer, "_write_loop"):   # wątek zapisu nic nie odbiera
+            for i in range(5):
+                self.finish_slow(tracer, f"room-{i}")
+        self.assertEqual((tracer.slow, tracer.dropped), (5, 3))
+        self.assertEqual(tracer.dump()["dropped"], 3)
+        self.assertEqual(len(tracer.dump()["traces"]), 5)
+
+    def test_fast_traces_are_not_written(self):
+        tracer = Tracer(slow_ms=10 ** 6, path=self.path)
+        self.finish_slow(tracer, "fast")
+        tracer.close()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual((tracer.finished, tracer.slow), (1, 0))
@@ -1,9 +1,11 @@
 # test_ws_move.py
+# Ręczny test na działającym serwerze - nie jest uruchamiany przez `manage.py test`
 import asyncio
-import websockets
 import json
 
 async def run():
+    import websockets
+
     uri = "ws://127.0.0.1:8000/ws/game/testroom/"
     async with websockets.connect(uri) as ws:
         print("connected")
@@ -19,4 +21,5 @@ async def run():
         reply = await ws.recv()
         print("recv:", reply)
 
-asyncio.run(run())
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,201 @@
+# games/tracing.py
+"""
+Lekkie śledzenie pojedynczych ruchów (bez zewnętrznego kolektora).
+
+Konsument zaczyna trace przy receive, etapy (parsowanie, kolejka executora, odtworzenie sesji,
+generowanie ruchów, make_move, zapis, ELO, broadcast) dopisują spany przez `span(nazwa)`.
+Trace żyje w contextvar - przechodzi przez database_sync_to_async i wątki engine_executor;
+bez aktywnego trace span nic nie kosztuje poza odczytem contextvar.
+Wolne trace (>= TRACE_SLOW_MS) trafiają do bufora w pamięci (endpoint admina) i opcjonalnie do pliku.
+Plik pisze osobny wątek: finish() tylko wkłada trace do ograniczonej kolejki (put_nowait, jak
+QueueLogHandler), przy pełnej kolejce trace do pliku jest pomijany i liczony zamiast blokować pętlę.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+
+from . import codec
+
+logger = logging.getLogger("chess")
+
+_current = contextvars.ContextVar("chess_trace", default=None)
+
+
+class Trace:
+    __slots__ = ("trace_id", "name", "room", "started_at", "_t0", "spans", "duration_ms")
+
+    def __init__(self, name, room):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.room = room
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []   # (nazwa, start ms od początku trace, czas ms)
+        self.duration_ms = None
+
+    def add(self, name, started, seconds):
+        self.spans.append((name, round((started - self._t0) * 1000, 3), round(seconds * 1000, 3)))
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "room": self.room,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": [{"name": n, "start_ms": s, "duration_ms": d} for n, s, d in self.spans],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, self.started, time.perf_counter() - self.started)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager etapu w bieżącym trace (albo nic, gdy trace nie ma)."""
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+
+def record(name, seconds, ended_ago=0.0):
+    """Span zmierzony gdzie indziej (np. czekanie w kolejce executora), zakończony ended_ago sekund temu."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - ended_ago - seconds, seconds)
+
+
+def current_id():
+    trace = _current.get()
+    return trace.trace_id if trace is not None else None
+
+
+class Tracer:
+    def __init__(self, enabled=True, slow_ms=100, buffer_size=200, path="", queue_size=1000):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.path = path
+        self._slow = deque(maxlen=buffer_size)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.finished = 0
+        self.slow = 0
+        self.dropped = 0
+
+    def start(self, name, room):
+        """Nowy trace jako bieżący; zwraca (trace, token) dla finish()."""
+        if not self.enabled:
+            return None, None
+        trace = Trace(name, room)
+        return trace, _current.set(trace)
+
+    def finish(self, trace, token, keep=True):
+        if trace is None:
+            return
+        _current.reset(token)
+        if not keep:
+            return
+        trace.duration_ms = round((time.perf_counter() - trace._t0) * 1000, 3)
+        self.finished += 1
+        if trace.duration_ms < self.slow_ms:
+            return
+        self.slow += 1
+        self._slow.append(trace)
+        logger.info("Slow move trace: id=%s room=%s %.1f ms", trace.trace_id, trace.room, trace.duration_ms)
+        if self.path:
+            self._enqueue(trace)
+
+    def _enqueue(self, trace):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = "".join(codec.dumps(t.as_dict()) + "\n" for t in batch if t is not None)
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(lines)
+                except OSError:
+                    logger.exception("Trace file write failed: %s", self.path)
+            if stop:
+                return
+
+    def close(self):
+        """Dopisuje zaległe trace i zatrzymuje wątek zapisu (atexit, testy)."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            # przy zamykaniu czekać wolno (wątek zamykający, nie pętla)
+            try:
+                self._queue.put(None, timeout=5)
+            except queue.Full:
+                return
+            writer.join(timeout=5)
+
+    def dump(self, limit=None):
+        traces = list(self._slow)[::-1]
+        if limit:
+            traces = traces[:limit]
+        return {
+            "slow_ms": self.slow_ms,
+            "finished": self.finished,
+            "slow": self.slow,
+            "dropped": self.dropped,
+            "traces": [t.as_dict() for t in traces],
+        }
+
+
+tracer = Tracer(
+    enabled=getattr(settings, "TRACE_ENABLED", True),
+    slow_ms=getattr(settings, "TRACE_SLOW_MS", 100),
+    buffer_size=getattr(settings, "TRACE_BUFFER_SIZE", 200),
+    path=str(getattr(settings, "TRACE_FILE", "") or ""),
+)
@@ -4,7 +4,8 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from .views import GameHistoryDetailView, LeaderboardView, RoomListAPIView, RoomCreateAPIView, RoomJoinAPIView
+from .metrics import metrics_view
+from .views import GameHistoryDetailView, LeaderboardView, MatchmakingStatsView, RoomListAPIView, RoomCreateAPIView, RoomJoinAPIView, SlowTracesView
 
 
 urlpatterns = [
@@ -16,4 +17,7 @@ urlpatterns = [
     path('rooms/<str:name>/join/', RoomJoinAPIView.as_view(), name='rooms-join'),
     path('games/history/<int:id>/', GameHistoryDetailView.as_view(), name='game-history-detail'),
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('matchmaking/stats/', MatchmakingStatsView.as_view(), name='matchmaking-stats'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('traces/slow/', SlowTracesView.as_view(), name='slow-traces'),
 ]
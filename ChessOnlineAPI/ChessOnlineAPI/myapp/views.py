@@ -1,13 +1,17 @@
 from django.http import HttpResponse
 from rest_framework.generics import ListAPIView, GenericAPIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from rest_framework.generics import RetrieveAPIView
 from django.contrib.auth import get_user_model
 
+from .consumers import matchmaking_queue
+from .lobby_index import lobby_index, room_summary
 from .models import GameHistory, Room
+from .tracing import tracer
 from .serializers import (
     GameHistoryDetailSerializer,
     GameHistorySerializer,
@@ -50,6 +54,7 @@ class RoomCreateAPIView(GenericAPIView):
         room.set_password(password)
         room.save()
         room.players.add(request.user)
+        lobby_index.upsert_threadsafe(room_summary(room))
 
         return Response(RoomSerializer(room).data, status=status.HTTP_201_CREATED)
 
@@ -75,6 +80,7 @@ class RoomJoinAPIView(GenericAPIView):
             return Response({'detail': 'invalid password'}, status=status.HTTP_403_FORBIDDEN)
 
         room.players.add(request.user)
+        lobby_index.upsert_threadsafe(room_summary(room))
 
         return Response(RoomSerializer(room).data)
 
@@ -90,4 +96,24 @@ class LeaderboardView(ListAPIView):
     serializer_class = LeaderboardSerializer
 
     def get_queryset(self):
-        return User.objects.select_related('profile').order_by('-profile__elo')[:100] # Limit top 100
\ No newline at end of file
+        return User.objects.select_related('profile').order_by('-profile__elo')[:100] # Limit top 100
+
+
+class MatchmakingStatsView(APIView):
+    """Długość kolejki quick_match, czasy oczekiwania (percentyle) i pary na sekundę - do planowania pojemności."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(matchmaking_queue.stats())
+
+
+class SlowTracesView(APIView):
+    """Ostatnie wolne ruchy (powyżej TRACE_SLOW_MS) z podziałem na etapy; ?limit=N."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 0))
+        except ValueError:
+            limit = 0
+        return Response(tracer.dump(limit))
@@ -0,0 +1,123 @@
+# games/wire.py
+"""
+Binarny sub-protokół WebSocket gry ("chess.msgpack.v1"), negocjowany przy połączeniu.
+Domyślnie dalej JSON - ten format wybiera tylko klient, który poda sub-protokół.
+
+Ramka: MessagePack [tag, body]
+- tag: 1 bajt zamiast nazwy typu (MESSAGE_TYPES),
+- ruch: jedna liczba (pack_move), pola planszy: indeks 0-63 i kod figury (PIECES),
+- zegary i znaczniki czasu: całkowite milisekundy.
+Po zdekodowaniu wiadomość ma ten sam kształt co w JSON.
+"""
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SUBPROTOCOL = "chess.msgpack.v1"
+
+# Kolejność jest częścią protokołu - nowe typy tylko na końcu (tag = indeks + 1)
+MESSAGE_TYPES = (
+    "connected", "sync", "move", "game_over", "error", "chat", "player_joined",
+    "draw_offer", "draw_rejected", "sync_request", "resign", "offer_draw", "respond_draw",
+    "resumed", "legal_moves",
+)
+_TAGS = {name: tag for tag, name in enumerate(MESSAGE_TYPES, start=1)}
+
+PIECES = (
+    None,
+    "bPionek", "bWieza", "bSkoczek", "bGoniec", "bHetman", "bKrol",
+    "cPionek", "cWieza", "cSkoczek", "cGoniec", "cHetman", "cKrol",
+)
+_PIECE_CODES = {piece: code for code, piece in enumerate(PIECES)}
+
+PROMOTIONS = ("", "H", "W", "S", "G")
+CLOCK_KEYS = ("white_time", "black_time", "last_move_timestamp")
+
+
+def available():
+    return msgpack is not None
+
+
+def pack_move(fr, to, promo=""):
+    """from/to ({"r", "c"}) i promocja w jednej liczbie: promo << 12 | from << 6 | to."""
+    promo_code = PROMOTIONS.index(promo) if promo in PROMOTIONS else 0
+    return promo_code << 12 | (fr["r"] * 8 + fr["c"]) << 6 | (to["r"] * 8 + to["c"])
+
+
+def unpack_move(code):
+    src, dest = code >> 6 & 63, code & 63
+    promo = code >> 12
+    return {
+        "from": {"r": src // 8, "c": src % 8},
+        "to": {"r": dest // 8, "c": dest % 8},
+        "promo": PROMOTIONS[promo] if promo < len(PROMOTIONS) else "",
+    }
+
+
+def _to_wire(obj):
+    if isinstance(obj, list):
+        return [_to_wire(item) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    out = {}
+    for key, value in obj.items():
+        if key in CLOCK_KEYS and isinstance(value, (int, float)):
+            value = round(value * 1000)
+        elif key == "board" and isinstance(value, list):
+            value = [_PIECE_CODES.get(piece, 0) for row in value for piece in row]
+        elif key == "changes" and isinstance(value, list):
+            value = [[r * 8 + c, _PIECE_CODES.get(piece, 0)] for r, c, piece in value]
+        elif key == "move" and isinstance(value, dict) and "from" in value:
+            value = [pack_move(value["from"], value["to"], value.get("promo", "")), value.get("san", "")]
+        else:
+            value = _to_wire(value)
+        out[key] = value
+    return out
+
+
+def _from_wire(obj):
+    if isinstance(obj, list):
+        return [_from_wire(item) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    out = {}
+    for key, value in obj.items():
+        if key in CLOCK_KEYS and isinstance(value, int):
+            value = value / 1000
+        elif key == "board" and isinstance(value, list):
+            value = [[PIECES[code] for code in value[r * 8:r * 8 + 8]] for r in range(8)]
+        elif key == "changes" and isinstance(value, list):
+            value = [[sq // 8, sq % 8, PIECES[code]] for sq, code in value]
+        elif key == "move" and isinstance(value, list):
+            value = dict(unpack_move(value[0]), san=value[1])
+        else:
+            value = _from_wire(value)
+        out[key] = value
+    return out
+
+
+def encode(message):
+    """Wiadomość (dict z "type") -> bajty ramki."""
+    body = {key: value for key, value in message.items() if key != "type"}
+    return msgpack.packb([_TAGS[message["type"]], _to_wire(body)], use_bin_type=True)
+
+
+def decode(data):
+    """Bajty ramki -> wiadomość w kształcie JSON. Błędna ramka -> ValueError."""
+    try:
+        tag, body = msgpack.unpackb(data, raw=False)
+    except (ValueError, TypeError) as e:
+        # błędy msgpack (ExtraData, FormatError, StackError) dziedziczą po ValueError
+        raise ValueError(f"invalid frame: {e}")
+    if not isinstance(tag, int) or not 1 <= tag <= len(MESSAGE_TYPES):
+        raise ValueError(f"unknown message tag: {tag!r}")
+    msg_type = MESSAGE_TYPES[tag - 1]
+    if msg_type == "move" and isinstance(body, int):
+        # klient wysyła sam spakowany ruch
+        return {"type": "move", "move": unpack_move(body)}
+    if not isinstance(body, dict):
+        raise ValueError("invalid frame body")
+    message = _from_wire(body)
+    message["type"] = msg_type
+    return message